@@ -0,0 +1,148 @@
+"""
+Общий источник данных для экспорта
+
+Все отчеты строятся по одному проходу по записям о винах: строки
+читаются потоковым курсором в одной транзакции только для чтения
+с согласованным снимком, а все агрегаты (по регионам, годам,
+производителям, ценовым диапазонам, итоги и самые дорогие вина)
+считаются по ходу чтения. Один и тот же набор данных можно передать
+нескольким экспортерам - PDF и Excel вместе обходятся одним чтением.
+"""
+
+import time
+from export.dataset import ExportDataset
+from models import changelog
+from models.backends.base import create_backend
+from models.database import AsyncDatabaseManager, WINE_SELECT_QUERY
+from models.loop_service import AsyncLoopService
+from utils.config import Config
+
+# Порядок строк по умолчанию и порядок листа данных Excel; оба
+# заканчиваются BottleID, чтобы строки одной бутылки шли подряд
+ORDER_BY_ID = "wb.BottleID DESC"
+ORDER_BY_VINTAGE = "wb.Vintage DESC, wb.PurchasePrice DESC, wb.BottleID DESC"
+
+
+async def _next_batch(batches):
+    try:
+        return await batches.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+class ExportDataProvider:
+    """Чтение данных для экспорта в одном снимке через AsyncDatabaseManager
+
+    Читается основная БД, а не локальная реплика: отчет должен
+    соответствовать текущему состоянию коллекции.
+    """
+
+    def __init__(self, db_manager, owns_manager=False):
+        self.db_manager = db_manager
+        self.owns_manager = owns_manager
+
+    @classmethod
+    def from_config(cls, db_config):
+        """Отдельный менеджер с одним соединением для параметров db_config"""
+        db_manager = AsyncDatabaseManager(pool_min_size=0, pool_max_size=1,
+                                          backend=create_backend(db_config))
+        return cls(db_manager, owns_manager=True)
+
+    async def close(self):
+        if self.owns_manager:
+            await self.db_manager.close()
+            # Иначе обработчик остановки удерживал бы менеджер, пул и
+            # бэкенд каждого экспорта до завершения приложения
+            AsyncLoopService.instance().remove_shutdown_hook(self.db_manager.close)
+
+    async def load(self, keep_rows=True, on_batch=None):
+        """Полное чтение в новый ExportDataset
+
+        on_batch(dataset) вызывается после каждого пакета; исключение в
+        нем прерывает чтение.
+        """
+        dataset = ExportDataset(keep_rows)
+        batches = self.stream(dataset)
+        try:
+            async for _ in batches:
+                if on_batch is not None:
+                    on_batch(dataset)
+        finally:
+            await batches.aclose()
+        return dataset
+
+    def iter_batches(self, dataset, loop_service, batch_size=None, order_by=ORDER_BY_ID):
+        """Синхронный перебор пакетов stream() из потока экспорта
+
+        Каждый пакет читается в цикле событий loop_service, а
+        обрабатывается в вызывающем потоке, поэтому в памяти находится
+        только текущий пакет.
+        """
+        batches = self.stream(dataset, batch_size, order_by)
+        try:
+            while True:
+                rows = loop_service.run(_next_batch(batches))
+                if rows is None:
+                    return
+                yield rows
+        finally:
+            loop_service.run(batches.aclose())
+
+    async def stream(self, dataset, batch_size=None, order_by=ORDER_BY_ID):
+        """Потоковое чтение записей о винах пакетами по batch_size
+
+        Все запросы (COUNT(*), версия и строки) выполняются в одном
+        соединении с одним снимком - согласованность отчета не зависит от
+        сравнения версий между соединениями. Каждый пакет учитывается в
+        агрегатах dataset до того, как передается вызывающему коду. Если
+        чтение прервано до конца, соединение закрывается, а не
+        возвращается в пул.
+        """
+        manager = self.db_manager
+        batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+        query = f"{WINE_SELECT_QUERY} ORDER BY {order_by}"
+        with manager.metrics.query_timer('export_scan') as timer:
+            started = time.perf_counter()
+            async with manager.pool.connection() as conn:
+                timer.observe('connect', time.perf_counter() - started)
+
+                async with conn.cursor() as cursor:
+                    await manager.dialect.begin_snapshot(cursor)
+                    await cursor.execute("SELECT COUNT(*) FROM WineBottle")
+                    dataset.expected_rows = (await cursor.fetchone())[0]
+                    try:
+                        dataset.version = await changelog.get_version(cursor)
+                    except Exception as e:
+                        print(f"Версия коллекции недоступна: {e}")
+
+                cursor = conn.cursor(manager.backend.streaming_cursor)
+                execute_time = fetch_time = 0.0
+                try:
+                    execute_started = time.perf_counter()
+                    with timer.phase('execute'):
+                        await cursor.execute(query)
+                    execute_time = time.perf_counter() - execute_started
+                    while True:
+                        started = time.perf_counter()
+                        rows = await cursor.fetchmany(batch_size)
+                        fetch_time += time.perf_counter() - started
+                        if not rows:
+                            break
+                        dataset.add(rows)
+                        yield rows
+                except BaseException:
+                    # Чтение прервано (отмена экспорта или ошибка): соединение
+                    # закрывается сразу, без дочитывания результата
+                    # небуферизованного курсора, и не возвращается в пул
+                    conn.close()
+                    raise
+                finally:
+                    timer.observe('fetch', fetch_time)
+                    timer.add_rows(dataset.rows_read)
+
+                await manager.slow_query_log.check(cursor, query, None,
+                                                   time.perf_counter() - execute_time - fetch_time,
+                                                   'export_scan')
+                await cursor.close()
+                # Завершение транзакции снимка
+                await conn.rollback()
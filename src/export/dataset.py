@@ -0,0 +1,178 @@
+"""
+Набор данных для отчетов
+
+ExportDataset накапливает записи о винах и все агрегаты отчетов
+(по регионам, годам, производителям, ценовым диапазонам, итоги и самые
+дорогие вина) по мере чтения пакетов строк. Модуль не зависит от Qt и
+БД, поэтому его импортируют и процессы формирования отчетов
+(render_pool), получающие набор данных через to_payload().
+"""
+
+import heapq
+import pickle
+from decimal import Decimal
+
+TOP_WINES_COUNT = 5
+
+# Столбцы строки WINE_SELECT_QUERY
+BOTTLE_ID, PRODUCER, VINTAGE, REGION, PRICE = 0, 2, 3, 4, 5
+
+
+def price_range(price):
+    """Ценовой диапазон бутылки"""
+    if price < 1000:
+        return 'До 1000'
+    if price <= 5000:
+        return '1000-5000'
+    if price <= 10000:
+        return '5000-10000'
+    return 'Свыше 10000'
+
+
+def _add_to_group(groups, key, price):
+    # [количество бутылок, количество с ценой, общая стоимость]
+    group = groups.get(key)
+    if group is None:
+        group = groups[key] = [0, 0, 0.0]
+    group[0] += 1
+    if price is not None:
+        group[1] += 1
+        group[2] += price
+
+
+def _average(group):
+    return group[2] / group[1] if group[1] else None
+
+
+def _compact_row(row):
+    # Decimal из MySQL сериализуется строкой - цена передается числом
+    return tuple(float(value) if isinstance(value, Decimal) else value for value in row)
+
+
+class ExportDataset:
+    """Записи о винах и агрегаты для отчетов, посчитанные за один проход
+
+    keep_rows=False - строки не сохраняются (только агрегаты), если
+    потребитель обрабатывает их сразу при чтении.
+    """
+
+    def __init__(self, keep_rows=True):
+        self.rows = [] if keep_rows else None
+        self.version = None  # версия коллекции в прочитанном снимке
+        self.expected_rows = None  # COUNT(*) в снимке перед чтением строк
+        self.rows_read = 0  # строк соединения с WineLocation
+        self.total_bottles = 0
+        self.total_value = 0.0
+        self.min_price = None
+        self.max_price = None
+        self.regions = {}
+        self.vintages = {}
+        self.producers = {}
+        self.price_ranges = {}
+        self._top_wines = []
+        self._position = 0
+        self._last_bottle_id = None
+
+    def add(self, rows):
+        """Учет очередного пакета строк
+
+        Строки одной бутылки (по одной на каждое местоположение) должны
+        идти подряд - порядок чтения заканчивается BottleID; в агрегатах
+        бутылка учитывается один раз.
+        """
+        if self.rows is not None:
+            self.rows.extend(rows)
+
+        for row in rows:
+            self.rows_read += 1
+            if row[BOTTLE_ID] == self._last_bottle_id:
+                continue
+            self._last_bottle_id = row[BOTTLE_ID]
+            self.total_bottles += 1
+            self._position += 1
+            price = float(row[PRICE]) if row[PRICE] is not None else None
+
+            if price is not None:
+                self.total_value += price
+                self.min_price = price if self.min_price is None else min(self.min_price, price)
+                self.max_price = price if self.max_price is None else max(self.max_price, price)
+                _add_to_group(self.price_ranges, price_range(price), price)
+            if row[REGION]:
+                _add_to_group(self.regions, row[REGION], price)
+            if row[VINTAGE]:
+                _add_to_group(self.vintages, row[VINTAGE], price)
+            if row[PRODUCER]:
+                _add_to_group(self.producers, row[PRODUCER], price)
+
+            # При равной цене остаются строки, прочитанные раньше
+            item = (price or 0.0, -self._position, row)
+            if len(self._top_wines) < TOP_WINES_COUNT:
+                heapq.heappush(self._top_wines, item)
+            elif item[:2] > self._top_wines[0][:2]:
+                heapq.heapreplace(self._top_wines, item)
+
+    def to_payload(self):
+        """Компактное сериализованное представление для передачи в другой процесс"""
+        state = dict(self.__dict__)
+        if self.rows is not None:
+            state['rows'] = [_compact_row(row) for row in self.rows]
+        state['_top_wines'] = [(price, position, _compact_row(row))
+                               for price, position, row in self._top_wines]
+        return pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def from_payload(cls, payload):
+        """Восстановление набора данных из to_payload()"""
+        dataset = cls.__new__(cls)
+        dataset.__dict__.update(pickle.loads(payload))
+        return dataset
+
+    @property
+    def average_price(self):
+        return self.total_value / self.total_bottles if self.total_bottles else 0.0
+
+    def top_wines(self):
+        """Самые дорогие вина (по убыванию цены)"""
+        return [row for _, _, row in sorted(self._top_wines, key=lambda item: item[:2], reverse=True)]
+
+    def require_rows(self):
+        """Прочитанные строки (ValueError, если набор загружен без строк)"""
+        if self.rows is None:
+            raise ValueError("Набор данных загружен без строк (keep_rows=False)")
+        return self.rows
+
+    def wines_by_vintage(self):
+        """Строки по убыванию года и цены (без года или цены - в конце)"""
+        return sorted(self.require_rows(), reverse=True,
+                      key=lambda row: (bool(row[VINTAGE]), row[VINTAGE] or 0,
+                                       row[PRICE] is not None, row[PRICE] or 0))
+
+    def region_stats(self):
+        """(Регион, количество, средняя цена, общая стоимость) по убыванию количества"""
+        return [(region, group[0], _average(group), group[2])
+                for region, group in sorted(self.regions.items(), key=lambda item: -item[1][0])]
+
+    def vintage_stats(self):
+        """(Год, количество, средняя цена) по убыванию года"""
+        return [(vintage, group[0], _average(group))
+                for vintage, group in sorted(self.vintages.items(), reverse=True)]
+
+    def price_range_stats(self):
+        """(Ценовой диапазон, количество, общая стоимость) по убыванию стоимости"""
+        return [(name, group[0], group[2])
+                for name, group in sorted(self.price_ranges.items(), key=lambda item: -item[1][2])]
+
+    def producer_stats(self):
+        """(Производитель, количество, средняя цена, общая стоимость)"""
+        stats = [(producer, group[0], _average(group), group[2])
+                 for producer, group in self.producers.items()]
+        return sorted(stats, key=lambda item: (-item[1], -(item[2] or 0)))
+
+    def statistics(self):
+        """Сводная статистика коллекции"""
+        return {
+            'total_bottles': self.total_bottles,
+            'total_value': self.total_value,
+            'regions': {region: count for region, count, _, _ in self.region_stats()},
+            'vintages': {vintage: group[0] for vintage, group in sorted(self.vintages.items())}
+        }
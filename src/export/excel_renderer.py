@@ -0,0 +1,456 @@
+"""
+Формирование отчета Excel
+
+Рендерер не зависит от Qt и БД: он получает ExportDataset (или пакеты
+строк в потоковом режиме) и записывает книгу xlsxwriter во временный
+файл, который заменяет файл отчета после успешного сохранения. Поэтому
+его можно выполнять как в потоке экспорта, так и в отдельном процессе.
+"""
+
+import os
+import xlsxwriter
+from datetime import datetime
+from export.progress import ExportProgress, partial_path, remove_partial_file
+from utils.config import Config
+
+# Лист 'Данные проекта': заголовки, стили и ширина столбцов
+DATA_HEADERS = [
+    'ID', 'Название вина', 'Производитель', 'Винтаж', 'Регион',
+    'Цена покупки', 'Дата покупки', 'Полка', 'Стойка', 'Погреб'
+]
+DATA_COLUMN_STYLES = ['number', 'normal', 'normal', 'number', 'normal',
+                      'currency', 'center', 'normal', 'normal', 'normal']
+DATA_COLUMN_WIDTHS = [8, 25, 20, 10, 15, 12, 12, 8, 8, 15]
+DATA_HEADER_ROW = 4
+
+# Этапы экспорта: (имя, описание, вес)
+FETCH_PHASE = ('fetch', 'Чтение данных...', 45)
+STREAMING_FETCH_PHASE = ('fetch', 'Чтение и запись данных...', 80)
+DATA_SHEET_PHASE = ('data', "Лист 'Данные проекта'...", 35)
+SHEET_PHASES = [
+    ('analytics', "Лист 'Аналитика'...", 5),
+    ('visualization', "Лист 'Визуализация'...", 5),
+    ('save', 'Сохранение файла...', 10)
+]
+EXPORT_PHASES = [DATA_SHEET_PHASE] + SHEET_PHASES
+
+
+class ExcelReportRenderer:
+    """Построение книги Excel с листами данных, аналитики и визуализации"""
+    
+    def __init__(self, filename, company_name="WINESTORE", student_name="", progress=None):
+        self.filename = filename
+        self.company_name = company_name
+        self.student_name = student_name
+        self.export_progress = progress or ExportProgress(EXPORT_PHASES, lambda percent: None)
+        self.workbook = None
+        self.styles = {}
+    
+    def open(self, constant_memory=False):
+        """Создание книги (под временным именем до успешного сохранения)
+        
+        В режиме constant_memory строки листа записываются строго по порядку
+        и сразу сбрасываются на диск.
+        """
+        self.workbook = xlsxwriter.Workbook(partial_path(self.filename), {'constant_memory': constant_memory})
+        self.styles = self.create_styles()
+    
+    def render(self, dataset):
+        """Формирование всей книги по прочитанному набору данных"""
+        self.open()
+        
+        # Создание листов
+        self.create_data_sheet(dataset.wines_by_vintage())
+        self.create_summary_sheets(dataset)
+        
+        return self.save()
+    
+    def create_styles(self):
+        """Создание стилей для оформления отчета"""
+        styles = {}
+        
+        # Заголовок отчета (14pt, жирный, цвет фона)
+        styles['title'] = self.workbook.add_format({
+            'bold': True,
+            'font_size': 14,
+            'font_color': '#FFFFFF',
+            'align': 'center',
+            'valign': 'vcenter',
+            'border': 1,
+            'fg_color': '#366092'
+        })
+        
+        # Подзаголовок
+        styles['subtitle'] = self.workbook.add_format({
+            'bold': True,
+            'font_size': 12,
+            'font_color': '#1F497D',
+            'align': 'center',
+            'valign': 'vcenter',
+            'border': 1,
+            'fg_color': '#DCE6F1'
+        })
+        
+        # Заголовки таблиц
+        styles['header'] = self.workbook.add_format({
+            'bold': True,
+            'font_size': 11,
+            'font_color': 'white',
+            'bg_color': '#4472C4',
+            'border': 1,
+            'align': 'center',
+            'valign': 'vcenter',
+            'text_wrap': True
+        })
+        
+        # Основной текст
+        styles['normal'] = self.workbook.add_format({
+            'border': 1,
+            'align': 'left',
+            'valign': 'top'
+        })
+        
+        # Числовые значения
+        styles['number'] = self.workbook.add_format({
+            'border': 1,
+            'align': 'right',
+            'num_format': '#,##0.00'
+        })
+        
+        # Денежный формат
+        styles['currency'] = self.workbook.add_format({
+            'border': 1,
+            'align': 'right',
+            'num_format': '#,##0.00'
+        })
+        
+        # Центрированный текст
+        styles['center'] = self.workbook.add_format({
+            'border': 1,
+            'align': 'center',
+            'valign': 'center'
+        })
+        
+        return styles
+    
+    def start_data_sheet(self):
+        """Создание листа 'Данные проекта' с заголовками (без строк данных)"""
+        data_sheet = self.workbook.add_worksheet('Данные проекта')
+        
+        # Заголовок отчета
+        data_sheet.merge_range('A1:J1', f'{self.company_name} - УПРАВЛЕНИЕ ВИННОЙ КОЛЛЕКЦИЕЙ', self.styles['title'])
+        
+        if self.student_name:
+            data_sheet.merge_range('A2:J2', f'Студент: {self.student_name}', self.styles['subtitle'])
+        else:
+            data_sheet.merge_range('A2:J2', '', self.styles['subtitle'])
+            
+        data_sheet.merge_range('A3:J3', f'Дата формирования отчета: {datetime.now().strftime("%d.%m.%Y %H:%M")}', self.styles['center'])
+        
+        # Заголовки таблицы
+        data_sheet.write_row(DATA_HEADER_ROW, 0, DATA_HEADERS, self.styles['header'])
+        
+        # Закрепленная область заголовков
+        data_sheet.freeze_panes(DATA_HEADER_ROW + 1, 0)
+        
+        # Настроенная ширина столбцов
+        for col, width in enumerate(DATA_COLUMN_WIDTHS):
+            data_sheet.set_column(col, col, width)
+        
+        return data_sheet
+    
+    def data_column_runs(self):
+        """Группы соседних столбцов данных с одинаковым стилем
+        
+        Возвращает список (первый столбец, последний столбец, стиль):
+        строка записывается одним write_row на группу.
+        """
+        runs = []
+        for col, style_name in enumerate(DATA_COLUMN_STYLES):
+            style = self.styles[style_name]
+            if runs and runs[-1][2] is style:
+                runs[-1][1] = col
+            else:
+                runs.append([col, col, style])
+        return [tuple(run) for run in runs]
+    
+    def write_data_rows(self, data_sheet, first_row, records, runs):
+        """Запись пакета строк данных, возвращает номер следующей строки"""
+        row = first_row
+        for record in records:
+            for first_col, last_col, style in runs:
+                data_sheet.write_row(row, first_col, record[first_col:last_col + 1], style)
+            row += 1
+        return row
+    
+    def finish_data_sheet(self, data_sheet, row_count):
+        """Автофильтры для всех колонок таблицы"""
+        data_sheet.autofilter(DATA_HEADER_ROW, 0, DATA_HEADER_ROW + row_count, len(DATA_HEADERS) - 1)
+    
+    def create_data_sheet(self, wine_data):
+        """Создание листа 'Данные проекта'"""
+        self.export_progress.start('data')
+        data_sheet = self.start_data_sheet()
+        runs = self.data_column_runs()
+        row = DATA_HEADER_ROW + 1
+        batch_size = Config.EXPORT_BATCH_SIZE
+        for start in range(0, len(wine_data), batch_size):
+            row = self.write_data_rows(data_sheet, row, wine_data[start:start + batch_size], runs)
+            self.export_progress.update('data', start + batch_size, len(wine_data))
+        self.finish_data_sheet(data_sheet, len(wine_data))
+    
+    def create_analytics_sheet(self, dataset):
+        """Создание листа 'Аналитика'"""
+        analytics_sheet = self.workbook.add_worksheet('Аналитика')
+        current_row = 0
+        
+        # Заголовок
+        analytics_sheet.merge_range(current_row, 0, current_row, 6, 
+                                  'АНАЛИТИКА ВИННОЙ КОЛЛЕКЦИИ', self.styles['title'])
+        current_row += 1
+        analytics_sheet.merge_range(current_row, 0, current_row, 6, 
+                                  'Сводные данные и ключевые метрики', self.styles['subtitle'])
+        current_row += 2
+        
+        region_data = dataset.region_stats()
+        if not region_data:
+            analytics_sheet.write(current_row, 0, 'Нет данных для аналитики', self.styles['normal'])
+            return
+        
+        # Сводная таблица с ключевыми метриками проекта
+        analytics_sheet.write(current_row, 0, 'СВОДНАЯ ТАБЛИЦА ПО РЕГИОНАМ', self.styles['header'])
+        current_row += 1
+        
+        headers = ['Регион', 'Кол-во бутылок', 'Средняя цена', 'Общая стоимость']
+        for col, header in enumerate(headers):
+            analytics_sheet.write(current_row, col, header, self.styles['header'])
+        current_row += 1
+        
+        total_collection_value = sum(float(record[3]) for record in region_data if record[3])
+        
+        for region, count, avg_price, total_value in region_data:
+            analytics_sheet.write(current_row, 0, region, self.styles['normal'])
+            analytics_sheet.write(current_row, 1, count, self.styles['number'])
+            analytics_sheet.write(current_row, 2, float(avg_price) if avg_price else 0, self.styles['currency'])
+            analytics_sheet.write(current_row, 3, float(total_value) if total_value else 0, self.styles['currency'])
+            current_row += 1
+        
+        current_row += 2
+        
+        # Статистика по ценовым диапазонам
+        analytics_sheet.write(current_row, 0, 'СТАТИСТИКА ПО ЦЕНОВЫМ ДИАПАЗОНАМ', self.styles['header'])
+        current_row += 1
+        
+        headers = ['Ценовой диапазон', 'Кол-во бутылок', 'Общая стоимость']
+        for col, header in enumerate(headers):
+            analytics_sheet.write(current_row, col, header, self.styles['header'])
+        current_row += 1
+        
+        price_data = dataset.price_range_stats()
+        for price_range, count, total_val in price_data:
+            analytics_sheet.write(current_row, 0, price_range, self.styles['normal'])
+            analytics_sheet.write(current_row, 1, count, self.styles['number'])
+            analytics_sheet.write(current_row, 2, float(total_val) if total_val else 0, self.styles['currency'])
+            current_row += 1
+        
+        current_row += 2
+        
+        # Блок с расчетными показателями
+        analytics_sheet.write(current_row, 0, 'РАСЧЕТНЫЕ ПОКАЗАТЕЛИ', self.styles['header'])
+        current_row += 1
+        
+        total_bottles = dataset.total_bottles
+        total_value = dataset.total_value
+        avg_bottle_price = dataset.average_price
+        max_price = dataset.max_price or 0
+        min_price = dataset.min_price or 0
+        
+        indicators = [
+            ('Общее количество бутылок:', total_bottles, self.styles['number']),
+            ('Общая стоимость коллекции:', total_value, self.styles['currency']),
+            ('Средняя стоимость бутылки:', avg_bottle_price, self.styles['currency']),
+            ('Самая дорогая бутылка:', max_price, self.styles['currency']),
+            ('Самая доступная бутылка:', min_price, self.styles['currency']),
+            ('Разброс цен:', max_price - min_price, self.styles['currency'])
+        ]
+        
+        for indicator, value, style in indicators:
+            analytics_sheet.write(current_row, 0, indicator, self.styles['normal'])
+            analytics_sheet.write(current_row, 1, value, style)
+            current_row += 1
+        
+        current_row += 2
+        
+        # Выводы по аналитике
+        analytics_sheet.write(current_row, 0, 'ВЫВОДЫ ПО АНАЛИТИКЕ', self.styles['header'])
+        current_row += 1
+        
+        top_regions = [region[0] for region in region_data[:3]] if region_data else ["нет данных"]
+        top_prices = [price[0] for price in price_data[:2]] if price_data else ["нет данных"]
+        
+        conclusions = [
+            f"• Коллекция состоит из {total_bottles} бутылок общей стоимостью {total_value:,.2f} руб.",
+            f"• Средняя стоимость бутылки составляет {avg_bottle_price:.2f} руб.",
+            f"• Наиболее представленные регионы: {', '.join(top_regions)}",
+            f"• Преобладают вина в ценовом диапазоне: {', '.join(top_prices)}",
+            f"• Разброс цен в коллекции: от {min_price:.2f} до {max_price:.2f} руб.",
+            "• Коллекция демонстрирует разнообразие по регионам и ценовым категориям"
+        ]
+        
+        for conclusion in conclusions:
+            analytics_sheet.merge_range(current_row, 0, current_row, 4, conclusion, self.styles['normal'])
+            current_row += 1
+        
+        # Создание диаграмм (минимум 2 разных типа)
+        self.create_analytics_charts(analytics_sheet, price_data, len(region_data))
+        
+        # Настройка ширины колонок
+        analytics_sheet.set_column('A:A', 20)
+        analytics_sheet.set_column('B:B', 15)
+        analytics_sheet.set_column('C:D', 15)
+    
+    def create_analytics_charts(self, sheet, price_data, region_count):
+        """Создание диаграмм для аналитики"""
+        if region_count == 0:
+            return
+            
+        # Диаграмма 1: Столбчатая диаграмма - для сравнения категорий (по регионам)
+        chart1 = self.workbook.add_chart({'type': 'column'})
+        
+        chart1.add_series({
+            'name': 'Количество бутылок',
+            'categories': f'=Аналитика!$A$6:$A${5 + region_count}',
+            'values': f'=Аналитика!$B$6:$B${5 + region_count}',
+        })
+        
+        chart1.set_title({'name': 'Распределение вин по регионам'})
+        chart1.set_x_axis({'name': 'Регион'})
+        chart1.set_y_axis({'name': 'Количество бутылок'})
+        chart1.set_style(11)
+        
+        sheet.insert_chart('F2', chart1)
+        
+        # Диаграмма 2: Круговая диаграмма - для отображения долей (ценовые диапазоны)
+        chart2 = self.workbook.add_chart({'type': 'pie'})
+        
+        if price_data:
+            chart2.add_series({
+                'name': 'Доли по ценовым диапазонам',
+                'categories': f'=Аналитика!$A${13 + region_count}:$A${12 + region_count + len(price_data)}',
+                'values': f'=Аналитика!$C${13 + region_count}:$C${12 + region_count + len(price_data)}',
+                'data_labels': {'percentage': True, 'category': True}
+            })
+            
+            chart2.set_title({'name': 'Распределение по ценовым диапазонам'})
+            chart2.set_style(10)
+            
+            sheet.insert_chart('F18', chart2)
+    
+    def create_visualization_sheet(self, dataset):
+        """Создание листа 'Визуализация'"""
+        visualization_sheet = self.workbook.add_worksheet('Визуализация')
+        current_row = 0
+        
+        # Заголовок
+        visualization_sheet.merge_range(current_row, 0, current_row, 6, 
+                                     'ВИЗУАЛИЗАЦИЯ ДАННЫХ КОЛЛЕКЦИИ', self.styles['title'])
+        current_row += 1
+        visualization_sheet.merge_range(current_row, 0, current_row, 6, 
+                                     'Графики и инфографика основных показателей', self.styles['subtitle'])
+        current_row += 2
+        
+        if not dataset.total_bottles:
+            visualization_sheet.write(current_row, 0, 'Нет данных для визуализации', self.styles['normal'])
+            return
+        
+        # Инфографика основных показателей
+        total_bottles = dataset.total_bottles
+        total_value = dataset.total_value
+        avg_price = dataset.average_price
+        
+        # Блок с ключевыми метриками
+        visualization_sheet.write(current_row, 0, 'ОСНОВНЫЕ ПОКАЗАТЕЛИ КОЛЛЕКЦИИ', self.styles['header'])
+        current_row += 1
+        
+        metrics = [
+            ('Общее количество бутылок', total_bottles, 'шт.'),
+            ('Общая стоимость коллекции', f"{total_value:,.2f}", 'руб.'),
+            ('Средняя стоимость бутылки', f"{avg_price:.2f}", 'руб.'),
+            ('Количество производителей', len(dataset.producers), ''),
+            ('Количество регионов', len(dataset.regions), '')
+        ]
+        
+        for i, (metric_name, value, unit) in enumerate(metrics):
+            visualization_sheet.write(current_row + i, 0, metric_name, self.styles['header'])
+            visualization_sheet.write(current_row + i, 1, value, self.styles['number'])
+            visualization_sheet.write(current_row + i, 2, unit, self.styles['normal'])
+        
+        current_row += len(metrics) + 2
+        
+        # Дополнительные графики
+        self.create_visualization_charts(visualization_sheet, dataset.vintage_stats(), current_row)
+        
+        # Настройка ширины колонок
+        visualization_sheet.set_column('A:A', 25)
+        visualization_sheet.set_column('B:B', 15)
+        visualization_sheet.set_column('C:C', 8)
+    
+    def create_visualization_charts(self, sheet, vintage_data, start_row):
+        """Создание дополнительных графиков для визуализации"""
+        # График 1: Линейный график - для трендов во времени (по винтажам)
+        if vintage_data:
+            data_start_row = start_row + 2
+            sheet.write(data_start_row - 1, 0, 'Винтаж', self.styles['header'])
+            sheet.write(data_start_row - 1, 1, 'Средняя цена', self.styles['header'])
+            sheet.write(data_start_row - 1, 2, 'Количество', self.styles['header'])
+            
+            for i, (vintage, count, avg_price) in enumerate(vintage_data):
+                sheet.write(data_start_row + i, 0, vintage, self.styles['number'])
+                sheet.write(data_start_row + i, 1, float(avg_price) if avg_price else 0, self.styles['currency'])
+                sheet.write(data_start_row + i, 2, count, self.styles['number'])
+            
+            # Линейный график
+            chart1 = self.workbook.add_chart({'type': 'line'})
+            
+            chart1.add_series({
+                'name': 'Средняя цена по винтажам',
+                'categories': f'=Визуализация!$A${data_start_row + 1}:$A${data_start_row + len(vintage_data)}',
+                'values': f'=Визуализация!$B${data_start_row + 1}:$B${data_start_row + len(vintage_data)}',
+                'marker': {'type': 'circle', 'size': 6},
+            })
+            
+            chart1.set_title({'name': 'Динамика средней цены по винтажам'})
+            chart1.set_x_axis({'name': 'Винтаж'})
+            chart1.set_y_axis({'name': 'Средняя цена'})
+            chart1.set_style(10)
+            
+            sheet.insert_chart('E2', chart1)
+    
+    def create_summary_sheets(self, dataset):
+        """Создание листов аналитики и визуализации по агрегатам dataset"""
+        self.export_progress.start('analytics')
+        self.create_analytics_sheet(dataset)
+        self.export_progress.start('visualization')
+        self.create_visualization_sheet(dataset)
+    
+    def save(self):
+        """Закрытие книги и перенос временного файла на место отчета"""
+        self.export_progress.start('save')
+        self.workbook.close()
+        self.workbook = None
+        os.replace(partial_path(self.filename), self.filename)
+        self.export_progress.finish()
+        print(f"Экспорт в Excel завершен! Файл сохранен как: {self.filename}")
+        
+        return self.filename
+    
+    def discard(self):
+        """Удаление недописанного отчета"""
+        if self.workbook is not None:
+            try:
+                # close() удаляет и временные файлы строк режима constant_memory
+                self.workbook.close()
+            except Exception as e:
+                print(f"Ошибка при закрытии файла отчета: {e}")
+            self.workbook = None
+        remove_partial_file(self.filename)
@@ -2,13 +2,24 @@
 Модули экспорта данных WINESTORE
 """
 
-from .pdf_exporter import PDFExportWorker, PDFReportBase, StatisticalPDFReport, DetailedPDFReport
+from .pdf_exporter import PDFExportWorker
+from .pdf_renderer import PDFReportBase, StatisticalPDFReport, DetailedPDFReport, render_pdf_report
 from .excel_exporter import ExcelExportWorker
+from .excel_renderer import ExcelReportRenderer
+from .data_provider import ExportDataProvider
+from .dataset import ExportDataset
+from .progress import ExportCancelled, ExportProgress
 
 __all__ = [
     'PDFExportWorker',
     'PDFReportBase',
     'StatisticalPDFReport',
     'DetailedPDFReport',
-    'ExcelExportWorker'
+    'render_pdf_report',
+    'ExcelExportWorker',
+    'ExcelReportRenderer',
+    'ExportDataProvider',
+    'ExportDataset',
+    'ExportCancelled',
+    'ExportProgress'
 ]
@@ -0,0 +1,82 @@
+"""
+Ход выполнения и отмена экспорта
+
+Экспорт делится на этапы (чтение данных, формирование листов или
+страниц, сохранение файла) с весами; ход каждого этапа - доля
+обработанных строк от ожидаемого числа (COUNT(*) перед чтением).
+Отмена кооперативная: флаг проверяется при каждом обновлении хода.
+"""
+
+import os
+import threading
+
+
+class ExportCancelled(Exception):
+    """Экспорт отменен пользователем"""
+
+
+class ExportProgress:
+    """Пересчет хода этапов экспорта в общий процент
+
+    phases - список (имя, описание, вес); on_progress(процент) и
+    on_phase(описание) вызываются из потока экспорта или цикла событий,
+    поэтому должны быть потокобезопасными (сигналы Qt).
+    """
+
+    def __init__(self, phases, on_progress, on_phase=None, cancel_event=None):
+        self.phases = list(phases)
+        total_weight = sum(weight for _, _, weight in phases) or 1
+        self._phases = {}
+        start = 0
+        for name, title, weight in phases:
+            self._phases[name] = (start * 100 / total_weight, weight * 100 / total_weight, title)
+            start += weight
+        self.on_progress = on_progress
+        self.on_phase = on_phase
+        self.cancel_event = cancel_event or threading.Event()
+        self._percent = -1
+
+    def start(self, phase):
+        """Начало этапа"""
+        self.check_cancelled()
+        if self.on_phase is not None:
+            self.on_phase(self._phases[phase][2])
+        self._emit(self._phases[phase][0])
+
+    def update(self, phase, done, total):
+        """Обработано done из total единиц этапа"""
+        self.check_cancelled()
+        start, span, _ = self._phases[phase]
+        fraction = min(done / total, 1.0) if total else 1.0
+        self._emit(start + span * fraction)
+
+    def finish(self):
+        self._emit(100)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise ExportCancelled("Экспорт отменен")
+
+    def _emit(self, percent):
+        percent = int(percent)
+        if percent != self._percent:
+            self._percent = percent
+            self.on_progress(percent)
+
+
+def partial_path(filename):
+    """Временный файл, который заменяет filename только после успешного сохранения"""
+    return filename + '.part'
+
+
+def remove_partial_file(filename):
+    """Удаление недописанного файла отчета"""
+    try:
+        os.remove(partial_path(filename))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Не удалось удалить временный файл отчета: {e}")
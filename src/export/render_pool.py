@@ -0,0 +1,135 @@
+"""
+Формирование отчетов в отдельном процессе
+
+Построение книги Excel или страниц PDF - долгая работа на Python,
+которая в потоке экспорта делит GIL с интерфейсом. В режиме
+EXPORT_RENDER_MODE=process поток экспорта передает компактный набор
+данных (ExportDataset.to_payload) процессу общего ProcessPoolExecutor
+и ждет результата, пересылая ход и описания этапов из очереди в
+ExportProgress потока экспорта (сигналы окна экспорта). Отмена
+передается процессу через общее событие.
+"""
+
+import multiprocessing
+import queue
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from export.dataset import ExportDataset
+from export.excel_renderer import ExcelReportRenderer
+from export.pdf_renderer import render_pdf_report
+from export.progress import ExportProgress, remove_partial_file
+from utils.config import Config
+
+# Интервал проверки отмены и завершения процесса, с
+POLL_INTERVAL = 0.1
+
+_lock = threading.Lock()
+_executor = None
+_manager = None
+# Отправленные в пул задачи (для отмены при завершении на Python 3.8);
+# отдельная блокировка - обратные вызовы завершения выполняются в потоке
+# пула, пока shutdown() ждет его под _lock
+_futures_lock = threading.Lock()
+_futures = set()
+
+
+def _pool():
+    """Общий пул процессов и менеджер очередей (создаются при первом экспорте)"""
+    global _executor, _manager
+    with _lock:
+        if _executor is None:
+            # spawn: fork процесса с потоками Qt и цикла событий небезопасен
+            context = multiprocessing.get_context('spawn')
+            _manager = context.Manager()
+            _executor = ProcessPoolExecutor(max_workers=max(Config.EXPORT_RENDER_WORKERS, 1),
+                                            mp_context=context)
+        return _executor, _manager
+
+
+def _render_in_process(kind, options, payload, filename, phases, messages, cancel_event):
+    # Выполняется в процессе пула
+    dataset = ExportDataset.from_payload(payload)
+    progress = ExportProgress(phases,
+                              lambda percent: messages.put(('progress', percent)),
+                              lambda title: messages.put(('status', title)),
+                              cancel_event)
+    if kind == 'excel':
+        renderer = ExcelReportRenderer(filename, *options, progress=progress)
+        try:
+            return renderer.render(dataset)
+        except BaseException:
+            renderer.discard()
+            raise
+    try:
+        return render_pdf_report(*options, dataset, filename, progress)
+    except BaseException:
+        remove_partial_file(filename)
+        raise
+
+
+def _forget(future):
+    with _futures_lock:
+        _futures.discard(future)
+
+
+def _forward(progress, message):
+    kind, value = message
+    if kind == 'progress':
+        progress.on_progress(value)
+    elif progress.on_phase is not None:
+        progress.on_phase(value)
+
+
+def render(kind, options, dataset, filename, progress):
+    """Формирование отчета kind ('excel' или 'pdf') в процессе пула
+
+    options - параметры рендерера (для Excel - название компании и имя
+    студента, для PDF - еще и тип отчета). Вызывается из потока экспорта
+    и блокирует его до завершения; ход пересылается в progress, а ошибки
+    процесса и ExportCancelled пробрасываются вызывающему коду.
+    """
+    executor, manager = _pool()
+    messages = manager.Queue()
+    cancel_event = manager.Event()
+    future = executor.submit(_render_in_process, kind, options, dataset.to_payload(), filename,
+                             progress.phases, messages, cancel_event)
+    with _futures_lock:
+        _futures.add(future)
+    future.add_done_callback(_forget)
+
+    while True:
+        if progress.cancel_event.is_set() and not cancel_event.is_set():
+            cancel_event.set()
+        try:
+            _forward(progress, messages.get(timeout=POLL_INTERVAL))
+        except queue.Empty:
+            if future.done():
+                break
+
+    # Сообщения, отправленные перед самым завершением
+    while True:
+        try:
+            _forward(progress, messages.get_nowait())
+        except queue.Empty:
+            break
+    return future.result()
+
+
+def shutdown():
+    """Остановка процессов пула при завершении приложения"""
+    global _executor, _manager
+    with _lock:
+        if _executor is not None:
+            if sys.version_info >= (3, 9):
+                _executor.shutdown(cancel_futures=True)
+            else:
+                # cancel_futures появился в Python 3.9: ожидающие задачи
+                # отменяются вручную, выполняемые дорабатывают
+                with _futures_lock:
+                    pending = list(_futures)
+                for future in pending:
+                    future.cancel()
+                _executor.shutdown()
+            _manager.shutdown()
+            _executor = _manager = None
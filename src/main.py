@@ -5,13 +5,17 @@ WINESTORE - Управление винной коллекцией
 
 import sys
 import os
-from PyQt6.QtWidgets import QApplication, QMessageBox
-from PyQt6.QtGui import QIcon
-from ui.main_window import MainWindow
 from utils.config import Config
 
+# Qt, окна и модели импортируются в функциях: процессы формирования
+# отчетов (spawn) заново импортируют этот модуль как __mp_main__
+
 def setup_environment():
     """Настройка окружения приложения"""
+    from models.loop_service import AsyncLoopService
+    from models.replica import LocalReplica
+    from migrations.runner import migrate
+    
     try:
         # Создание необходимых директорий
         Config.setup_directories()
@@ -24,6 +28,20 @@ def setup_environment():
                 print(f"  - {error}")
             return False
         
+        # Применение миграций схемы базы данных
+        if Config.DB_AUTO_MIGRATE:
+            try:
+                applied = AsyncLoopService.instance().run(migrate())
+                if applied:
+                    print(f"Применены миграции: {', '.join(map(str, applied))}")
+            except Exception as e:
+                # Без доступа к БД приложение запускается, ошибки покажут окна
+                print(f"Ошибка применения миграций: {e}")
+        
+        # Фоновая синхронизация локальной реплики для чтения
+        if Config.READ_REPLICA and Config.DB_BACKEND == 'mysql':
+            LocalReplica.shared().start()
+        
         return True
     except Exception as e:
         print(f"Ошибка настройки окружения: {e}")
@@ -31,6 +49,12 @@ def setup_environment():
 
 def main():
     """Основная функция запуска приложения"""
+    from PyQt6.QtWidgets import QApplication, QMessageBox
+    from PyQt6.QtGui import QIcon
+    from export import render_pool
+    from models.loop_service import AsyncLoopService
+    from ui.main_window import MainWindow
+    
     try:
         # Настройка окружения
         if not setup_environment():
@@ -52,6 +76,11 @@ def main():
         # Запуск главного цикла приложения
         return_code = app.exec()
         
+        # Остановка процессов формирования отчетов, фонового цикла событий
+        # и закрытие соединений с БД
+        render_pool.shutdown()
+        AsyncLoopService.instance().stop()
+        
         print("Приложение завершено")
         return return_code
         
@@ -0,0 +1,165 @@
+"""
+WINESTORE - Служебные команды обслуживания базы данных
+
+Примеры:
+    python src/manage.py summaries rebuild
+    python src/manage.py summaries verify
+    python src/manage.py search-index create
+    python src/manage.py search-index status
+    python src/manage.py changelog prune --days 30
+    python src/manage.py migrate
+    python src/manage.py migrate --status
+    python src/manage.py replica sync
+    python src/manage.py replica status
+"""
+
+import argparse
+import asyncio
+import sys
+from models.database import AsyncDatabaseManager
+from models.replica import LocalReplica
+from models import schema
+from migrations import runner
+
+async def summaries_command(action):
+    """Пересчет или проверка сводных таблиц статистики"""
+    db_manager = AsyncDatabaseManager(pool_min_size=0, pool_max_size=1)
+    try:
+        if action == 'rebuild':
+            if await db_manager.rebuild_summaries():
+                print("Сводные таблицы пересчитаны")
+                return 0
+            return 1
+
+        mismatches = await db_manager.verify_summaries()
+        if not mismatches:
+            print("Сводные таблицы соответствуют данным коллекции")
+            return 0
+
+        print(f"Найдено расхождений: {len(mismatches)}")
+        for table, key, expected, stored in mismatches:
+            print(f"  {table} [{key}]: ожидается {expected}, сохранено {stored}")
+        print("Для исправления выполните: python src/manage.py summaries rebuild")
+        return 1
+    finally:
+        await db_manager.close()
+
+async def search_index_command(action):
+    """Создание или проверка полнотекстового индекса поиска"""
+    db_manager = AsyncDatabaseManager(pool_min_size=0, pool_max_size=1)
+    try:
+        async with db_manager.pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                if not db_manager.dialect.supports_fulltext:
+                    print(f"{db_manager.backend.describe()} не поддерживает полнотекстовый индекс, поиск использует LIKE")
+                    return 1 if action == 'create' else 0
+
+                if action == 'create':
+                    if await schema.ensure_search_index(cursor):
+                        print(f"Индекс {schema.SEARCH_INDEX_NAME} создан")
+                    else:
+                        print(f"Индекс {schema.SEARCH_INDEX_NAME} уже существует")
+                    AsyncDatabaseManager._fulltext_available = True
+                    return 0
+
+                if await schema.has_search_index(cursor):
+                    print(f"Индекс {schema.SEARCH_INDEX_NAME} существует")
+                    return 0
+                print(f"Индекс {schema.SEARCH_INDEX_NAME} не создан, поиск использует LIKE")
+                print("Для создания выполните: python src/manage.py search-index create")
+                return 1
+    finally:
+        await db_manager.close()
+
+async def changelog_command(keep_days):
+    """Удаление старых записей журнала изменений"""
+    db_manager = AsyncDatabaseManager(pool_min_size=0, pool_max_size=1)
+    try:
+        deleted = await db_manager.prune_change_log(keep_days)
+        print(f"Удалено записей журнала изменений: {deleted}")
+        return 0
+    finally:
+        await db_manager.close()
+
+async def migrate_command(show_status, target):
+    """Применение миграций схемы или вывод их состояния"""
+    if not show_status:
+        applied = await runner.migrate(target)
+        if applied:
+            print(f"Применены миграции: {', '.join(map(str, applied))}")
+        else:
+            print("Схема базы данных актуальна")
+        return 0
+
+    pending = 0
+    for version, description, applied_at in await runner.status():
+        state = f"применена {applied_at}" if applied_at else "не применена"
+        pending += applied_at is None
+        print(f"  {version:04d} {description}: {state}")
+    return 1 if pending else 0
+
+async def replica_command(action, full):
+    """Синхронизация локальной реплики или вывод ее состояния"""
+    replica = LocalReplica.shared()
+    try:
+        if action == 'sync':
+            applied = await replica.sync(full)
+            if applied is None:
+                return 1
+            print(f"Обновлено записей реплики: {applied}")
+
+        metrics = await replica.check()
+        print(f"Реплика {metrics['path']}: версия {metrics['version']}, версия MySQL {metrics['source_version']}")
+        print(f"  Отставание: {metrics['lag_changes']} изменений, "
+              f"последняя синхронизация {metrics['synced_at']} ({metrics['staleness_seconds']} с назад)")
+        return 1 if metrics['errors'] else 0
+    finally:
+        await replica.close()
+
+def main(argv=None):
+    """Разбор аргументов командной строки и запуск команды"""
+    parser = argparse.ArgumentParser(description="Служебные команды WINESTORE")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    summaries_parser = subparsers.add_parser('summaries', help="сводные таблицы статистики")
+    summaries_parser.add_argument('action', choices=['rebuild', 'verify'],
+                                  help="rebuild - пересчитать, verify - проверить")
+
+    search_index_parser = subparsers.add_parser('search-index', help="полнотекстовый индекс поиска")
+    search_index_parser.add_argument('action', choices=['create', 'status'],
+                                     help="create - создать, status - проверить наличие")
+
+    changelog_parser = subparsers.add_parser('changelog', help="журнал изменений коллекции")
+    changelog_parser.add_argument('action', choices=['prune'], help="prune - удалить старые записи")
+    changelog_parser.add_argument('--days', type=int, default=30,
+                                  help="сколько дней хранить записи (по умолчанию 30)")
+
+    migrate_parser = subparsers.add_parser('migrate', help="миграции схемы базы данных")
+    migrate_parser.add_argument('--status', action='store_true', help="показать примененные миграции")
+    migrate_parser.add_argument('--target', type=int, help="применить миграции до указанной версии")
+
+    replica_parser = subparsers.add_parser('replica', help="локальная реплика для чтения")
+    replica_parser.add_argument('action', choices=['sync', 'status'],
+                                help="sync - перенести изменения из MySQL, status - показать отставание")
+    replica_parser.add_argument('--full', action='store_true', help="скопировать коллекцию заново")
+
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'summaries':
+            return asyncio.run(summaries_command(args.action))
+        if args.command == 'search-index':
+            return asyncio.run(search_index_command(args.action))
+        if args.command == 'changelog':
+            return asyncio.run(changelog_command(args.days))
+        if args.command == 'migrate':
+            return asyncio.run(migrate_command(args.status, args.target))
+        if args.command == 'replica':
+            return asyncio.run(replica_command(args.action, args.full))
+    except Exception as e:
+        print(f"Ошибка выполнения команды: {e}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,7 @@
+"""
+Миграции схемы базы данных WINESTORE
+"""
+
+from .runner import MIGRATIONS, run_migrations, migration_status, pending_versions, migrate, status
+
+__all__ = ['MIGRATIONS', 'run_migrations', 'migration_status', 'pending_versions', 'migrate', 'status']
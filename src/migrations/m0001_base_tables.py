@@ -0,0 +1,44 @@
+"""
+Основные таблицы коллекции
+
+Таблицы создаются только в новой базе; в существующей базе миграция
+ничего не меняет.
+"""
+
+from models.backends.dialect import dialect_of
+
+VERSION = 1
+DESCRIPTION = "Таблицы WineBottle и WineLocation"
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS WineBottle (
+        BottleID {serial_key},
+        WineName VARCHAR(255) NOT NULL,
+        Producer VARCHAR(255),
+        Vintage INT,
+        Region VARCHAR(255),
+        PurchasePrice {money},
+        PurchaseDate DATE
+    ){table_options}
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS WineLocation (
+        LocationID {serial_key},
+        BottleID INT NOT NULL,
+        Shelf VARCHAR(100),
+        Rack VARCHAR(100),
+        Cellar VARCHAR(100),
+        Quantity INT NOT NULL DEFAULT 1,
+        CONSTRAINT fk_winelocation_bottle FOREIGN KEY (BottleID) REFERENCES WineBottle (BottleID)
+    ){table_options}
+    """,
+]
+
+
+async def upgrade(cursor):
+    dialect = dialect_of(cursor)
+    for statement in STATEMENTS:
+        await cursor.execute(statement.format(serial_key=dialect.serial_key(),
+                                              money=dialect.decimal(8, 2),
+                                              table_options=dialect.table_options))
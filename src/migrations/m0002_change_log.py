@@ -0,0 +1,12 @@
+"""
+Журнал изменений коллекции (версия коллекции для дашборда)
+"""
+
+from models import changelog
+
+VERSION = 2
+DESCRIPTION = "Журнал изменений WineChangeLog"
+
+
+async def upgrade(cursor):
+    await changelog.ensure_change_log_table(cursor)
@@ -0,0 +1,13 @@
+"""
+Сводные таблицы статистики с первичным заполнением
+"""
+
+from models import summary
+
+VERSION = 3
+DESCRIPTION = "Сводные таблицы WineStatsTotal, WineStatsRegion, WineStatsVintage"
+
+
+async def upgrade(cursor):
+    if await summary.ensure_summary_tables(cursor):
+        await summary.rebuild_summaries(cursor)
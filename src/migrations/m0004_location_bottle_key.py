@@ -0,0 +1,19 @@
+"""
+Уникальный ключ WineLocation.BottleID
+
+Нужен для обновления местоположения через INSERT ... ON DUPLICATE KEY
+UPDATE и для соединения WineBottle с WineLocation. Если у одной бутылки
+несколько местоположений, создается обычный индекс, а местоположение
+обновляется через DELETE и INSERT.
+"""
+
+from models import schema
+
+VERSION = 4
+DESCRIPTION = "Ключ WineLocation.BottleID"
+
+
+async def upgrade(cursor):
+    if not await schema.ensure_location_unique_key(cursor):
+        print("В WineLocation есть несколько записей для одной бутылки, создается неуникальный индекс")
+        await schema.ensure_index(cursor, 'WineLocation', 'idx_winelocation_bottle', 'BottleID')
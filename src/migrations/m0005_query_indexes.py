@@ -0,0 +1,31 @@
+"""
+Индексы для фильтров поиска, статистики и группировок экспорта
+
+Составные индексы начинаются с Region, Vintage, Producer и PurchasePrice,
+поэтому заменяют отдельные индексы по этим столбцам и покрывают запросы
+GROUP BY с AVG/SUM(PurchasePrice) без чтения строк таблицы.
+"""
+
+from models import schema
+
+VERSION = 5
+DESCRIPTION = "Индексы WineBottle по Region, Vintage, Producer и PurchasePrice"
+
+INDEXES = [
+    # search_wines: фильтр по региону и диапазону лет; get_regions
+    ('idx_winebottle_region_vintage', 'Region, Vintage'),
+    # экспорт: статистика по регионам
+    ('idx_winebottle_region_price', 'Region, PurchasePrice'),
+    # search_wines и экспорт: фильтр по годам, статистика по годам,
+    # ORDER BY Vintage DESC, PurchasePrice DESC в выгрузке Excel
+    ('idx_winebottle_vintage_price', 'Vintage, PurchasePrice'),
+    # экспорт: статистика по производителям
+    ('idx_winebottle_producer_price', 'Producer, PurchasePrice'),
+    # экспорт: ценовые диапазоны, сумма стоимости коллекции
+    ('idx_winebottle_price', 'PurchasePrice'),
+]
+
+
+async def upgrade(cursor):
+    for index_name, columns in INDEXES:
+        await schema.ensure_index(cursor, 'WineBottle', index_name, columns)
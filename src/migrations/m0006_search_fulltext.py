@@ -0,0 +1,12 @@
+"""
+Полнотекстовый индекс (ngram) для быстрого поиска
+"""
+
+from models import schema
+
+VERSION = 6
+DESCRIPTION = "Полнотекстовый индекс ft_winebottle_search"
+
+
+async def upgrade(cursor):
+    await schema.ensure_search_index(cursor)
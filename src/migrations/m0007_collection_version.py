@@ -0,0 +1,12 @@
+"""
+Счетчик версии коллекции, растущий в порядке фиксации транзакций
+"""
+
+from models import changelog
+
+VERSION = 7
+DESCRIPTION = "Счетчик версии WineCollectionVersion"
+
+
+async def upgrade(cursor):
+    await changelog.ensure_collection_version(cursor)
@@ -0,0 +1,124 @@
+"""
+Применение версионированных миграций схемы
+
+Примененные версии хранятся в таблице SchemaVersion. Запуск идемпотентен:
+применяются только отсутствующие версии по возрастанию, а одновременный
+запуск с нескольких клиентов упорядочивается блокировкой GET_LOCK (в SQLite -
+транзакцией BEGIN IMMEDIATE).
+"""
+
+from migrations import (m0001_base_tables, m0002_change_log, m0003_summary_tables,
+                        m0004_location_bottle_key, m0005_query_indexes, m0006_search_fulltext,
+                        m0007_collection_version)
+from models.backends.base import create_backend
+from models.backends.dialect import dialect_of
+
+MIGRATIONS = sorted([
+    m0001_base_tables,
+    m0002_change_log,
+    m0003_summary_tables,
+    m0004_location_bottle_key,
+    m0005_query_indexes,
+    m0006_search_fulltext,
+    m0007_collection_version,
+], key=lambda migration: migration.VERSION)
+
+SCHEMA_VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS SchemaVersion (
+    Version INT NOT NULL PRIMARY KEY,
+    Description VARCHAR(255) NOT NULL,
+    AppliedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+){table_options}
+"""
+
+LOCK_NAME = 'winestore_schema_migrations'
+LOCK_TIMEOUT = 60  # в секундах
+
+if len({migration.VERSION for migration in MIGRATIONS}) != len(MIGRATIONS):
+    raise RuntimeError("Номера версий миграций повторяются")
+
+
+async def get_applied_versions(cursor):
+    """Словарь примененных версий: версия -> время применения"""
+    await cursor.execute(SCHEMA_VERSION_DDL.format(table_options=dialect_of(cursor).table_options))
+    await cursor.execute("SELECT Version, AppliedAt FROM SchemaVersion")
+    return {row[0]: row[1] for row in await cursor.fetchall()}
+
+
+async def run_migrations(conn, target=None):
+    """Применение недостающих миграций на соединении conn (в режиме autocommit)
+
+    target - последняя применяемая версия (по умолчанию все).
+    Возвращает список примененных версий.
+    """
+    applied_now = []
+    async with conn.cursor() as cursor:
+        dialect = dialect_of(cursor)
+        if not await dialect.lock(cursor, LOCK_NAME, LOCK_TIMEOUT):
+            raise RuntimeError("Не удалось получить блокировку миграций схемы")
+
+        try:
+            applied = await get_applied_versions(cursor)
+            for migration in MIGRATIONS:
+                if migration.VERSION in applied:
+                    continue
+                if target is not None and migration.VERSION > target:
+                    break
+
+                print(f"Применение миграции {migration.VERSION:04d}: {migration.DESCRIPTION}")
+                # DDL в MySQL фиксируется сразу (а в SQLite блокировка
+                # снимается фиксацией), поэтому миграции пишутся
+                # идемпотентными и безопасно повторяются после сбоя
+                await migration.upgrade(cursor)
+                await cursor.execute(
+                    "INSERT INTO SchemaVersion (Version, Description) VALUES (%s, %s)",
+                    (migration.VERSION, migration.DESCRIPTION)
+                )
+                applied_now.append(migration.VERSION)
+        finally:
+            await dialect.unlock(cursor, LOCK_NAME)
+
+    return applied_now
+
+
+async def migration_status(conn):
+    """Состояние миграций: список (версия, описание, время применения или None)"""
+    async with conn.cursor() as cursor:
+        applied = await get_applied_versions(cursor)
+    return [(migration.VERSION, migration.DESCRIPTION, applied.get(migration.VERSION))
+            for migration in MIGRATIONS]
+
+
+async def pending_versions(conn):
+    """Версии миграций, еще не примененных к базе (схема не изменяется)"""
+    async with conn.cursor() as cursor:
+        try:
+            await cursor.execute("SELECT Version FROM SchemaVersion")
+            applied = {row[0] for row in await cursor.fetchall()}
+        except Exception:
+            # Таблицы SchemaVersion еще нет - миграции не применялись
+            applied = set()
+    return [migration.VERSION for migration in MIGRATIONS if migration.VERSION not in applied]
+
+
+async def connect():
+    """Отдельное соединение для миграций с параметрами из Config"""
+    return await create_backend().connect(autocommit=True)
+
+
+async def migrate(target=None):
+    """Применение миграций через отдельное соединение"""
+    conn = await connect()
+    try:
+        return await run_migrations(conn, target)
+    finally:
+        await conn.ensure_closed()
+
+
+async def status():
+    """Получение состояния миграций через отдельное соединение"""
+    conn = await connect()
+    try:
+        return await migration_status(conn)
+    finally:
+        await conn.ensure_closed()
@@ -0,0 +1,49 @@
+"""
+Выбор базы данных приложения
+
+DB_BACKEND=mysql - сервер MySQL/MariaDB через asyncmy, DB_BACKEND=sqlite -
+локальный файл SQLITE_PATH без сервера (для работы без сети и для
+воспроизводимых замеров производительности).
+"""
+
+from utils.config import Config
+
+
+class Backend:
+    """Источник соединений с базой данных
+
+    Соединения поддерживают тот же набор операций, что и соединения
+    asyncmy: cursor(), begin(), commit(), rollback(), ping(),
+    ensure_closed() и close().
+    """
+
+    name = None
+    dialect = None
+    # Класс курсора для потокового чтения (None - обычный курсор)
+    streaming_cursor = None
+
+    async def connect(self, autocommit=True):
+        """Открытие нового соединения"""
+        raise NotImplementedError
+
+    def describe(self):
+        """Описание базы данных для сообщений"""
+        return self.name
+
+
+def create_backend(db_config=None):
+    """Создание источника соединений по параметрам db_config
+
+    Тип базы берется из ключа 'backend' или настройки DB_BACKEND.
+    """
+    db_config = dict(Config.get_db_config() if db_config is None else db_config)
+    name = (db_config.pop('backend', None) or Config.DB_BACKEND).lower()
+
+    if name == 'sqlite':
+        from models.backends.sqlite import SQLiteBackend
+        return SQLiteBackend(db_config.get('sqlite_path') or Config.SQLITE_PATH)
+    if name == 'mysql':
+        # asyncmy нужен только для работы с сервером MySQL
+        from models.backends.mysql import MySQLBackend
+        return MySQLBackend(db_config)
+    raise ValueError(f"Неизвестный тип базы данных: {name}")
@@ -0,0 +1,192 @@
+"""
+Различия SQL между MySQL и SQLite
+
+Запросы приложения пишутся на общем подмножестве SQL с параметрами %s;
+здесь собраны конструкции, которые в MySQL и SQLite записываются
+по-разному: DDL, upsert, блокировки, проверка индексов и план запроса.
+"""
+
+import json
+
+
+class MySQLDialect:
+    """Диалект MySQL/MariaDB (InnoDB)"""
+
+    name = 'mysql'
+    table_options = " ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+    for_update = " FOR UPDATE"
+    supports_fulltext = True
+
+    def serial_key(self, big=False):
+        """Определение автоинкрементного первичного ключа"""
+        column_type = "BIGINT UNSIGNED" if big else "INT"
+        return f"{column_type} NOT NULL AUTO_INCREMENT PRIMARY KEY"
+
+    def decimal(self, precision, scale):
+        """Тип денежного столбца"""
+        return f"DECIMAL({precision}, {scale})"
+
+    def upsert(self, keys, increment=(), replace=()):
+        """Окончание INSERT, обновляющее существующую строку
+
+        increment - столбцы, к которым прибавляются новые значения,
+        replace - столбцы, заменяемые новыми значениями.
+        """
+        assignments = [f"{column} = {column} + VALUES({column})" for column in increment]
+        assignments += [f"{column} = VALUES({column})" for column in replace]
+        return " ON DUPLICATE KEY UPDATE " + ", ".join(assignments)
+
+    def days_ago(self, placeholder='%s'):
+        """Выражение для момента placeholder дней назад"""
+        return f"NOW() - INTERVAL {placeholder} DAY"
+
+    def add_index_sql(self, table, index_name, columns, kind='INDEX'):
+        return f"ALTER TABLE {table} ADD {kind} {index_name} ({columns})"
+
+    async def has_index(self, cursor, table, index_name):
+        await cursor.execute(
+            """
+            SELECT COUNT(*) FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+            """,
+            (table, index_name)
+        )
+        row = await cursor.fetchone()
+        return bool(row and row[0])
+
+    async def has_unique_key(self, cursor, table, column):
+        """Проверка наличия уникального ключа, состоящего только из column"""
+        await cursor.execute(
+            """
+            SELECT INDEX_NAME FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND NON_UNIQUE = 0
+            GROUP BY INDEX_NAME
+            HAVING COUNT(*) = 1 AND MAX(COLUMN_NAME) = %s
+            """,
+            (table, column)
+        )
+        return bool(await cursor.fetchall())
+
+    async def lock(self, cursor, name, timeout):
+        """Получение именованной блокировки (True, если получена)"""
+        await cursor.execute("SELECT GET_LOCK(%s, %s)", (name, timeout))
+        row = await cursor.fetchone()
+        return bool(row and row[0] == 1)
+
+    async def unlock(self, cursor, name):
+        await cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+        await cursor.fetchone()
+
+    async def begin_snapshot(self, cursor):
+        """Начало транзакции только для чтения с согласованным снимком данных
+
+        Снимок принадлежит одному сеансу: MySQL не позволяет открыть тот же
+        снимок в другом соединении, а совпадение версий коллекции в
+        нескольких снимках не доказывает их равенства (изменения в обход
+        журнала версию не меняют). Поэтому все чтения, которые должны
+        описывать одно состояние, выполняются в одном соединении.
+        """
+        await cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        await cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+
+    async def auto_increment_step(self, cursor):
+        """Шаг автоинкремента текущего сеанса"""
+        await cursor.execute("SELECT @@SESSION.auto_increment_increment")
+        return (await cursor.fetchone())[0]
+
+    def first_insert_id(self, cursor, count, step=1):
+        """ID первой строки многострочного INSERT
+
+        Для многострочного INSERT с известным числом строк InnoDB выделяет
+        идущие подряд ID, lastrowid - ID первой строки.
+        """
+        return cursor.lastrowid
+
+    async def explain(self, cursor, query, params):
+        """План выполнения запроса"""
+        await cursor.execute("EXPLAIN FORMAT=JSON " + query, params or ())
+        row = await cursor.fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+
+class SQLiteDialect:
+    """Диалект встроенной базы SQLite"""
+
+    name = 'sqlite'
+    table_options = ""
+    # Транзакция на запись (BEGIN IMMEDIATE) и так блокирует базу целиком
+    for_update = ""
+    supports_fulltext = False
+
+    def serial_key(self, big=False):
+        # Только INTEGER PRIMARY KEY становится псевдонимом rowid
+        return "INTEGER PRIMARY KEY AUTOINCREMENT"
+
+    def decimal(self, precision, scale):
+        # С типом DECIMAL (NUMERIC) целые суммы хранились бы как INTEGER
+        # и деление в запросах становилось бы целочисленным
+        return "REAL"
+
+    def upsert(self, keys, increment=(), replace=()):
+        assignments = [f"{column} = {column} + excluded.{column}" for column in increment]
+        assignments += [f"{column} = excluded.{column}" for column in replace]
+        return f" ON CONFLICT ({keys}) DO UPDATE SET " + ", ".join(assignments)
+
+    def days_ago(self, placeholder='%s'):
+        return f"datetime('now', '-' || {placeholder} || ' days')"
+
+    def add_index_sql(self, table, index_name, columns, kind='INDEX'):
+        kind = kind.upper()
+        if 'FULLTEXT' in kind:
+            raise NotImplementedError("SQLite не поддерживает полнотекстовые индексы")
+        unique = "UNIQUE " if 'UNIQUE' in kind else ""
+        return f"CREATE {unique}INDEX IF NOT EXISTS {index_name} ON {table} ({columns})"
+
+    async def has_index(self, cursor, table, index_name):
+        await cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+            (table, index_name)
+        )
+        row = await cursor.fetchone()
+        return bool(row and row[0])
+
+    async def has_unique_key(self, cursor, table, column):
+        await cursor.execute(f"PRAGMA index_list({table})")
+        unique_indexes = [row[1] for row in await cursor.fetchall() if row[2]]
+        for index_name in unique_indexes:
+            await cursor.execute(f"PRAGMA index_info({index_name})")
+            if [row[2] for row in await cursor.fetchall()] == [column]:
+                return True
+        return False
+
+    async def lock(self, cursor, name, timeout):
+        # Именованных блокировок нет - запись в файл сериализуется транзакцией
+        await cursor.execute("BEGIN IMMEDIATE")
+        return True
+
+    async def unlock(self, cursor, name):
+        await cursor.execute("COMMIT")
+
+    async def begin_snapshot(self, cursor):
+        # В режиме WAL снимок фиксируется первым чтением в транзакции
+        await cursor.execute("BEGIN")
+
+    async def auto_increment_step(self, cursor):
+        return 1
+
+    def first_insert_id(self, cursor, count, step=1):
+        # lastrowid в SQLite - ID последней вставленной строки
+        return cursor.lastrowid - (count - 1) * step
+
+    async def explain(self, cursor, query, params):
+        await cursor.execute("EXPLAIN QUERY PLAN " + query, params or ())
+        return [{'id': row[0], 'parent': row[1], 'detail': row[3]} for row in await cursor.fetchall()]
+
+
+MYSQL = MySQLDialect()
+SQLITE = SQLiteDialect()
+
+
+def dialect_of(cursor):
+    """Диалект соединения курсора (курсоры asyncmy - MySQL)"""
+    return getattr(cursor, 'dialect', MYSQL)
@@ -0,0 +1,9 @@
+"""
+Базы данных WINESTORE: сервер MySQL и локальный файл SQLite
+"""
+
+from .base import Backend, create_backend
+from .dialect import MySQLDialect, SQLiteDialect, dialect_of
+from .sqlite import SQLiteBackend
+
+__all__ = ['Backend', 'create_backend', 'MySQLDialect', 'SQLiteDialect', 'dialect_of', 'SQLiteBackend']
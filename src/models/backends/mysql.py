@@ -0,0 +1,30 @@
+"""
+Сервер MySQL/MariaDB через asyncmy
+"""
+
+import asyncmy
+from asyncmy.cursors import SSCursor
+from models.backends.base import Backend
+from models.backends.dialect import MYSQL
+
+# Параметры db_config, которые передаются в asyncmy.connect
+CONNECT_PARAMS = ('host', 'port', 'user', 'password', 'db', 'charset')
+
+
+class MySQLBackend(Backend):
+    """Соединения asyncmy с сервером MySQL"""
+
+    name = 'mysql'
+    dialect = MYSQL
+    # Небуферизованный серверный курсор
+    streaming_cursor = SSCursor
+
+    def __init__(self, db_config):
+        self.connection_params = {key: db_config[key] for key in CONNECT_PARAMS if key in db_config}
+        self.connection_params.setdefault('charset', 'utf8mb4')
+
+    async def connect(self, autocommit=True):
+        return await asyncmy.connect(**self.connection_params, autocommit=autocommit)
+
+    def describe(self):
+        return f"MySQL {self.connection_params.get('host')}/{self.connection_params.get('db')}"
@@ -0,0 +1,208 @@
+"""
+Встроенная база SQLite
+
+Модуль sqlite3 синхронный, поэтому каждое соединение работает в своем
+потоке (ThreadPoolExecutor на один поток), а наружу предоставляет
+асинхронный интерфейс соединений asyncmy. Параметры %s в запросах
+заменяются на ?, файл базы открывается в режиме WAL, чтобы чтение не
+блокировалось записью.
+"""
+
+import asyncio
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from functools import partial
+from models.backends.base import Backend
+from models.backends.dialect import SQLITE
+
+BUSY_TIMEOUT = 30  # в секундах
+
+_PLACEHOLDER = re.compile(r'%([s%])')
+
+
+def _convert_date(value):
+    try:
+        return date.fromisoformat(value.decode())
+    except ValueError:
+        return value.decode()
+
+
+def _convert_timestamp(value):
+    try:
+        return datetime.fromisoformat(value.decode())
+    except ValueError:
+        return value.decode()
+
+
+# Типы значений как в asyncmy: DATE и TIMESTAMP читаются как date/datetime
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('DATE', _convert_date)
+sqlite3.register_converter('TIMESTAMP', _convert_timestamp)
+
+
+def translate_query(query, params):
+    """Замена параметров %s на ? (и %% на %, как при подстановке в asyncmy)"""
+    if params is None:
+        return query, ()
+    return _PLACEHOLDER.sub(lambda match: '?' if match.group(1) == 's' else '%', query), tuple(params)
+
+
+def _open(path):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, detect_types=sqlite3.PARSE_DECLTYPES,
+                           isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+class SQLiteCursor:
+    """Асинхронный курсор поверх sqlite3.Cursor"""
+
+    dialect = SQLITE
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._cursor = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount if self._cursor is not None else -1
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid if self._cursor is not None else None
+
+    def _execute(self, query, params):
+        raw = self.connection.raw
+        if not self.connection.autocommit_mode and not raw.in_transaction:
+            # Без autocommit запросы выполняются в неявной транзакции, как в MySQL
+            raw.execute("BEGIN")
+        self._cursor = raw.execute(query, params)
+        return self._cursor.rowcount
+
+    async def execute(self, query, params=None):
+        query, params = translate_query(query, params)
+        return await self.connection.run(self._execute, query, params)
+
+    def _executemany(self, query, rows):
+        raw = self.connection.raw
+        if not self.connection.autocommit_mode and not raw.in_transaction:
+            raw.execute("BEGIN")
+        self._cursor = raw.executemany(query, rows)
+        return self._cursor.rowcount
+
+    async def executemany(self, query, rows):
+        query, _ = translate_query(query, ())
+        return await self.connection.run(self._executemany, query, [tuple(row) for row in rows])
+
+    async def fetchone(self):
+        if self._cursor is None:
+            return None
+        return await self.connection.run(self._cursor.fetchone)
+
+    async def fetchmany(self, size=None):
+        if self._cursor is None:
+            return []
+        return await self.connection.run(self._cursor.fetchmany, size or self._cursor.arraysize)
+
+    async def fetchall(self):
+        if self._cursor is None:
+            return []
+        return await self.connection.run(self._cursor.fetchall)
+
+    async def close(self):
+        if self._cursor is not None:
+            cursor, self._cursor = self._cursor, None
+            await self.connection.run(cursor.close)
+
+
+class SQLiteConnection:
+    """Соединение с файлом SQLite с интерфейсом соединения asyncmy"""
+
+    def __init__(self, raw, executor, autocommit=True):
+        self.raw = raw
+        self.autocommit_mode = autocommit
+        self._executor = executor
+
+    @classmethod
+    async def open(cls, path, autocommit=True):
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite')
+        try:
+            raw = await asyncio.get_running_loop().run_in_executor(executor, _open, path)
+        except Exception:
+            executor.shutdown(wait=False)
+            raise
+        return cls(raw, executor, autocommit)
+
+    async def run(self, func, *args):
+        """Выполнение вызова sqlite3 в потоке соединения"""
+        if self.raw is None:
+            raise sqlite3.ProgrammingError("Соединение закрыто")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args))
+
+    def cursor(self, cursor_class=None):
+        # Курсор sqlite3 и так читает результат постепенно, отдельный
+        # потоковый курсор (SSCursor) не нужен
+        return SQLiteCursor(self)
+
+    async def begin(self):
+        """Начало транзакции на запись"""
+        await self.run(self.raw.execute, "BEGIN IMMEDIATE")
+
+    def _finish(self, statement):
+        if self.raw.in_transaction:
+            self.raw.execute(statement)
+
+    async def commit(self):
+        await self.run(self._finish, "COMMIT")
+
+    async def rollback(self):
+        await self.run(self._finish, "ROLLBACK")
+
+    async def ping(self, reconnect=False):
+        await self.run(self.raw.execute, "SELECT 1")
+
+    async def ensure_closed(self):
+        if self.raw is None:
+            return
+        try:
+            await self.run(self.raw.close)
+        finally:
+            self.raw = None
+            self._executor.shutdown(wait=False)
+
+    def close(self):
+        """Закрытие без ожидания (из другого цикла событий)"""
+        if self.raw is None:
+            return
+        raw, self.raw = self.raw, None
+        self._executor.submit(raw.close)
+        self._executor.shutdown(wait=False)
+
+
+class SQLiteBackend(Backend):
+    """Соединения с локальным файлом SQLite"""
+
+    name = 'sqlite'
+    dialect = SQLITE
+
+    def __init__(self, path):
+        self.path = path
+
+    async def connect(self, autocommit=True):
+        return await SQLiteConnection.open(self.path, autocommit)
+
+    def describe(self):
+        return f"SQLite {self.path}"
@@ -0,0 +1,111 @@
+"""
+Журнал изменений коллекции
+
+Каждая транзакция изменения WineBottle добавляет в WineChangeLog строку
+на каждую затронутую запись и увеличивает счетчик WineCollectionVersion.
+Счетчик служит версией коллекции: клиенты сравнивают его с последней
+известной версией и перечитывают данные только при ее изменении.
+
+Наибольший ChangeID версией быть не может: значения автоинкремента
+выдаются при INSERT, а транзакции фиксируются в другом порядке, и
+изменение с меньшим ChangeID, зафиксированное позже, не меняет MAX.
+Строка счетчика блокируется обновлением до конца транзакции, поэтому
+версия растет в порядке фиксации.
+"""
+
+from models import schema
+from models.backends.dialect import dialect_of
+
+CHANGE_LOG_DDL = """
+CREATE TABLE IF NOT EXISTS WineChangeLog (
+    ChangeID {serial_key},
+    BottleID INT NOT NULL,
+    Operation VARCHAR(10) NOT NULL,
+    ChangedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+){table_options}
+"""
+CHANGED_AT_INDEX_NAME = 'idx_winechangelog_changedat'
+
+COLLECTION_VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS WineCollectionVersion (
+    Id INT NOT NULL PRIMARY KEY,
+    Version BIGINT NOT NULL
+){table_options}
+"""
+
+OPERATION_INSERT = 'insert'
+OPERATION_UPDATE = 'update'
+OPERATION_DELETE = 'delete'
+
+
+async def ensure_change_log_table(cursor):
+    """Создание таблицы журнала изменений, если ее нет"""
+    dialect = dialect_of(cursor)
+    await cursor.execute(CHANGE_LOG_DDL.format(serial_key=dialect.serial_key(big=True),
+                                               table_options=dialect.table_options))
+    await schema.ensure_index(cursor, 'WineChangeLog', CHANGED_AT_INDEX_NAME, 'ChangedAt')
+
+
+async def ensure_collection_version(cursor):
+    """Создание счетчика версии коллекции
+
+    Счетчик начинается с наибольшего ChangeID, чтобы версия не
+    уменьшилась для клиентов, запомнивших ее до появления счетчика.
+    """
+    await cursor.execute(COLLECTION_VERSION_DDL.format(table_options=dialect_of(cursor).table_options))
+    await cursor.execute("SELECT COUNT(*) FROM WineCollectionVersion WHERE Id = 1")
+    if not (await cursor.fetchone())[0]:
+        await cursor.execute(
+            "INSERT INTO WineCollectionVersion (Id, Version) "
+            "SELECT 1, COALESCE(MAX(ChangeID), 0) FROM WineChangeLog"
+        )
+
+
+async def record_changes(cursor, bottle_ids, operation, chunk_size=None):
+    """Запись изменений в журнал и увеличение версии внутри транзакции изменения
+
+    Вызывается последним запросом транзакции: строка счетчика остается
+    заблокированной до фиксации, а ChangeID, выданный незадолго до
+    фиксации, реже оказывается меньше уже зафиксированных. Строки
+    журнала вставляются многострочными INSERT по chunk_size строк.
+    """
+    if not bottle_ids:
+        return
+
+    await cursor.execute("UPDATE WineCollectionVersion SET Version = Version + 1 WHERE Id = 1")
+    chunk_size = chunk_size or len(bottle_ids)
+    for start in range(0, len(bottle_ids), chunk_size):
+        chunk = bottle_ids[start:start + chunk_size]
+        query = (
+            "INSERT INTO WineChangeLog (BottleID, Operation) VALUES "
+            + ", ".join(["(%s, %s)"] * len(chunk))
+        )
+        await cursor.execute(query, [value for bottle_id in chunk for value in (bottle_id, operation)])
+
+
+async def get_version(cursor):
+    """Текущая версия коллекции (0, если изменений еще не было)"""
+    await cursor.execute("SELECT Version FROM WineCollectionVersion WHERE Id = 1")
+    row = await cursor.fetchone()
+    return int(row[0]) if row else 0
+
+
+async def get_last_change_id(cursor):
+    """Наибольший ChangeID журнала (0, если журнал пуст)"""
+    await cursor.execute("SELECT COALESCE(MAX(ChangeID), 0) FROM WineChangeLog")
+    row = await cursor.fetchone()
+    return int(row[0]) if row else 0
+
+
+async def prune_change_log(cursor, keep_days):
+    """Удаление записей журнала старше keep_days дней
+
+    Последняя запись сохраняется всегда, чтобы наибольший ChangeID не
+    уменьшался. Возвращает количество удаленных записей.
+    """
+    last_change_id = await get_last_change_id(cursor)
+    await cursor.execute(
+        f"DELETE FROM WineChangeLog WHERE ChangeID < %s AND ChangedAt < {dialect_of(cursor).days_ago('%s')}",
+        (last_change_id, int(keep_days))
+    )
+    return cursor.rowcount
@@ -1,29 +1,146 @@
 import asyncio
-import asyncmy
-from PyQt6.QtCore import QThread, pyqtSignal
+import base64
+import time
+from contextlib import asynccontextmanager
+from PyQt6.QtCore import QObject, pyqtSignal
 from datetime import datetime
+from models.backends.base import create_backend
+from models.loop_service import AsyncLoopService
+from models.pool import ConnectionPool
+from models.query_cache import QueryCache
+from models.replica import LocalReplica
+from models import changelog, schema, summary
+from migrations.runner import pending_versions, run_migrations
+from utils.config import Config
+from utils.metrics import MetricsRegistry, query_name
+from utils.slow_query import SlowQueryLog
 
-class DatabaseWorker(QThread):
+WINE_SELECT_QUERY = """
+SELECT wb.BottleID, wb.WineName, wb.Producer, wb.Vintage, 
+       wb.Region, wb.PurchasePrice, wb.PurchaseDate,
+       wl.Shelf, wl.Rack, wl.Cellar
+FROM WineBottle wb
+LEFT JOIN WineLocation wl ON wb.BottleID = wl.BottleID
+"""
+
+
+# Поля записи (формат row_to_wine) и соответствующие столбцы WineBottle
+BOTTLE_UPDATE_COLUMNS = {
+    'Varietal': 'WineName',
+    'Producer': 'Producer',
+    'VintageYear': 'Vintage',
+    'Region': 'Region',
+    'Price': 'PurchasePrice',
+    'PurchaseDate': 'PurchaseDate',
+}
+# Поля, от которых зависят сводные таблицы статистики
+SUMMARY_FIELDS = ('VintageYear', 'Region', 'Price')
+LOCATION_FIELDS = ('Shelf', 'Rack', 'Cellar')
+
+
+def row_to_wine(row):
+    """Преобразование строки запроса WINE_SELECT_QUERY в словарь"""
+    return {
+        'BottleID': row[0],
+        'Varietal': row[1] or '',
+        'Producer': row[2] or '',
+        'VintageYear': row[3] or '',
+        'Region': row[4] or '',
+        'Price': float(row[5]) if row[5] else 0.0,
+        'PurchaseDate': row[6],
+        'Shelf': row[7] or '',
+        'Rack': row[8] or '',
+        'Cellar': row[9] or '',
+        'Status': 'in_storage',
+        'SerialNumber': str(row[0]),
+        'Volume': 750
+    }
+
+
+def encode_page_cursor(bottle_id):
+    """Кодирование курсора страницы (последний BottleID страницы)"""
+    return base64.urlsafe_b64encode(f"bottle:{bottle_id}".encode()).decode()
+
+
+def decode_page_cursor(cursor):
+    """Декодирование курсора страницы в BottleID"""
+    try:
+        prefix, value = base64.urlsafe_b64decode(cursor.encode()).decode().split(':', 1)
+        if prefix != 'bottle':
+            raise ValueError(prefix)
+        return int(value)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Некорректный курсор страницы: {cursor}") from e
+
+
+class DatabaseWorker(QObject):
+    """Выполнение корутины в общем фоновом цикле событий
+
+    Результат передается через сигналы finished/error, которые Qt
+    доставляет в поток получателя.
+    """
     finished = pyqtSignal(object)
     error = pyqtSignal(str)
+    # Испускается после finished/error; слот выполняется в потоке объекта
+    # после слотов результата, и только тогда объект перестает удерживаться
+    _released = pyqtSignal()
+
+    # Ссылки на выполняющиеся задачи, чтобы объект не был удален до их завершения
+    _active = set()
     
     def __init__(self, coroutine, *args, **kwargs):
         super().__init__()
         self.coroutine = coroutine
         self.args = args
         self.kwargs = kwargs
+        self.future = None
+        self._released.connect(self._release)
         
-    def run(self):
+    def start(self):
+        """Отправка корутины в фоновый цикл событий"""
+        DatabaseWorker._active.add(self)
+        self.future = AsyncLoopService.instance().submit(self.coroutine(*self.args, **self.kwargs))
+        self.future.add_done_callback(self._on_done)
+        return self.future
+
+    def isRunning(self):
+        return self.future is not None and not self.future.done()
+
+    def cancel(self):
+        """Отмена выполнения корутины"""
+        if self.future is not None:
+            self.future.cancel()
+
+    def _on_done(self, future):
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            result = loop.run_until_complete(self.coroutine(*self.args, **self.kwargs))
-            self.finished.emit(result)
-        except Exception as e:
-            self.error.emit(str(e))
+            if future.cancelled():
+                return
+            exception = future.exception()
+            if exception is not None:
+                self.error.emit(str(exception))
+            else:
+                self.finished.emit(future.result())
+        finally:
+            # Вызывается в потоке цикла событий: последняя ссылка на объект
+            # освобождается не здесь, а в его потоке
+            self._released.emit()
+
+    def _release(self):
+        DatabaseWorker._active.discard(self)
 
 class AsyncDatabaseManager:
-    def __init__(self):
+    # Миграции схемы применяются один раз на процесс
+    _schema_ready = False
+    # Наличие полнотекстового индекса (None - еще не проверялось)
+    _fulltext_available = None
+    # Есть ли уникальный ключ WineLocation.BottleID для upsert местоположения
+    _location_upsert = False
+    # Выполняющиеся SELECT, общие для всех менеджеров: ключ -> asyncio.Task
+    _in_flight = {}
+    _in_flight_metrics = {'executed': 0, 'coalesced': 0}
+    
+    def __init__(self, pool_min_size=None, pool_max_size=None,
+                 pool_idle_timeout=None, pool_health_check_interval=None, backend=None):
         self.connection_params = {
             'host': 'localhost',
             'user': 'maksim',
@@ -31,317 +148,838 @@ class AsyncDatabaseManager:
             'db': 'is21-18',
             'charset': 'utf8mb4'
         }
+        # MySQL или локальный файл SQLite (настройка DB_BACKEND)
+        self.backend = backend or create_backend(self.connection_params)
+        self.dialect = self.backend.dialect
+        # Соединения пула работают в режиме autocommit, транзакции
+        # на запись открываются явно через begin()
+        self.pool = ConnectionPool(
+            {'autocommit': True},
+            min_size=Config.DB_POOL_MIN_SIZE if pool_min_size is None else pool_min_size,
+            max_size=Config.DB_POOL_MAX_SIZE if pool_max_size is None else pool_max_size,
+            idle_timeout=Config.DB_POOL_IDLE_TIMEOUT if pool_idle_timeout is None else pool_idle_timeout,
+            health_check_interval=(Config.DB_POOL_HEALTH_CHECK_INTERVAL
+                                   if pool_health_check_interval is None
+                                   else pool_health_check_interval),
+            connect=self.backend.connect
+        )
+        AsyncLoopService.instance().add_shutdown_hook(self.close)
+        
+        # Локальная реплика для чтения (READ_REPLICA), изменения пишутся в MySQL
+        self.replica = None
+        if Config.READ_REPLICA and self.backend.name == 'mysql':
+            self.replica = LocalReplica.shared()
+        
+        # Кэш результатов запросов и записей по BottleID, общий для всех менеджеров
+        self.cache = QueryCache.shared()
+        self.metrics = MetricsRegistry.instance()
+        self.slow_query_log = SlowQueryLog.instance()
+
+    def get_pool_metrics(self):
+        """Получение метрик пула соединений"""
+        return self.pool.get_metrics()
+
+    def get_replica_metrics(self):
+        """Получение состояния локальной реплики (None, если она не используется)"""
+        return self.replica.get_metrics() if self.replica is not None else None
 
-    async def _get_connection(self):
-        """Создание нового соединения"""
+    def get_cache_metrics(self):
+        """Получение счетчиков попаданий и промахов кэша запросов
+
+        executed и coalesced - число SELECT, выполненных в БД и
+        присоединенных к уже выполняющемуся одинаковому запросу.
+        """
+        metrics = self.cache.get_metrics()
+        metrics.update(AsyncDatabaseManager._in_flight_metrics)
+        metrics['in_flight'] = len(AsyncDatabaseManager._in_flight)
+        return metrics
+
+    def _use_replica(self):
+        """Читать ли из локальной реплики (она заполнена и не отстает от
+        изменений, сделанных через приложение)"""
+        return self.replica is not None and self.replica.usable
+
+    def _invalidate(self):
+        """Сброс кэша после изменения данных и запрос синхронизации реплики"""
+        self.cache.invalidate()
+        if self.replica is not None:
+            self.replica.request_sync()
+
+    @asynccontextmanager
+    async def _timed_connection(self, name, replica=False):
+        """Соединение из пула с учетом метрик запроса name
+
+        Возвращает пару (соединение, измеритель); время получения
+        соединения учитывается как фаза connect, ошибки внутри блока -
+        как ошибки запроса. replica - соединение с локальной репликой.
+        """
+        pool = self.replica.pool if replica else self.pool
+        with self.metrics.query_timer(name) as timer:
+            started = time.perf_counter()
+            async with pool.connection() as conn:
+                timer.observe('connect', time.perf_counter() - started)
+                yield conn, timer
+
+    async def close(self):
+        """Закрытие соединений пула"""
+        await self.pool.close()
+
+    async def _ensure_schema(self):
+        """Применение миграций схемы (журнал изменений, сводные таблицы, индексы)
+
+        При DB_AUTO_MIGRATE=false схема не изменяется: проверяется только,
+        что все миграции уже применены (иначе RuntimeError).
+        """
+        if AsyncDatabaseManager._schema_ready:
+            return
+        
+        async with self.pool.connection() as conn:
+            if Config.DB_AUTO_MIGRATE:
+                await run_migrations(conn)
+            else:
+                pending = await pending_versions(conn)
+                if pending:
+                    raise RuntimeError(
+                        "Схема базы данных устарела, не применены миграции "
+                        f"{', '.join(map(str, pending))}: выполните python src/manage.py migrate"
+                    )
+            async with conn.cursor() as cursor:
+                AsyncDatabaseManager._location_upsert = await schema.has_location_unique_key(cursor)
+        if not AsyncDatabaseManager._location_upsert:
+            print("Местоположение будет обновляться через DELETE и INSERT")
+        # Миграции могли создать полнотекстовый индекс - проверим заново
+        AsyncDatabaseManager._fulltext_available = None
+        AsyncDatabaseManager._schema_ready = True
+
+    async def rebuild_summaries(self):
+        """Полный пересчет сводных таблиц статистики"""
         try:
-            return await asyncmy.connect(**self.connection_params)
+            async with self.pool.connection() as conn:
+                async with conn.cursor() as cursor:
+                    await summary.ensure_summary_tables(cursor)
+                    await conn.begin()
+                    await summary.rebuild_summaries(cursor)
+                    await conn.commit()
+            self._invalidate()
+            return True
         except Exception as e:
-            print(f"Ошибка подключения к базе данных: {e}")
-            return None
+            print(f"Ошибка пересчета сводных таблиц: {e}")
+            return False
 
-    async def execute_query(self, query, params=None):
-        """Асинхронное выполнение SQL запроса"""
-        conn = None
-        try:
-            conn = await self._get_connection()
-            if not conn:
-                return None
-                
+    async def verify_summaries(self):
+        """Проверка сводных таблиц, возвращает список расхождений"""
+        async with self.pool.connection() as conn:
             async with conn.cursor() as cursor:
-                await cursor.execute(query, params or ())
-                if query.strip().upper().startswith('SELECT'):
-                    result = await cursor.fetchall()
-                    return result
-                else:
-                    await conn.commit()
-                    return cursor.rowcount
+                await summary.ensure_summary_tables(cursor)
+                return await summary.verify_summaries(cursor)
+
+    async def execute_query(self, query, params=None, use_cache=True, name=None):
+        """Асинхронное выполнение SQL запроса
+
+        Результаты SELECT берутся из общего кэша запросов, если use_cache;
+        после выполнения изменяющего запроса кэш сбрасывается. name - имя
+        запроса в метриках (по умолчанию операция и таблица). В режиме
+        READ_REPLICA запросы SELECT выполняются в локальной реплике.
+        """
+        is_select = query.strip().upper().startswith('SELECT')
+        name = name or query_name(query)
+        replica = is_select and self._use_replica()
+        
+        try:
+            if is_select and use_cache:
+                key = self.cache.make_key(query, params)
+                found, cached = self.cache.get(key)
+                if found:
+                    self.metrics.increment(name, 'cache_hits')
+                    return cached
+                return await self._select_single_flight(key, query, params, name, replica)
+            
+            async with self._timed_connection(name, replica) as (conn, timer):
+                async with conn.cursor() as cursor:
+                    started = time.perf_counter()
+                    with timer.phase('execute'):
+                        await cursor.execute(query, params or ())
+                    if is_select:
+                        with timer.phase('fetch'):
+                            result = tuple(await cursor.fetchall())
+                        timer.add_rows(len(result))
+                        await self.slow_query_log.check(cursor, query, params, started, name)
+                        return result
+                    else:
+                        await conn.commit()
+                        self._invalidate()
+                        row_count = cursor.rowcount
+                        timer.add_rows(row_count)
+                        await self.slow_query_log.check(cursor, query, params, started, name)
+                        return row_count
         except Exception as e:
             print(f"Ошибка выполнения запроса: {e}")
             print(f"Запрос: {query}")
             print(f"Параметры: {params}")
             return None
-        finally:
-            if conn:
-                await conn.ensure_closed()
+
+    async def _select_single_flight(self, key, query, params, name, replica=False):
+        """Выполнение SELECT с объединением одинаковых одновременных запросов
+
+        Первый вызов запускает запрос отдельной задачей, остальные вызовы
+        с тем же ключом ожидают ее результат. Отмена одного из ожидающих
+        не прерывает запрос для остальных. В ключ входит поколение кэша,
+        поэтому запрос, начатый до изменения данных, не отдается тем, кто
+        пришел после.
+        """
+        generation = self.cache.generation
+        flight_key = (key, generation)
+        loop = asyncio.get_running_loop()
+        
+        task = AsyncDatabaseManager._in_flight.get(flight_key)
+        if task is not None and task.get_loop() is loop and not task.done():
+            AsyncDatabaseManager._in_flight_metrics['coalesced'] += 1
+            return await asyncio.shield(task)
+        
+        async def run_select():
+            async with self._timed_connection(name, replica) as (conn, timer):
+                async with conn.cursor() as cursor:
+                    started = time.perf_counter()
+                    with timer.phase('execute'):
+                        await cursor.execute(query, params or ())
+                    with timer.phase('fetch'):
+                        result = tuple(await cursor.fetchall())
+                    await self.slow_query_log.check(cursor, query, params, started, name)
+                timer.add_rows(len(result))
+            self.cache.put(key, result, generation)
+            return result
+        
+        def on_done(finished):
+            if AsyncDatabaseManager._in_flight.get(flight_key) is finished:
+                del AsyncDatabaseManager._in_flight[flight_key]
+            # Помечаем исключение полученным, даже если все ожидающие отменены
+            if not finished.cancelled():
+                finished.exception()
+        
+        task = loop.create_task(run_select())
+        task.add_done_callback(on_done)
+        AsyncDatabaseManager._in_flight[flight_key] = task
+        AsyncDatabaseManager._in_flight_metrics['executed'] += 1
+        return await asyncio.shield(task)
+
+    async def iter_query(self, query, params=None, batch_size=500, name=None):
+        """Потоковое чтение результата SELECT пакетами
+
+        Используется потоковый курсор (в MySQL - небуферизованный
+        серверный), поэтому в памяти одновременно находится не более
+        batch_size строк. Если чтение прервано до конца (вызывающий код
+        прекратил перебор, отмена или ошибка), соединение закрывается
+        без дочитывания результата и не возвращается в пул.
+        Время обработки пакетов вызывающим кодом в фазу fetch не входит.
+        """
+        replica = self._use_replica()
+        streaming_cursor = None if replica else self.backend.streaming_cursor
+        async with self._timed_connection(name or query_name(query), replica) as (conn, timer):
+            # Курсор не закрывается контекстным менеджером: закрытие
+            # небуферизованного курсора дочитывает все оставшиеся строки
+            cursor = conn.cursor(streaming_cursor)
+            execute_time = fetch_time = 0.0
+            row_count = 0
+            try:
+                execute_started = time.perf_counter()
+                with timer.phase('execute'):
+                    await cursor.execute(query, params or ())
+                execute_time = time.perf_counter() - execute_started
+                while True:
+                    started = time.perf_counter()
+                    rows = await cursor.fetchmany(batch_size)
+                    fetch_time += time.perf_counter() - started
+                    if not rows:
+                        break
+                    row_count += len(rows)
+                    yield rows
+            except BaseException:
+                conn.close()
+                raise
+            finally:
+                timer.observe('fetch', fetch_time)
+                timer.add_rows(row_count)
+            
+            # Время обработки пакетов вызывающим кодом не учитывается;
+            # EXPLAIN выполняется только после полного чтения результата
+            await self.slow_query_log.check(cursor, query, params,
+                                            time.perf_counter() - execute_time - fetch_time,
+                                            name or query_name(query))
+            await cursor.close()
+
+    async def iter_wine_bottles(self, batch_size=500, filters=None):
+        """Потоковое получение записей о винах пакетами по batch_size"""
+        conditions, params = self._build_search_conditions("", filters)
+        query = WINE_SELECT_QUERY + " WHERE 1=1"
+        for condition in conditions:
+            query += f" AND {condition}"
+        query += " ORDER BY wb.BottleID DESC"
+        
+        async for rows in self.iter_query(query, params, batch_size, name='iter_wine_bottles'):
+            yield [row_to_wine(row) for row in rows]
 
     async def get_wine_bottles(self):
         """Асинхронное получение всех записей о винах"""
-        query = """
-        SELECT wb.BottleID, wb.WineName, wb.Producer, wb.Vintage, 
-               wb.Region, wb.PurchasePrice, wb.PurchaseDate,
-               wl.Shelf, wl.Rack, wl.Cellar
-        FROM WineBottle wb
-        LEFT JOIN WineLocation wl ON wb.BottleID = wl.BottleID
-        ORDER BY wb.BottleID DESC
-        """
-        result = await self.execute_query(query)
+        query = WINE_SELECT_QUERY + " ORDER BY wb.BottleID DESC"
+        result = await self.execute_query(query, name='get_wine_bottles')
         if result:
-            wines = []
-            for row in result:
-                wine_data = {
-                    'BottleID': row[0],
-                    'Varietal': row[1] or '',
-                    'Producer': row[2] or '',
-                    'VintageYear': row[3] or '',
-                    'Region': row[4] or '',
-                    'Price': float(row[5]) if row[5] else 0.0,
-                    'PurchaseDate': row[6],
-                    'Shelf': row[7] or '',
-                    'Rack': row[8] or '',
-                    'Cellar': row[9] or '',
-                    'Status': 'in_storage',
-                    'SerialNumber': str(row[0]),
-                    'Volume': 750
-                }
-                wines.append(wine_data)
-            return wines
+            return [row_to_wine(row) for row in result]
         return []
 
+    async def get_wine_bottles_page(self, page_size=100, cursor=None, filters=None):
+        """Получение страницы записей о винах (keyset-пагинация по BottleID)"""
+        return await self.search_wines_page("", filters, page_size, cursor)
+
+    async def get_wine_bottle(self, bottle_id, use_cache=True):
+        """Получение одной записи о вине по BottleID (None, если не найдена)"""
+        if use_cache:
+            found, wine = self.cache.get(('record', bottle_id))
+            if found:
+                return dict(wine)
+        
+        generation = self.cache.generation
+        query = WINE_SELECT_QUERY + " WHERE wb.BottleID = %s LIMIT 1"
+        result = await self.execute_query(query, (bottle_id,), use_cache, name='get_wine_bottle')
+        if not result:
+            return None
+        
+        wine = row_to_wine(result[0])
+        self._cache_records([wine], generation)
+        return dict(wine)
+
+    async def get_wine_bottles_by_ids(self, bottle_ids):
+        """Получение записей о винах по списку BottleID
+
+        Отсутствующие в базе записи в результат не попадают.
+        """
+        bottle_ids = sorted(set(bottle_ids), reverse=True)
+        if not bottle_ids:
+            return []
+        
+        wines = []
+        generation = self.cache.generation
+        for start in range(0, len(bottle_ids), Config.DB_BULK_CHUNK_SIZE):
+            chunk = bottle_ids[start:start + Config.DB_BULK_CHUNK_SIZE]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            query = WINE_SELECT_QUERY + f" WHERE wb.BottleID IN ({placeholders}) ORDER BY wb.BottleID DESC"
+            result = await self.execute_query(query, chunk, name='get_wine_bottles_by_ids')
+            if result:
+                wines.extend(row_to_wine(row) for row in result)
+        self._cache_records(wines, generation)
+        return wines
+
+    def _cache_records(self, wines, generation):
+        """Сохранение записей в кэше по BottleID для get_wine_bottle"""
+        for wine in wines:
+            self.cache.put(('record', wine['BottleID']), wine, generation)
+
+    async def get_collection_version(self):
+        """Получение версии коллекции (счетчик WineCollectionVersion)
+
+        Запрос читает одну строку по первичному ключу и не кэшируется.
+        Если версия изменилась с прошлой проверки (в том числе из-за
+        изменений другого клиента), кэш запросов сбрасывается. При чтении
+        из локальной реплики возвращается версия MySQL, до которой в нее
+        перенесены изменения (без обращения к серверу).
+        """
+        if self._use_replica() and self.replica.collection_version is not None:
+            version = self.replica.collection_version
+            self.cache.observe_version(version)
+            return version
+        
+        await self._ensure_schema()
+        async with self._timed_connection('get_collection_version') as (conn, _):
+            async with conn.cursor() as cursor:
+                version = await changelog.get_version(cursor)
+        self.cache.observe_version(version)
+        return version
+
+    async def prune_change_log(self, keep_days):
+        """Удаление старых записей журнала изменений"""
+        await self._ensure_schema()
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                return await changelog.prune_change_log(cursor, keep_days)
+
+    async def get_regions(self):
+        """Получение списка регионов коллекции"""
+        query = "SELECT DISTINCT Region FROM WineBottle WHERE Region IS NOT NULL AND Region != '' ORDER BY Region"
+        result = await self.execute_query(query, name='get_regions')
+        return [row[0] for row in result] if result else []
+
+    @staticmethod
+    def _prepare_bottle_params(data):
+        """Подготовка параметров INSERT в WineBottle из данных формы добавления"""
+        # Обработка даты - если пустая строка, устанавливаем None
+        purchase_date = data.get('purchase_date')
+        if purchase_date == '':
+            purchase_date = None
+        
+        # Ограничение цены до 999999.99
+        price = min(float(data.get('price', 0)), 999999.99)
+        
+        return (
+            data.get('name', ''),
+            data.get('producer', ''),
+            data.get('vintage_year', ''),
+            data.get('region', ''),
+            price,
+            purchase_date
+        )
+
+    @staticmethod
+    def _prepare_location_params(data):
+        """Подготовка параметров местоположения (None, если оно не указано)"""
+        if not any([data.get('shelf'), data.get('rack'), data.get('cellar')]):
+            return None
+        return (
+            data.get('shelf', ''),
+            data.get('rack', ''), 
+            data.get('cellar', '')
+        )
+
     async def add_wine_bottle(self, data):
-        """Асинхронное добавление новой записи о вине"""
-        conn = None
+        """Асинхронное добавление новой записи о вине
+
+        Возвращает BottleID добавленной записи или False при ошибке.
+        """
         try:
-            conn = await self._get_connection()
-            if not conn:
-                return False
+            await self._ensure_schema()
+            async with self._timed_connection('add_wine_bottle') as (conn, _):
+                await conn.begin()
+                async with conn.cursor() as cursor:
+                    # Вставка основной записи о вине
+                    query = """
+                    INSERT INTO WineBottle 
+                    (WineName, Producer, Vintage, Region, PurchasePrice, PurchaseDate)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    """
+                    await cursor.execute(query, self._prepare_bottle_params(data))
+                    
+                    # Получаем ID новой записи
+                    new_id = cursor.lastrowid
+                    if new_id:
+                        
+                        # Добавляем запись о местоположении если указано
+                        location = self._prepare_location_params(data)
+                        if location:
+                            loc_query = """
+                            INSERT INTO WineLocation (Shelf, Rack, Cellar, BottleID, Quantity)
+                            VALUES (%s, %s, %s, %s, 1)
+                            """
+                            await cursor.execute(loc_query, (*location, new_id))
+                        
+                        await summary.apply_summary_delta(cursor, [new_id], 1)
+                        await changelog.record_changes(cursor, [new_id], changelog.OPERATION_INSERT)
+                        await conn.commit()
+                        self._invalidate()
+                        return new_id
+                await conn.rollback()
+            return False
+        except Exception as e:
+            print(f"Ошибка добавления вина: {e}")
+            return False
 
-            async with conn.cursor() as cursor:
-                # Вставка основной записи о вине
-                query = """
-                INSERT INTO WineBottle 
-                (WineName, Producer, Vintage, Region, PurchasePrice, PurchaseDate)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                """
-                
-                # Обработка даты - если пустая строка, устанавливаем None
-                purchase_date = data.get('purchase_date')
-                if purchase_date == '':
-                    purchase_date = None
-                
-                # Ограничение цены до 999999.99
-                price = min(float(data.get('price', 0)), 999999.99)
-                
-                params = (
-                    data.get('name', ''),
-                    data.get('producer', ''),
-                    data.get('vintage_year', ''),
-                    data.get('region', ''),
-                    price,
-                    purchase_date
-                )
-                
-                await cursor.execute(query, params)
-                
-                # Получаем ID новой записи
-                await cursor.execute("SELECT LAST_INSERT_ID()")
-                id_result = await cursor.fetchone()
-                if id_result:
-                    new_id = id_result[0]
+    async def add_wine_bottles(self, items, chunk_size=None):
+        """Пакетное добавление записей о винах в одной транзакции
+
+        Записи вставляются многострочными INSERT по chunk_size строк.
+        Возвращает список результатов в порядке items: словари с ключами
+        index, success, bottle_id и error.
+        """
+        chunk_size = chunk_size or Config.DB_BULK_CHUNK_SIZE
+        results = [None] * len(items)
+        prepared = []
+        
+        # Некорректные записи отклоняются до начала транзакции
+        for index, data in enumerate(items):
+            try:
+                prepared.append((index, self._prepare_bottle_params(data), self._prepare_location_params(data)))
+            except (TypeError, ValueError) as e:
+                results[index] = {'index': index, 'success': False, 'bottle_id': None, 'error': str(e)}
+        
+        if not prepared:
+            return results
+        
+        try:
+            await self._ensure_schema()
+            async with self._timed_connection('add_wine_bottles') as (conn, timer):
+                await conn.begin()
+                async with conn.cursor() as cursor:
+                    increment = await self.dialect.auto_increment_step(cursor)
+                    inserted_ids = []
                     
-                    # Добавляем запись о местоположении если указано
-                    if any([data.get('shelf'), data.get('rack'), data.get('cellar')]):
-                        loc_query = """
-                        INSERT INTO WineLocation (Shelf, Rack, Cellar, BottleID, Quantity)
-                        VALUES (%s, %s, %s, %s, 1)
-                        """
-                        loc_params = (
-                            data.get('shelf', ''),
-                            data.get('rack', ''), 
-                            data.get('cellar', ''),
-                            new_id
+                    for start in range(0, len(prepared), chunk_size):
+                        chunk = prepared[start:start + chunk_size]
+                        
+                        query = (
+                            "INSERT INTO WineBottle "
+                            "(WineName, Producer, Vintage, Region, PurchasePrice, PurchaseDate) VALUES "
+                            + ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(chunk))
                         )
-                        await cursor.execute(loc_query, loc_params)
+                        await cursor.execute(query, [value for _, params, _ in chunk for value in params])
+                        if cursor.rowcount != len(chunk):
+                            raise RuntimeError(f"Вставлено {cursor.rowcount} записей вместо {len(chunk)}")
+                        
+                        # ID строк многострочного INSERT идут подряд с шагом increment
+                        first_id = self.dialect.first_insert_id(cursor, len(chunk), increment)
+                        bottle_ids = []
+                        locations = []
+                        for offset, (index, _, location) in enumerate(chunk):
+                            bottle_id = first_id + offset * increment
+                            bottle_ids.append(bottle_id)
+                            results[index] = {'index': index, 'success': True, 'bottle_id': bottle_id, 'error': None}
+                            if location:
+                                locations.append((*location, bottle_id))
+                        
+                        await summary.apply_summary_delta(cursor, bottle_ids, 1)
+                        inserted_ids.extend(bottle_ids)
+                        
+                        if locations:
+                            loc_query = (
+                                "INSERT INTO WineLocation (Shelf, Rack, Cellar, BottleID, Quantity) VALUES "
+                                + ", ".join(["(%s, %s, %s, %s, 1)"] * len(locations))
+                            )
+                            await cursor.execute(loc_query, [value for location in locations for value in location])
                     
+                    await changelog.record_changes(cursor, inserted_ids, changelog.OPERATION_INSERT, chunk_size)
                     await conn.commit()
-                    return True
-            return False
+                    timer.add_rows(len(prepared))
+            self._invalidate()
         except Exception as e:
-            print(f"Ошибка добавления вина: {e}")
-            if conn:
-                await conn.rollback()
-            return False
-        finally:
-            if conn:
-                await conn.ensure_closed()
+            print(f"Ошибка пакетного добавления вин: {e}")
+            # Транзакция откатывается целиком
+            for index, _, _ in prepared:
+                results[index] = {'index': index, 'success': False, 'bottle_id': None, 'error': str(e)}
+        
+        return results
+
+    @staticmethod
+    def _prepare_update_value(field, value):
+        """Подготовка значения поля записи для UPDATE WineBottle"""
+        if field == 'PurchaseDate' and value == '':
+            # Пустая дата сохраняется как NULL
+            return None
+        if field == 'Price':
+            # Ограничение цены
+            return min(float(value or 0), 999999.99)
+        return value
 
     async def update_wine_bottle(self, bottle_id, data):
-        """Асинхронное обновление записи о вине"""
-        conn = None
-        try:
-            conn = await self._get_connection()
-            if not conn:
-                return False
+        """Асинхронное обновление записи о вине
 
-            async with conn.cursor() as cursor:
-                query = """
-                UPDATE WineBottle 
-                SET WineName=%s, Producer=%s, Vintage=%s, Region=%s, 
-                    PurchasePrice=%s, PurchaseDate=%s
-                WHERE BottleID=%s
-                """
-                
-                # Обработка даты - если пустая строка, устанавливаем None
-                purchase_date = data.get('PurchaseDate')
-                if purchase_date == '':
-                    purchase_date = None
-                
-                # Ограничение цены
-                price = min(float(data.get('Price', 0)), 999999.99)
-                
-                params = (
-                    data.get('Varietal', ''),
-                    data.get('Producer', ''),
-                    data.get('VintageYear', ''),
-                    data.get('Region', ''),
-                    price,
-                    purchase_date,
-                    bottle_id
-                )
-                
-                await cursor.execute(query, params)
-                
-                # Обновляем местоположение
-                # Удаляем старую запись о местоположении
-                await cursor.execute("DELETE FROM WineLocation WHERE BottleID=%s", (bottle_id,))
-                
-                # Создаем новую запись если указано местоположение
-                if any([data.get('Shelf'), data.get('Rack'), data.get('Cellar')]):
-                    insert_loc_query = """
-                    INSERT INTO WineLocation (Shelf, Rack, Cellar, BottleID, Quantity)
-                    VALUES (%s, %s, %s, %s, 1)
-                    """
-                    insert_loc_params = (
-                        data.get('Shelf', ''),
-                        data.get('Rack', ''), 
-                        data.get('Cellar', ''),
-                        bottle_id
+        data содержит только изменяемые поля в формате row_to_wine
+        (см. EditWineDialog.get_changes): в UPDATE попадают только они.
+        Местоположение записывается через upsert (INSERT ... ON DUPLICATE
+        KEY UPDATE или ON CONFLICT) и удаляется, если все его поля пустые. Пустой data ничего не меняет.
+        Возвращает False, если записи уже нет (например, ее удалил другой клиент).
+        """
+        bottle_values = {
+            column: self._prepare_update_value(field, data[field])
+            for field, column in BOTTLE_UPDATE_COLUMNS.items() if field in data
+        }
+        location_changed = any(field in data for field in LOCATION_FIELDS)
+        if not bottle_values and not location_changed:
+            return True
+        
+        try:
+            await self._ensure_schema()
+            async with self._timed_connection('update_wine_bottle') as (conn, _):
+                await conn.begin()
+                async with conn.cursor() as cursor:
+                    # Запись блокируется до конца транзакции; если ее удалили,
+                    # местоположение не записывается, чтобы не оставить строку без записи
+                    await cursor.execute(
+                        f"SELECT BottleID FROM WineBottle WHERE BottleID=%s{self.dialect.for_update}",
+                        (bottle_id,)
                     )
-                    await cursor.execute(insert_loc_query, insert_loc_params)
-                
-                await conn.commit()
-                return True
+                    if not await cursor.fetchone():
+                        await conn.rollback()
+                        return False
+                    
+                    if bottle_values:
+                        affects_summary = any(field in data for field in SUMMARY_FIELDS)
+                        query = (
+                            "UPDATE WineBottle SET "
+                            + ", ".join(f"{column}=%s" for column in bottle_values)
+                            + " WHERE BottleID=%s"
+                        )
+                        
+                        # Старые значения вычитаются из сводных таблиц, новые - добавляются
+                        if affects_summary:
+                            await summary.apply_summary_delta(cursor, [bottle_id], -1)
+                        await cursor.execute(query, (*bottle_values.values(), bottle_id))
+                        if affects_summary:
+                            await summary.apply_summary_delta(cursor, [bottle_id], 1)
+                    
+                    if location_changed:
+                        await self._write_location(cursor, bottle_id, data)
+                    
+                    await changelog.record_changes(cursor, [bottle_id], changelog.OPERATION_UPDATE)
+                    await conn.commit()
+                    self._invalidate()
+                    return True
         except Exception as e:
             print(f"Ошибка обновления вина: {e}")
-            if conn:
-                await conn.rollback()
             return False
-        finally:
-            if conn:
-                await conn.ensure_closed()
+
+    async def _write_location(self, cursor, bottle_id, data):
+        """Запись местоположения бутылки внутри транзакции обновления"""
+        if not all(field in data for field in LOCATION_FIELDS):
+            # Передана часть полей - остальные берем из текущей записи
+            await cursor.execute(
+                f"SELECT Shelf, Rack, Cellar FROM WineLocation WHERE BottleID=%s LIMIT 1{self.dialect.for_update}",
+                (bottle_id,)
+            )
+            current = dict(zip(LOCATION_FIELDS, await cursor.fetchone() or ('', '', '')))
+            data = {**current, **data}
+        
+        location = self._prepare_location_params({
+            'shelf': data.get('Shelf') or '',
+            'rack': data.get('Rack') or '',
+            'cellar': data.get('Cellar') or ''
+        })
+        if location is None:
+            await cursor.execute("DELETE FROM WineLocation WHERE BottleID=%s", (bottle_id,))
+            return
+        
+        if AsyncDatabaseManager._location_upsert:
+            query = """
+            INSERT INTO WineLocation (Shelf, Rack, Cellar, BottleID, Quantity)
+            VALUES (%s, %s, %s, %s, 1)
+            """ + self.dialect.upsert('BottleID', replace=LOCATION_FIELDS)
+        else:
+            # Без уникального ключа по BottleID upsert невозможен
+            await cursor.execute("DELETE FROM WineLocation WHERE BottleID=%s", (bottle_id,))
+            query = """
+            INSERT INTO WineLocation (Shelf, Rack, Cellar, BottleID, Quantity)
+            VALUES (%s, %s, %s, %s, 1)
+            """
+        await cursor.execute(query, (*location, bottle_id))
 
     async def delete_wine_bottle(self, bottle_id):
         """Асинхронное удаление записи о вине"""
-        conn = None
         try:
-            conn = await self._get_connection()
-            if not conn:
-                return False
-
-            async with conn.cursor() as cursor:
-                # Сначала удаляем связанные записи о местоположении
-                await cursor.execute("DELETE FROM WineLocation WHERE BottleID=%s", (bottle_id,))
-                # Затем удаляем саму запись о вине
-                await cursor.execute("DELETE FROM WineBottle WHERE BottleID=%s", (bottle_id,))
-                await conn.commit()
-                return True
+            await self._ensure_schema()
+            async with self._timed_connection('delete_wine_bottle') as (conn, _):
+                await conn.begin()
+                async with conn.cursor() as cursor:
+                    await summary.apply_summary_delta(cursor, [bottle_id], -1)
+                    # Сначала удаляем связанные записи о местоположении
+                    await cursor.execute("DELETE FROM WineLocation WHERE BottleID=%s", (bottle_id,))
+                    # Затем удаляем саму запись о вине
+                    await cursor.execute("DELETE FROM WineBottle WHERE BottleID=%s", (bottle_id,))
+                    await changelog.record_changes(cursor, [bottle_id], changelog.OPERATION_DELETE)
+                    await conn.commit()
+                    self._invalidate()
+                    return True
         except Exception as e:
             print(f"Ошибка удаления вина: {e}")
-            if conn:
-                await conn.rollback()
             return False
-        finally:
-            if conn:
-                await conn.ensure_closed()
 
-    async def search_wines(self, search_term="", filters=None):
-        """Асинхронный поиск вин с фильтрацией"""
+    async def delete_wine_bottles(self, bottle_ids, chunk_size=None):
+        """Массовое удаление записей о винах в одной транзакции
+
+        Удаление выполняется запросами WHERE BottleID IN (...) по chunk_size
+        идентификаторов. Возвращает количество удаленных записей о винах
+        или None при ошибке (в этом случае ничего не удаляется).
+        """
+        chunk_size = chunk_size or Config.DB_BULK_CHUNK_SIZE
+        bottle_ids = sorted(set(bottle_ids))
+        if not bottle_ids:
+            return 0
+        
         try:
-            base_query = """
-            SELECT wb.BottleID, wb.WineName, wb.Producer, wb.Vintage, 
-                   wb.Region, wb.PurchasePrice, wb.PurchaseDate,
-                   wl.Shelf, wl.Rack, wl.Cellar
-            FROM WineBottle wb
-            LEFT JOIN WineLocation wl ON wb.BottleID = wl.BottleID
-            WHERE 1=1
-            """
-            params = []
-            
-            if search_term:
-                base_query += " AND (wb.WineName LIKE %s OR wb.Producer LIKE %s OR wb.Region LIKE %s)"
+            await self._ensure_schema()
+            deleted = 0
+            async with self._timed_connection('delete_wine_bottles') as (conn, timer):
+                await conn.begin()
+                async with conn.cursor() as cursor:
+                    for start in range(0, len(bottle_ids), chunk_size):
+                        chunk = bottle_ids[start:start + chunk_size]
+                        placeholders = ", ".join(["%s"] * len(chunk))
+                        await summary.apply_summary_delta(cursor, chunk, -1)
+                        # Сначала удаляем связанные записи о местоположении
+                        await cursor.execute(f"DELETE FROM WineLocation WHERE BottleID IN ({placeholders})", chunk)
+                        await cursor.execute(f"DELETE FROM WineBottle WHERE BottleID IN ({placeholders})", chunk)
+                        deleted += cursor.rowcount
+                    await changelog.record_changes(cursor, bottle_ids, changelog.OPERATION_DELETE, chunk_size)
+                    await conn.commit()
+                    timer.add_rows(deleted)
+            self._invalidate()
+            return deleted
+        except Exception as e:
+            print(f"Ошибка массового удаления вин: {e}")
+            return None
+
+    async def _use_fulltext(self, search_term, mode):
+        """Выбор режима поиска по строке
+
+        mode: 'auto' - полнотекстовый поиск, если есть индекс и строка не
+        короче SEARCH_FULLTEXT_MIN_LENGTH, иначе LIKE; 'fulltext'; 'like'.
+        С локальной репликой (в SQLite нет полнотекстового индекса) поиск
+        всегда выполняется через LIKE.
+        """
+        if not search_term or mode == 'like' or self.replica is not None:
+            return False
+        if mode == 'auto' and len(search_term.strip()) < Config.SEARCH_FULLTEXT_MIN_LENGTH:
+            return False
+        if not schema.fulltext_phrase(search_term):
+            return False
+        
+        if AsyncDatabaseManager._fulltext_available is None:
+            async with self.pool.connection() as conn:
+                async with conn.cursor() as cursor:
+                    AsyncDatabaseManager._fulltext_available = await schema.has_search_index(cursor)
+        
+        if mode == 'fulltext' and not AsyncDatabaseManager._fulltext_available:
+            raise RuntimeError("Полнотекстовый индекс не создан: python src/manage.py search-index create")
+        return AsyncDatabaseManager._fulltext_available
+
+    def _build_search_conditions(self, search_term="", filters=None, use_fulltext=False):
+        """Формирование условий WHERE для поиска"""
+        conditions = []
+        params = []
+        
+        if search_term:
+            if use_fulltext:
+                conditions.append(f"MATCH(wb.{schema.SEARCH_INDEX_COLUMNS.replace(', ', ', wb.')}) "
+                                  "AGAINST (%s IN BOOLEAN MODE)")
+                params.append(schema.fulltext_phrase(search_term))
+            else:
+                conditions.append("(wb.WineName LIKE %s OR wb.Producer LIKE %s OR wb.Region LIKE %s)")
                 params.extend([f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"])
+        
+        if filters:
+            if filters.get('region'):
+                conditions.append("wb.Region = %s")
+                params.append(filters['region'])
+            if filters.get('min_year'):
+                conditions.append("wb.Vintage >= %s")
+                params.append(filters['min_year'])
+            if filters.get('max_year'):
+                conditions.append("wb.Vintage <= %s")
+                params.append(filters['max_year'])
+        
+        return conditions, params
+
+    async def search_wines(self, search_term="", filters=None, mode='auto'):
+        """Асинхронный поиск вин с фильтрацией
+
+        При полнотекстовом поиске результаты упорядочены по релевантности.
+        """
+        try:
+            use_fulltext = await self._use_fulltext(search_term, mode)
+            conditions, params = self._build_search_conditions(search_term, filters, use_fulltext)
             
-            if filters:
-                if filters.get('region'):
-                    base_query += " AND wb.Region = %s"
-                    params.append(filters['region'])
-                if filters.get('min_year'):
-                    base_query += " AND wb.Vintage >= %s"
-                    params.append(filters['min_year'])
-                if filters.get('max_year'):
-                    base_query += " AND wb.Vintage <= %s"
-                    params.append(filters['max_year'])
-            
-            base_query += " ORDER BY wb.BottleID DESC"
+            query = WINE_SELECT_QUERY + " WHERE 1=1"
+            for condition in conditions:
+                query += f" AND {condition}"
+            if use_fulltext:
+                # Первое условие - MATCH, его же используем для сортировки по релевантности
+                query += f" ORDER BY {conditions[0]} DESC, wb.BottleID DESC"
+                params.append(params[0])
+            else:
+                query += " ORDER BY wb.BottleID DESC"
             
-            result = await self.execute_query(base_query, params)
+            result = await self.execute_query(query, params,
+                                              name='search_wines_fulltext' if use_fulltext else 'search_wines')
             if result:
-                wines = []
-                for row in result:
-                    wine_data = {
-                        'BottleID': row[0],
-                        'Varietal': row[1] or '',
-                        'Producer': row[2] or '',
-                        'VintageYear': row[3] or '',
-                        'Region': row[4] or '',
-                        'Price': float(row[5]) if row[5] else 0.0,
-                        'PurchaseDate': row[6],
-                        'Shelf': row[7] or '',
-                        'Rack': row[8] or '',
-                        'Cellar': row[9] or '',
-                        'Status': 'in_storage',
-                        'SerialNumber': str(row[0]),
-                        'Volume': 750
-                    }
-                    wines.append(wine_data)
-                return wines
+                return [row_to_wine(row) for row in result]
             return []
         except Exception as e:
             print(f"Ошибка поиска вин: {e}")
             return []
 
-    async def get_statistics(self):
-        """Асинхронное получение статистики для графиков"""
+    async def search_wines_page(self, search_term="", filters=None, page_size=100, cursor=None, mode='auto'):
+        """Поиск вин постранично
+
+        Страницы упорядочены по убыванию BottleID (в том числе при
+        полнотекстовом поиске); cursor - значение next_cursor предыдущей
+        страницы (None для первой страницы).
+        Возвращает словарь с ключами items, next_cursor и has_more.
+        """
+        empty_page = {'items': [], 'next_cursor': None, 'has_more': False}
         try:
-            # Общая статистика
-            total_query = "SELECT COUNT(*) FROM WineBottle"
-            value_query = "SELECT SUM(PurchasePrice) FROM WineBottle"
+            if page_size < 1:
+                raise ValueError(f"Некорректный размер страницы: {page_size}")
             
-            total_result = await self.execute_query(total_query)
-            value_result = await self.execute_query(value_query)
+            use_fulltext = await self._use_fulltext(search_term, mode)
+            conditions, params = self._build_search_conditions(search_term, filters, use_fulltext)
+            if cursor:
+                conditions.append("wb.BottleID < %s")
+                params.append(decode_page_cursor(cursor))
             
-            total_bottles = total_result[0][0] if total_result and total_result[0][0] else 0
-            total_value = float(value_result[0][0]) if value_result and value_result[0][0] else 0.0
+            query = WINE_SELECT_QUERY + " WHERE 1=1"
+            for condition in conditions:
+                query += f" AND {condition}"
+            # Запрашиваем на одну запись больше, чтобы узнать о наличии следующей страницы
+            query += " ORDER BY wb.BottleID DESC LIMIT %s"
+            params.append(page_size + 1)
             
-            # Статистика по регионам
-            region_query = "SELECT Region, COUNT(*) FROM WineBottle WHERE Region IS NOT NULL AND Region != '' GROUP BY Region"
-            region_data = await self.execute_query(region_query)
-            regions = {}
-            if region_data:
-                for row in region_data:
-                    if row[0]:  # Проверяем что регион не None и не пустой
-                        regions[row[0]] = row[1]
+            generation = self.cache.generation
+            result = await self.execute_query(query, params,
+                                              name='search_wines_page_fulltext' if use_fulltext else 'search_wines_page')
+            if not result:
+                return empty_page
+            
+            has_more = len(result) > page_size
+            items = [row_to_wine(row) for row in result[:page_size]]
+            self._cache_records(items, generation)
+            return {
+                'items': items,
+                'next_cursor': encode_page_cursor(items[-1]['BottleID']) if has_more else None,
+                'has_more': has_more
+            }
+        except Exception as e:
+            print(f"Ошибка поиска вин: {e}")
+            return empty_page
+
+    async def get_statistics(self):
+        """Асинхронное получение статистики для графиков
+
+        Данные читаются из сводных таблиц одним запросом UNION ALL,
+        то есть за одно обращение к серверу и без просмотра WineBottle.
+        """
+        try:
+            if not self._use_replica():
+                await self._ensure_schema()
+            query = """
+            SELECT 'total' AS Kind, NULL AS Region, NULL AS Vintage,
+                   BottleCount AS Cnt, TotalValue
+            FROM WineStatsTotal
+            WHERE Id = 1
+            UNION ALL
+            SELECT 'region', Region, NULL, BottleCount, NULL
+            FROM WineStatsRegion
+            WHERE Region != '' AND BottleCount > 0
+            UNION ALL
+            SELECT 'vintage', NULL, Vintage, BottleCount, NULL
+            FROM WineStatsVintage
+            WHERE Vintage != 0 AND BottleCount > 0
+            """
+            result = await self.execute_query(query, name='get_statistics')
             
-            # Статистика по годам
-            year_query = "SELECT Vintage, COUNT(*) FROM WineBottle WHERE Vintage IS NOT NULL GROUP BY Vintage ORDER BY Vintage"
-            year_data = await self.execute_query(year_query)
+            total_bottles = 0
+            total_value = 0.0
+            regions = {}
+            vintages = []
+            for kind, region, vintage, count, value in result or []:
+                if kind == 'total':
+                    # Общая статистика
+                    total_bottles = count or 0
+                    total_value = float(value) if value else 0.0
+                elif kind == 'region':
+                    # Статистика по регионам
+                    if region:  # Проверяем что регион не None и не пустой
+                        regions[region] = count
+                elif vintage:  # Статистика по годам, проверяем что год не None
+                    vintages.append((vintage, count))
             
             line_data = {'labels': [], 'values': []}
-            if year_data:
-                for row in year_data:
-                    if row[0]:  # Проверяем что год не None
-                        line_data['labels'].append(str(row[0]))
-                        line_data['values'].append(row[1])
+            for vintage, count in sorted(vintages):
+                line_data['labels'].append(str(vintage))
+                line_data['values'].append(count)
             
             pie_data = {
                 'labels': list(regions.keys()),
@@ -3,6 +3,11 @@
 """
 
 from .database import AsyncDatabaseManager, DatabaseWorker
+from .loop_service import AsyncLoopService
+from .pool import ConnectionPool
+from .query_cache import QueryCache
+from .replica import LocalReplica
+from .search_index import TrigramIndex
 from .wine import Wine, WineLocation
 
-__all__ = ['AsyncDatabaseManager', 'DatabaseWorker', 'Wine', 'WineLocation']
+__all__ = ['AsyncDatabaseManager', 'DatabaseWorker', 'AsyncLoopService', 'ConnectionPool', 'QueryCache', 'LocalReplica', 'TrigramIndex', 'Wine', 'WineLocation']
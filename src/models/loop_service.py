@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+
+class AsyncLoopService:
+    """Фоновый цикл событий asyncio, живущий все время работы приложения
+
+    Все корутины работы с БД выполняются в одном потоке и одном цикле
+    событий, поэтому пулы соединений и кэши сохраняются между вызовами.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._shutdown_hooks = []
+
+    @classmethod
+    def instance(cls):
+        """Получение общего экземпляра сервиса"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @property
+    def loop(self):
+        """Цикл событий сервиса (запускается при первом обращении)"""
+        self.start()
+        return self._loop
+
+    def is_running(self):
+        """Проверка, что фоновый поток запущен"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def in_loop_thread(self):
+        """Проверка, что вызов выполняется в потоке цикла событий"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def start(self):
+        """Запуск фонового потока с циклом событий"""
+        with self._lock:
+            if self.is_running():
+                return
+
+            started = threading.Event()
+            self._loop = asyncio.new_event_loop()
+
+            def run_loop():
+                asyncio.set_event_loop(self._loop)
+                self._loop.call_soon(started.set)
+                self._loop.run_forever()
+
+            self._thread = threading.Thread(target=run_loop, name="AsyncLoopService", daemon=True)
+            self._thread.start()
+            started.wait()
+
+    def submit(self, coroutine):
+        """Отправка корутины в цикл событий
+
+        Возвращает concurrent.futures.Future с результатом корутины.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine, timeout=None):
+        """Синхронное выполнение корутины из другого потока"""
+        if self.in_loop_thread():
+            coroutine.close()
+            raise RuntimeError("Нельзя ожидать результат из потока цикла событий")
+        return self.submit(coroutine).result(timeout)
+
+    def add_shutdown_hook(self, coroutine_function):
+        """Регистрация корутины, вызываемой при остановке сервиса"""
+        if coroutine_function not in self._shutdown_hooks:
+            self._shutdown_hooks.append(coroutine_function)
+
+    def remove_shutdown_hook(self, coroutine_function):
+        """Отмена регистрации обработчика остановки (объект уже закрыт)"""
+        if coroutine_function in self._shutdown_hooks:
+            self._shutdown_hooks.remove(coroutine_function)
+
+    async def _shutdown(self):
+        """Выполнение зарегистрированных обработчиков остановки"""
+        for hook in list(self._shutdown_hooks):
+            try:
+                await hook()
+            except Exception as e:
+                print(f"Ошибка при остановке фонового цикла: {e}")
+
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._loop.shutdown_asyncgens()
+
+    def stop(self, timeout=5):
+        """Остановка цикла событий и фонового потока"""
+        with self._lock:
+            if not self.is_running():
+                return
+
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout)
+            except Exception as e:
+                print(f"Ошибка при остановке фонового цикла: {e}")
+
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+            if not self._thread.is_alive():
+                self._loop.close()
+            self._thread = None
+            self._loop = None
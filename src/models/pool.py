@@ -0,0 +1,268 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+
+class ConnectionPool:
+    """Пул асинхронных соединений с базой данных
+
+    Соединения открываются по мере надобности и переиспользуются между
+    запросами; простаивающие дольше idle_timeout закрываются, пока в
+    пуле больше min_size соединений. Перед выдачей
+    давно не использовавшегося соединения выполняется ping.
+    Соединения открываются вызовом connect(**connection_params)
+    (по умолчанию asyncmy.connect).
+    """
+
+    def __init__(self, connection_params, min_size=1, max_size=10,
+                 idle_timeout=300, health_check_interval=30, acquire_timeout=10, connect=None):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Некорректные размеры пула соединений")
+
+        if connect is None:
+            import asyncmy
+            connect = asyncmy.connect
+
+        self.connection_params = connection_params
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+
+        self._loop = None
+        self._condition = None
+        self._idle = deque()  # (соединение, время возврата в пул)
+        self._in_use = set()
+        self._pending = 0  # соединения в процессе открытия
+        self._closed = False
+
+        self._metrics = {
+            'created': 0,
+            'closed': 0,
+            'acquired': 0,
+            'released': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'timeouts': 0,
+            'evicted_idle': 0,
+            'health_checks': 0,
+            'health_check_failures': 0,
+            'connect_errors': 0,
+        }
+
+    @property
+    def size(self):
+        """Общее количество соединений пула"""
+        return len(self._idle) + len(self._in_use) + self._pending
+
+    def _bind_loop(self):
+        """Привязка пула к текущему циклу событий
+
+        Соединения asyncmy нельзя использовать из другого цикла событий,
+        поэтому при смене цикла простаивающие соединения сбрасываются.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+
+        while self._idle:
+            conn, _ = self._idle.popleft()
+            self._close_sync(conn)
+        self._in_use.clear()
+        self._pending = 0
+        self._loop = loop
+        self._condition = asyncio.Condition()
+
+    def _close_sync(self, conn):
+        """Закрытие соединения без ожидания (для чужого цикла событий)"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._metrics['closed'] += 1
+
+    async def _close(self, conn):
+        """Корректное закрытие соединения"""
+        try:
+            await conn.ensure_closed()
+        except Exception:
+            conn.close()
+        self._metrics['closed'] += 1
+
+    async def _connect(self):
+        """Открытие нового соединения"""
+        try:
+            conn = await self.connect(**self.connection_params)
+        except Exception:
+            self._metrics['connect_errors'] += 1
+            raise
+        self._metrics['created'] += 1
+        return conn
+
+    async def _is_healthy(self, conn, idle_since):
+        """Проверка соединения, если оно долго простаивало"""
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+
+        self._metrics['health_checks'] += 1
+        try:
+            await conn.ping(reconnect=False)
+            return True
+        except Exception:
+            self._metrics['health_check_failures'] += 1
+            return False
+
+    async def _evict_idle(self):
+        """Закрытие соединений, простаивающих дольше idle_timeout"""
+        if not self.idle_timeout:
+            return
+
+        now = time.monotonic()
+        # Самые старые соединения находятся в начале очереди
+        while self._idle and self.size > self.min_size:
+            conn, idle_since = self._idle[0]
+            if now - idle_since < self.idle_timeout:
+                break
+            self._idle.popleft()
+            self._metrics['evicted_idle'] += 1
+            await self._close(conn)
+
+    async def acquire(self):
+        """Получение соединения из пула"""
+        if self._closed:
+            raise RuntimeError("Пул соединений закрыт")
+
+        self._bind_loop()
+        started = time.monotonic()
+        waited = False
+
+        async with self._condition:
+            await self._evict_idle()
+
+            while True:
+                # Сначала используем последнее возвращенное соединение (LIFO),
+                # чтобы давно простаивающие могли быть вытеснены
+                while self._idle:
+                    conn, idle_since = self._idle.pop()
+                    if await self._is_healthy(conn, idle_since):
+                        self._in_use.add(conn)
+                        self._record_acquire(started, waited)
+                        return conn
+                    await self._close(conn)
+
+                if self.size < self.max_size:
+                    self._pending += 1
+                    break
+
+                waited = True
+                remaining = self.acquire_timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._metrics['timeouts'] += 1
+                    raise TimeoutError("Нет свободных соединений в пуле")
+                try:
+                    await asyncio.wait_for(self._condition.wait(), remaining)
+                except asyncio.TimeoutError:
+                    self._metrics['timeouts'] += 1
+                    raise TimeoutError("Нет свободных соединений в пуле")
+
+        # Соединение открывается вне блокировки, чтобы не задерживать других
+        try:
+            conn = await self._connect()
+        except BaseException:
+            # Счетчик меняется без ожидания блокировки, чтобы и при отмене
+            # (CancelledError) место открываемого соединения освобождалось
+            self._pending -= 1
+            self._loop.create_task(self._notify_waiter())
+            raise
+
+        self._pending -= 1
+        self._in_use.add(conn)
+        self._record_acquire(started, waited)
+        return conn
+
+    async def _notify_waiter(self):
+        """Пробуждение ожидающего: освободилось место для нового соединения"""
+        async with self._condition:
+            self._condition.notify()
+
+    def _record_acquire(self, started, waited):
+        self._metrics['acquired'] += 1
+        if waited:
+            self._metrics['waits'] += 1
+            self._metrics['wait_time_total'] += time.monotonic() - started
+
+    async def release(self, conn, discard=False):
+        """Возврат соединения в пул"""
+        if conn not in self._in_use:
+            # Соединение из предыдущего цикла событий или уже возвращено
+            self._close_sync(conn)
+            return
+
+        async with self._condition:
+            self._in_use.discard(conn)
+            self._metrics['released'] += 1
+            if discard or self._closed:
+                await self._close(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    @asynccontextmanager
+    async def connection(self):
+        """Контекстный менеджер для работы с соединением из пула
+
+        При ошибке внутри блока выполняется откат транзакции; если откат
+        не удался или выполнение было прервано посреди обмена с сервером,
+        соединение считается испорченным и закрывается.
+        """
+        conn = await self.acquire()
+        discard = False
+        try:
+            yield conn
+        except (asyncio.CancelledError, GeneratorExit):
+            discard = True
+            raise
+        except BaseException:
+            try:
+                await conn.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            await self.release(conn, discard=discard)
+
+    async def close(self):
+        """Закрытие всех простаивающих соединений пула"""
+        self._closed = True
+        if self._loop is None:
+            return
+        if self._loop is not asyncio.get_running_loop():
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._close_sync(conn)
+            return
+
+        async with self._condition:
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                await self._close(conn)
+            self._condition.notify_all()
+
+    def get_metrics(self):
+        """Получение метрик пула"""
+        metrics = dict(self._metrics)
+        metrics.update({
+            'size': self.size,
+            'idle': len(self._idle),
+            'in_use': len(self._in_use),
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+        })
+        if metrics['waits']:
+            metrics['avg_wait_time'] = metrics['wait_time_total'] / metrics['waits']
+        else:
+            metrics['avg_wait_time'] = 0.0
+        return metrics
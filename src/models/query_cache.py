@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+from utils.config import Config
+
+
+def normalize_query(query):
+    """Нормализация текста запроса для ключа кэша (схлопывание пробелов)"""
+    return " ".join(query.split())
+
+
+class QueryCache:
+    """Общий кэш результатов SELECT с TTL и вытеснением LRU
+
+    Ключ - нормализованный текст запроса и параметры. Кэш общий для всех
+    экземпляров AsyncDatabaseManager и полностью сбрасывается при каждой
+    фиксации изменений. Результат, прочитанный до сброса, в кэш не
+    попадает (проверяется поколение кэша).
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_size=1000, ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # ключ -> (значение, время истечения)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._version = None  # последняя известная версия коллекции
+        self._metrics = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'evicted': 0,
+            'invalidations': 0,
+        }
+
+    @classmethod
+    def shared(cls):
+        """Получение общего экземпляра кэша"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls(Config.QUERY_CACHE_SIZE, Config.QUERY_CACHE_TTL)
+            return cls._instance
+
+    @property
+    def enabled(self):
+        return self.max_size > 0 and self.ttl > 0
+
+    @property
+    def generation(self):
+        """Номер поколения, увеличивается при каждом сбросе кэша"""
+        return self._generation
+
+    @staticmethod
+    def make_key(query, params=None):
+        """Ключ кэша для запроса с параметрами"""
+        return normalize_query(query), tuple(params or ())
+
+    def get(self, key):
+        """Получение значения; возвращает (найдено, значение)"""
+        if not self.enabled:
+            return False, None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._metrics['misses'] += 1
+                return False, None
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._metrics['expired'] += 1
+                self._metrics['misses'] += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self._metrics['hits'] += 1
+            return True, value
+
+    def put(self, key, value, generation=None):
+        """Сохранение значения
+
+        generation - поколение кэша на момент начала чтения; если кэш с тех
+        пор сбрасывался, значение могло устареть и не сохраняется.
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._metrics['evicted'] += 1
+
+    def invalidate(self):
+        """Сброс кэша после изменения данных"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self._metrics['invalidations'] += 1
+
+    def observe_version(self, version):
+        """Учет версии коллекции; при ее изменении кэш сбрасывается"""
+        with self._lock:
+            changed = self._version is not None and version != self._version
+            self._version = version
+        if changed:
+            self.invalidate()
+        return changed
+
+    def get_metrics(self):
+        """Получение счетчиков попаданий и промахов"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['size'] = len(self._entries)
+        metrics['max_size'] = self.max_size
+        metrics['ttl'] = self.ttl
+        lookups = metrics['hits'] + metrics['misses']
+        metrics['hit_ratio'] = metrics['hits'] / lookups if lookups else 0.0
+        return metrics
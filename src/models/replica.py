@@ -0,0 +1,425 @@
+"""
+Локальная реплика коллекции для чтения
+
+В режиме READ_REPLICA=true AsyncDatabaseManager читает WineBottle и
+WineLocation (и сводные таблицы) из локального файла SQLite, а изменения
+записывает в MySQL. Фоновая задача раз в READ_REPLICA_SYNC_INTERVAL
+секунд переносит в реплику изменения из журнала WineChangeLog в порядке
+ChangeID. После изменения данных через приложение синхронизация
+запускается сразу, а до ее завершения чтение идет из MySQL. Если журнал
+очищен дальше последней перенесенной версии, реплика копируется заново.
+
+ChangeID выдается при INSERT, а транзакции фиксируются в другом порядке,
+поэтому в прочитанном журнале бывают пропуски - строки транзакций, еще
+не зафиксированных (или откаченных). Пропущенные ChangeID запрашиваются
+повторно при следующих синхронизациях, а сохраненная версия реплики не
+переходит через пропуск, пока он моложе READ_REPLICA_GAP_GRACE секунд.
+"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime
+from models import changelog, summary
+from models.backends.base import create_backend
+from models.backends.dialect import SQLITE
+from models.backends.sqlite import SQLiteBackend
+from models.loop_service import AsyncLoopService
+from models.pool import ConnectionPool
+from models.query_cache import QueryCache
+from migrations.runner import run_migrations
+from utils.config import Config
+from utils.metrics import MetricsRegistry
+
+REPLICA_STATE_DDL = """
+CREATE TABLE IF NOT EXISTS ReplicaState (
+    Id INTEGER PRIMARY KEY,
+    Version BIGINT NOT NULL,
+    SyncedAt TIMESTAMP NOT NULL
+)
+"""
+
+# Записи вместе с местоположениями - одно обращение к серверу на пакет
+SOURCE_QUERY = """
+SELECT wb.BottleID, wb.WineName, wb.Producer, wb.Vintage, wb.Region,
+       wb.PurchasePrice, wb.PurchaseDate,
+       wl.LocationID, wl.Shelf, wl.Rack, wl.Cellar, wl.Quantity
+FROM WineBottle wb
+LEFT JOIN WineLocation wl ON wb.BottleID = wl.BottleID
+"""
+
+BOTTLE_INSERT = (
+    "INSERT INTO WineBottle (BottleID, WineName, Producer, Vintage, Region, PurchasePrice, PurchaseDate) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s)"
+)
+LOCATION_INSERT = (
+    "INSERT INTO WineLocation (LocationID, BottleID, Shelf, Rack, Cellar, Quantity) "
+    "VALUES (%s, %s, %s, %s, %s, %s)"
+)
+
+
+def split_rows(rows, last_id=None):
+    """Разделение строк SOURCE_QUERY (упорядоченных по BottleID) на строки
+    WineBottle и WineLocation
+
+    last_id - BottleID последней строки предыдущего пакета. Возвращает
+    (записи, местоположения, BottleID последней строки).
+    """
+    bottles = []
+    locations = []
+    for row in rows:
+        if row[0] != last_id:
+            bottles.append(row[:7])
+            last_id = row[0]
+        if row[7] is not None:
+            locations.append((row[7], row[0], *row[8:]))
+    return bottles, locations, last_id
+
+
+class LocalReplica:
+    """Локальная копия коллекции в SQLite с фоновой синхронизацией из MySQL"""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, path, sync_interval=30, batch_size=500, source_backend=None, gap_grace=120):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.gap_grace = gap_grace
+        self.batch_size = batch_size
+        self.backend = SQLiteBackend(path)
+        self.source_backend = source_backend or create_backend()
+        self.pool = ConnectionPool({'autocommit': True}, min_size=0, max_size=Config.DB_POOL_MAX_SIZE,
+                                   connect=self.backend.connect)
+        self.source_pool = ConnectionPool({'autocommit': True}, min_size=0, max_size=1,
+                                          connect=self.source_backend.connect)
+        self.metrics = MetricsRegistry.instance()
+
+        self.version = None  # ChangeID, до которого журнал перенесен без пропусков
+        self._last_read = None  # наибольший прочитанный ChangeID
+        self._gaps = {}  # пропущенный ChangeID -> время обнаружения (monotonic)
+        self.source_version = None  # наибольший ChangeID MySQL при последней синхронизации
+        self.collection_version = None  # версия коллекции MySQL, перенесенная в реплику
+        self.synced_at = None  # время последней успешной синхронизации
+        self._schema_ready = False
+        self._requested = 0  # запросы синхронизации после изменений данных
+        self._completed = 0  # из них выполнено
+        self._lock = None
+        self._wakeup = None
+        self._started = False
+        self._stats = {
+            'syncs': 0,
+            'full_syncs': 0,
+            'records_applied': 0,
+            'errors': 0,
+            'last_error': None,
+            'last_sync_duration': 0.0,
+        }
+
+    @classmethod
+    def shared(cls):
+        """Получение общей реплики с настройками из Config"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls(Config.READ_REPLICA_PATH, Config.READ_REPLICA_SYNC_INTERVAL,
+                                    Config.DB_BULK_CHUNK_SIZE, gap_grace=Config.READ_REPLICA_GAP_GRACE)
+            return cls._instance
+
+    @property
+    def usable(self):
+        """Реплика заполнена и содержит все изменения, сделанные через приложение"""
+        return self.version is not None and self._completed >= self._requested
+
+    def start(self):
+        """Запуск фоновой синхронизации в общем цикле событий"""
+        with LocalReplica._instance_lock:
+            if self._started:
+                return
+            self._started = True
+        service = AsyncLoopService.instance()
+        service.add_shutdown_hook(self.close)
+        service.submit(self.run())
+
+    def request_sync(self):
+        """Запрос синхронизации после изменения данных в MySQL"""
+        self._requested += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self):
+        """Синхронизация каждые sync_interval секунд и по запросу"""
+        self._wakeup = asyncio.Event()
+        try:
+            # Состояние реплики читается сразу, чтобы без связи с MySQL
+            # чтение шло из уже заполненной реплики
+            await self._ensure_schema()
+        except Exception as e:
+            print(f"Ошибка открытия реплики {self.path}: {e}")
+
+        while True:
+            self._wakeup.clear()
+            await self.sync()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.sync_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self):
+        await self.pool.close()
+        await self.source_pool.close()
+
+    async def _ensure_schema(self):
+        """Создание схемы реплики теми же миграциями и чтение ее состояния"""
+        if self._schema_ready:
+            return
+
+        async with self.pool.connection() as conn:
+            await run_migrations(conn)
+            async with conn.cursor() as cursor:
+                await cursor.execute(REPLICA_STATE_DDL)
+                await cursor.execute("SELECT Version, SyncedAt FROM ReplicaState WHERE Id = 1")
+                row = await cursor.fetchone()
+        if row:
+            self.version, self.synced_at = row
+        self._schema_ready = True
+
+    async def sync(self, full=False):
+        """Перенос изменений из MySQL
+
+        full - скопировать коллекцию заново. Возвращает количество
+        обновленных записей или None при ошибке.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        requested = self._requested
+
+        async with self._lock:
+            started = time.perf_counter()
+            try:
+                with self.metrics.query_timer('replica_sync') as timer:
+                    await self._ensure_schema()
+                    if self.synced_at is not None:
+                        timer.observe('staleness', (datetime.now() - self.synced_at).total_seconds())
+
+                    async with self.source_pool.connection() as source:
+                        async with source.cursor() as source_cursor:
+                            # Версия читается раньше журнала: изменения всех
+                            # учтенных в ней транзакций уже есть в журнале
+                            collection_version = await changelog.get_version(source_cursor)
+                            self.source_version = await changelog.get_last_change_id(source_cursor)
+                            if self.version is not None:
+                                timer.observe('lag', max(self.source_version - self.version, 0))
+
+                            if full or await self._needs_full_sync(source_cursor):
+                                applied = await self._copy_all(source)
+                            else:
+                                applied = await self._apply_changes(source_cursor)
+
+                    if not applied:
+                        async with self.pool.connection() as conn:
+                            async with conn.cursor() as cursor:
+                                await self._save_state(cursor, self.version)
+                    timer.add_rows(applied)
+            except Exception as e:
+                self._stats['errors'] += 1
+                self._stats['last_error'] = str(e)
+                print(f"Ошибка синхронизации реплики: {e}")
+                return None
+            finally:
+                self._stats['last_sync_duration'] = time.perf_counter() - started
+
+        self.collection_version = collection_version
+        self._completed = max(self._completed, requested)
+        self._stats['syncs'] += 1
+        self._stats['records_applied'] += applied
+        self._stats['last_error'] = None
+        if applied:
+            QueryCache.shared().invalidate()
+        return applied
+
+    async def _needs_full_sync(self, source_cursor):
+        """Нужно ли копировать коллекцию заново"""
+        if self.version is None or self.version > self.source_version:
+            return True
+        if self.version == self.source_version:
+            return False
+
+        # Журнал очищен дальше перенесенной версии - часть изменений потеряна
+        await source_cursor.execute("SELECT MIN(ChangeID) FROM WineChangeLog")
+        row = await source_cursor.fetchone()
+        return not row or row[0] is None or row[0] > self.version + 1
+
+    async def _copy_all(self, source):
+        """Полное копирование коллекции одним проходом по MySQL"""
+        version = self.source_version
+        copied = 0
+        async with self.pool.connection() as conn:
+            await conn.begin()
+            async with conn.cursor() as cursor:
+                await cursor.execute("DELETE FROM WineLocation")
+                await cursor.execute("DELETE FROM WineBottle")
+
+                async with source.cursor(self.source_backend.streaming_cursor) as source_cursor:
+                    await source_cursor.execute(SOURCE_QUERY + " ORDER BY wb.BottleID")
+                    last_id = None
+                    while True:
+                        rows = await source_cursor.fetchmany(self.batch_size)
+                        if not rows:
+                            break
+                        bottles, locations, last_id = split_rows(rows, last_id)
+                        await self._insert(cursor, bottles, locations)
+                        copied += len(bottles)
+
+                await summary.rebuild_summaries(cursor)
+                await self._save_state(cursor, version)
+            await conn.commit()
+
+        self.version = self._last_read = version
+        self._gaps.clear()
+        self._stats['full_syncs'] += 1
+        return copied
+
+    async def _apply_changes(self, source_cursor):
+        """Перенос изменений из журнала пакетами по batch_size в порядке ChangeID"""
+        if self._last_read is None or self._last_read < self.version:
+            # После запуска журнал перечитывается с сохраненной версии:
+            # повторный перенос записи ничего не портит
+            self._last_read = self.version
+        step = await self.source_backend.dialect.auto_increment_step(source_cursor)
+
+        applied = await self._apply_gaps(source_cursor)
+        while self._last_read < self.source_version:
+            await source_cursor.execute(
+                "SELECT ChangeID, BottleID FROM WineChangeLog WHERE ChangeID > %s ORDER BY ChangeID LIMIT %s",
+                (self._last_read, self.batch_size)
+            )
+            changes = await source_cursor.fetchall()
+            if not changes:
+                break
+
+            # ChangeID, которых нет между прочитанными, принадлежат
+            # незафиксированным транзакциям - их запросим позже
+            noticed = time.monotonic()
+            previous = self._last_read
+            for change_id, _ in changes:
+                for missing in range(previous + step, change_id, step):
+                    self._gaps.setdefault(missing, noticed)
+                previous = change_id
+            self._last_read = changes[-1][0]
+            applied += await self._apply_bottles(source_cursor, {row[1] for row in changes})
+        return applied
+
+    async def _apply_gaps(self, source_cursor):
+        """Повторный запрос пропущенных ChangeID
+
+        Появившиеся в журнале изменения переносятся; пропуски старше
+        gap_grace секунд считаются откаченными транзакциями.
+        """
+        if not self._gaps:
+            return 0
+
+        gaps = sorted(self._gaps)
+        found = []
+        for start in range(0, len(gaps), self.batch_size):
+            chunk = gaps[start:start + self.batch_size]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            await source_cursor.execute(
+                f"SELECT ChangeID, BottleID FROM WineChangeLog WHERE ChangeID IN ({placeholders})", chunk
+            )
+            found.extend(await source_cursor.fetchall())
+
+        for change_id, _ in found:
+            del self._gaps[change_id]
+        expired = time.monotonic() - self.gap_grace
+        for change_id, noticed in list(self._gaps.items()):
+            if noticed < expired:
+                del self._gaps[change_id]
+
+        applied = await self._apply_bottles(source_cursor, {row[1] for row in found})
+        # Версия сохраняется в sync(), если переносить было нечего
+        self.version = self._applied_version()
+        return applied
+
+    def _applied_version(self):
+        """ChangeID, до которого все изменения перенесены или признаны откаченными"""
+        if self._gaps:
+            return min(self._gaps) - 1
+        return self._last_read
+
+    async def _apply_bottles(self, source_cursor, bottle_ids):
+        """Замена записей bottle_ids в реплике текущими записями MySQL"""
+        bottle_ids = sorted(bottle_ids)
+        for start in range(0, len(bottle_ids), self.batch_size):
+            chunk = bottle_ids[start:start + self.batch_size]
+            # Записи читаются после журнала, поэтому содержат не меньше
+            # изменений, чем перенесено; более поздние повторятся в следующем пакете
+            placeholders = ", ".join(["%s"] * len(chunk))
+            await source_cursor.execute(
+                SOURCE_QUERY + f" WHERE wb.BottleID IN ({placeholders}) ORDER BY wb.BottleID", chunk
+            )
+            bottles, locations, _ = split_rows(await source_cursor.fetchall())
+            version = self._applied_version()
+
+            async with self.pool.connection() as conn:
+                await conn.begin()
+                async with conn.cursor() as cursor:
+                    await summary.apply_summary_delta(cursor, chunk, -1)
+                    await cursor.execute(f"DELETE FROM WineLocation WHERE BottleID IN ({placeholders})", chunk)
+                    await cursor.execute(f"DELETE FROM WineBottle WHERE BottleID IN ({placeholders})", chunk)
+                    await self._insert(cursor, bottles, locations)
+                    await summary.apply_summary_delta(cursor, chunk, 1)
+                    await self._save_state(cursor, version)
+                await conn.commit()
+
+            self.version = version
+        return len(bottle_ids)
+
+    async def _insert(self, cursor, bottles, locations):
+        if bottles:
+            await cursor.executemany(BOTTLE_INSERT, bottles)
+        if locations:
+            await cursor.executemany(LOCATION_INSERT, locations)
+
+    async def _save_state(self, cursor, version):
+        """Запись перенесенной версии и времени синхронизации"""
+        self.synced_at = datetime.now().replace(microsecond=0)
+        await cursor.execute(
+            "INSERT INTO ReplicaState (Id, Version, SyncedAt) VALUES (1, %s, %s)"
+            + SQLITE.upsert('Id', replace=('Version', 'SyncedAt')),
+            (version, self.synced_at)
+        )
+
+    async def check(self):
+        """Чтение состояния реплики и текущей версии MySQL без синхронизации"""
+        await self._ensure_schema()
+        async with self.source_pool.connection() as source:
+            async with source.cursor() as source_cursor:
+                self.source_version = await changelog.get_last_change_id(source_cursor)
+        return self.get_metrics()
+
+    def get_metrics(self):
+        """Состояние реплики: отставание от MySQL и давность синхронизации
+
+        lag_changes - число изменений MySQL, еще не перенесенных в реплику
+        (по последней известной версии MySQL), staleness_seconds - время
+        с последней успешной синхронизации.
+        """
+        metrics = dict(self._stats)
+        lag = None
+        if self.version is not None and self.source_version is not None:
+            lag = max(self.source_version - self.version, 0)
+        metrics.update({
+            'path': self.path,
+            'running': self._started,
+            'usable': self.usable,
+            'version': self.version,
+            'source_version': self.source_version,
+            'collection_version': self.collection_version,
+            'lag_changes': lag,
+            'pending_gaps': len(self._gaps),
+            'synced_at': self.synced_at.isoformat() if self.synced_at else None,
+            'staleness_seconds': ((datetime.now() - self.synced_at).total_seconds()
+                                  if self.synced_at else None),
+            'sync_interval': self.sync_interval,
+        })
+        return metrics
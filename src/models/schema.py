@@ -0,0 +1,91 @@
+"""
+Индексы схемы WINESTORE
+
+has_index и ensure_index используются миграциями (пакет migrations) для
+идемпотентного создания индексов.
+
+Полнотекстовый индекс для поиска вин строится по WineName, Producer и
+Region с парсером ngram, который разбивает текст на n-граммы и поэтому
+работает с кириллицей и поиском по части слова.
+
+Уникальный ключ WineLocation.BottleID позволяет обновлять местоположение
+через INSERT ... ON DUPLICATE KEY UPDATE (в SQLite - ON CONFLICT).
+"""
+
+from models.backends.dialect import dialect_of
+
+SEARCH_INDEX_NAME = 'ft_winebottle_search'
+SEARCH_INDEX_COLUMNS = "WineName, Producer, Region"
+
+LOCATION_KEY_NAME = 'uq_winelocation_bottle'
+
+# Символы операторов BOOLEAN MODE, которые удаляются из поискового запроса
+_BOOLEAN_OPERATORS = '+-<>()~*"@'
+
+
+async def has_index(cursor, table, index_name):
+    """Проверка наличия индекса index_name в таблице table"""
+    return await dialect_of(cursor).has_index(cursor, table, index_name)
+
+
+async def ensure_index(cursor, table, index_name, columns, kind='INDEX'):
+    """Создание индекса, если его нет
+
+    kind - INDEX, UNIQUE INDEX или FULLTEXT INDEX. Возвращает True, если
+    индекс был создан.
+    """
+    if await has_index(cursor, table, index_name):
+        return False
+    await cursor.execute(dialect_of(cursor).add_index_sql(table, index_name, columns, kind))
+    return True
+
+
+async def has_search_index(cursor):
+    """Проверка наличия полнотекстового индекса"""
+    return await has_index(cursor, 'WineBottle', SEARCH_INDEX_NAME)
+
+
+async def ensure_search_index(cursor):
+    """Создание полнотекстового индекса, если его нет
+
+    Возвращает True, если индекс был создан. В SQLite полнотекстового
+    индекса нет, поиск всегда выполняется через LIKE.
+    """
+    if not dialect_of(cursor).supports_fulltext or await has_search_index(cursor):
+        return False
+    await cursor.execute(
+        f"ALTER TABLE WineBottle ADD FULLTEXT INDEX {SEARCH_INDEX_NAME} "
+        f"({SEARCH_INDEX_COLUMNS}) WITH PARSER ngram"
+    )
+    return True
+
+
+def fulltext_phrase(search_term):
+    """Преобразование строки поиска в фразу для MATCH ... AGAINST IN BOOLEAN MODE"""
+    cleaned = ''.join(' ' if char in _BOOLEAN_OPERATORS else char for char in search_term)
+    cleaned = ' '.join(cleaned.split())
+    return f'"{cleaned}"' if cleaned else ''
+
+
+async def has_location_unique_key(cursor):
+    """Проверка наличия уникального ключа, состоящего только из WineLocation.BottleID"""
+    return await dialect_of(cursor).has_unique_key(cursor, 'WineLocation', 'BottleID')
+
+
+async def ensure_location_unique_key(cursor):
+    """Создание уникального ключа WineLocation.BottleID, если его нет
+
+    Возвращает True, если ключ есть или создан, и False, если создать его
+    нельзя (в таблице есть несколько местоположений одной бутылки).
+    """
+    if await has_location_unique_key(cursor):
+        return True
+
+    await cursor.execute(
+        "SELECT BottleID FROM WineLocation GROUP BY BottleID HAVING COUNT(*) > 1 LIMIT 1"
+    )
+    if await cursor.fetchone():
+        return False
+
+    await cursor.execute(dialect_of(cursor).add_index_sql('WineLocation', LOCATION_KEY_NAME, 'BottleID', 'UNIQUE KEY'))
+    return True
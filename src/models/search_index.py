@@ -0,0 +1,102 @@
+"""
+Локальный триграммный индекс для быстрого поиска по коллекции
+
+Индекс строится по названию, производителю и региону загруженных записей
+и отвечает на поиск подстроки без обращения к MySQL. Регистр и буквы
+ё/е не различаются.
+"""
+
+SEARCH_FIELDS = ('Varietal', 'Producer', 'Region')
+TRIGRAM_LENGTH = 3
+
+
+def normalize_text(text):
+    """Приведение текста к виду для поиска: нижний регистр, ё -> е"""
+    return str(text or '').lower().replace('ё', 'е')
+
+
+def trigrams(text):
+    """Множество триграмм нормализованного текста"""
+    return {text[i:i + TRIGRAM_LENGTH] for i in range(len(text) - TRIGRAM_LENGTH + 1)}
+
+
+class TrigramIndex:
+    """Триграммный индекс записей о винах
+
+    Записи - словари в формате row_to_wine. Кандидаты отбираются
+    пересечением списков триграмм запроса и затем проверяются на точное
+    вхождение подстроки, поэтому ложных совпадений нет. Запросы короче
+    трех символов проверяются перебором всех записей.
+    """
+
+    def __init__(self, wines=None):
+        self._postings = {}  # триграмма -> множество BottleID
+        self._documents = {}  # BottleID -> (запись, нормализованные поля)
+        if wines:
+            for wine in wines:
+                self.add(wine)
+
+    def __len__(self):
+        return len(self._documents)
+
+    def __contains__(self, bottle_id):
+        return bottle_id in self._documents
+
+    def add(self, wine):
+        """Добавление записи в индекс (существующая запись заменяется)"""
+        bottle_id = wine['BottleID']
+        if bottle_id in self._documents:
+            self.remove(bottle_id)
+
+        fields = tuple(normalize_text(wine.get(field)) for field in SEARCH_FIELDS)
+        self._documents[bottle_id] = (dict(wine), fields)
+        for trigram in set().union(*(trigrams(field) for field in fields)):
+            self._postings.setdefault(trigram, set()).add(bottle_id)
+
+    def update(self, wine):
+        """Обновление записи в индексе"""
+        self.add(wine)
+
+    def remove(self, bottle_id):
+        """Удаление записи из индекса"""
+        document = self._documents.pop(bottle_id, None)
+        if document is None:
+            return False
+
+        for trigram in set().union(*(trigrams(field) for field in document[1])):
+            posting = self._postings.get(trigram)
+            if posting is not None:
+                posting.discard(bottle_id)
+                if not posting:
+                    del self._postings[trigram]
+        return True
+
+    def search(self, query, limit=None):
+        """Поиск записей, у которых query входит в одно из полей
+
+        Результаты упорядочены по убыванию BottleID, как и в выдаче БД.
+        """
+        needle = normalize_text(query).strip()
+        if not needle:
+            return []
+
+        if len(needle) < TRIGRAM_LENGTH:
+            candidates = self._documents.keys()
+        else:
+            postings = []
+            for trigram in trigrams(needle):
+                posting = self._postings.get(trigram)
+                if not posting:
+                    return []
+                postings.append(posting)
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+
+        matches = [
+            bottle_id for bottle_id in candidates
+            if any(needle in field for field in self._documents[bottle_id][1])
+        ]
+        matches.sort(reverse=True)
+        if limit is not None:
+            matches = matches[:limit]
+        return [dict(self._documents[bottle_id][0]) for bottle_id in matches]
@@ -0,0 +1,148 @@
+"""
+Сводные таблицы статистики коллекции
+
+WineStatsTotal, WineStatsRegion и WineStatsVintage хранят количество
+бутылок и их стоимость и обновляются в той же транзакции, что и изменения
+WineBottle, поэтому статистика читается без просмотра всей коллекции.
+Пустой регион хранится как '', отсутствующий год урожая - как 0.
+"""
+
+from models.backends.dialect import dialect_of
+
+SUMMARY_TABLES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS WineStatsTotal (
+        Id TINYINT UNSIGNED NOT NULL PRIMARY KEY,
+        BottleCount BIGINT NOT NULL DEFAULT 0,
+        PricedCount BIGINT NOT NULL DEFAULT 0,
+        TotalValue {money} NOT NULL DEFAULT 0
+    ){table_options}
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS WineStatsRegion (
+        Region VARCHAR(255) NOT NULL PRIMARY KEY,
+        BottleCount BIGINT NOT NULL DEFAULT 0,
+        PricedCount BIGINT NOT NULL DEFAULT 0,
+        TotalValue {money} NOT NULL DEFAULT 0
+    ){table_options}
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS WineStatsVintage (
+        Vintage INT NOT NULL PRIMARY KEY,
+        BottleCount BIGINT NOT NULL DEFAULT 0,
+        PricedCount BIGINT NOT NULL DEFAULT 0,
+        TotalValue {money} NOT NULL DEFAULT 0
+    ){table_options}
+    """,
+]
+
+# Агрегаты по WineBottle в разрезе ключей сводных таблиц;
+# {where} заменяется условием отбора строк
+_AGGREGATES = {
+    'WineStatsTotal': (
+        "Id",
+        "SELECT 1, {sign} * COUNT(*), {sign} * COUNT(PurchasePrice), "
+        "{sign} * COALESCE(SUM(PurchasePrice), 0) FROM WineBottle {where}"
+    ),
+    'WineStatsRegion': (
+        "Region",
+        "SELECT COALESCE(Region, ''), {sign} * COUNT(*), {sign} * COUNT(PurchasePrice), "
+        "{sign} * COALESCE(SUM(PurchasePrice), 0) FROM WineBottle {where} "
+        "GROUP BY COALESCE(Region, '')"
+    ),
+    'WineStatsVintage': (
+        "Vintage",
+        "SELECT COALESCE(Vintage, 0), {sign} * COUNT(*), {sign} * COUNT(PurchasePrice), "
+        "{sign} * COALESCE(SUM(PurchasePrice), 0) FROM WineBottle {where} "
+        "GROUP BY COALESCE(Vintage, 0)"
+    ),
+}
+
+_COLUMNS = "BottleCount, PricedCount, TotalValue"
+
+
+def _upsert_query(dialect, table, sign, where):
+    """Запрос, прибавляющий агрегаты строк WineBottle к сводной таблице
+
+    where обязателен: в SQLite без WHERE окончание ON CONFLICT в
+    INSERT ... SELECT разбирается неоднозначно.
+    """
+    key, select = _AGGREGATES[table]
+    return (
+        f"INSERT INTO {table} ({key}, {_COLUMNS}) "
+        + select.format(sign=int(sign), where=where)
+        + dialect.upsert(key, increment=("BottleCount", "PricedCount", "TotalValue"))
+    )
+
+
+def _normalize(values):
+    """Значения сводной строки для сравнения (суммы в SQLite - REAL)"""
+    count, priced, total = values
+    return count, priced, round(total, 2)
+
+
+async def ensure_summary_tables(cursor):
+    """Создание сводных таблиц, если их нет
+
+    Возвращает True, если сводные данные еще не построены.
+    """
+    dialect = dialect_of(cursor)
+    for statement in SUMMARY_TABLES_DDL:
+        await cursor.execute(statement.format(table_options=dialect.table_options,
+                                              money=dialect.decimal(18, 2)))
+    await cursor.execute("SELECT COUNT(*) FROM WineStatsTotal")
+    row = await cursor.fetchone()
+    return not row or not row[0]
+
+
+async def apply_summary_delta(cursor, bottle_ids, sign):
+    """Учет записей в сводных таблицах
+
+    sign = 1 добавляет записи bottle_ids к итогам, sign = -1 вычитает их.
+    Вызывается внутри транзакции изменения: для удаления и обновления -
+    до изменения строк WineBottle, для добавления и обновления - после.
+    """
+    if not bottle_ids:
+        return
+
+    placeholders = ", ".join(["%s"] * len(bottle_ids))
+    where = f"WHERE BottleID IN ({placeholders})"
+    dialect = dialect_of(cursor)
+    for table in _AGGREGATES:
+        await cursor.execute(_upsert_query(dialect, table, sign, where), list(bottle_ids))
+
+    if sign < 0:
+        await cursor.execute("DELETE FROM WineStatsRegion WHERE BottleCount <= 0")
+        await cursor.execute("DELETE FROM WineStatsVintage WHERE BottleCount <= 0")
+
+
+async def rebuild_summaries(cursor):
+    """Полный пересчет сводных таблиц по WineBottle
+
+    INSERT ... SELECT блокирует строки WineBottle до конца транзакции,
+    поэтому параллельные изменения не теряются.
+    """
+    dialect = dialect_of(cursor)
+    for table in _AGGREGATES:
+        await cursor.execute(f"DELETE FROM {table}")
+        await cursor.execute(_upsert_query(dialect, table, 1, "WHERE 1=1"))
+
+
+async def verify_summaries(cursor):
+    """Сравнение сводных таблиц с фактическими данными WineBottle
+
+    Возвращает список расхождений: (таблица, ключ, ожидаемые значения,
+    сохраненные значения).
+    """
+    mismatches = []
+    for table, (key, select) in _AGGREGATES.items():
+        await cursor.execute(select.format(sign=1, where=""))
+        expected = {row[0]: _normalize(row[1:]) for row in await cursor.fetchall() if row[1]}
+
+        await cursor.execute(f"SELECT {key}, {_COLUMNS} FROM {table} WHERE BottleCount != 0")
+        stored = {row[0]: _normalize(row[1:]) for row in await cursor.fetchall()}
+
+        for summary_key in sorted(set(expected) | set(stored), key=str):
+            if expected.get(summary_key) != stored.get(summary_key):
+                mismatches.append((table, summary_key, expected.get(summary_key), stored.get(summary_key)))
+    return mismatches
@@ -1,6 +1,9 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel
+from datetime import datetime
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QGroupBox,
+                            QPushButton, QMessageBox, QFileDialog)
 from PyQt6.QtGui import QFont
 from PyQt6.QtCore import Qt
+from utils.metrics import MetricsRegistry
 
 class AdminWindow(QWidget):
     def __init__(self, parent=None):
@@ -24,4 +27,47 @@ class AdminWindow(QWidget):
         info.setWordWrap(True)
         layout.addWidget(info)
         
+        # Метрики запросов к базе данных
+        metrics_group = QGroupBox("⏱️ Метрики запросов к базе данных")
+        metrics_layout = QHBoxLayout()
+        
+        save_json_btn = QPushButton("💾 Сохранить в JSON")
+        save_json_btn.clicked.connect(lambda: self.save_metrics('json'))
+        metrics_layout.addWidget(save_json_btn)
+        
+        save_prometheus_btn = QPushButton("📈 Сохранить для Prometheus")
+        save_prometheus_btn.clicked.connect(lambda: self.save_metrics('prometheus'))
+        metrics_layout.addWidget(save_prometheus_btn)
+        
+        reset_btn = QPushButton("🔄 Сбросить метрики")
+        reset_btn.clicked.connect(self.reset_metrics)
+        metrics_layout.addWidget(reset_btn)
+        
+        metrics_group.setLayout(metrics_layout)
+        layout.addWidget(metrics_group)
+        layout.addStretch()
+        
         self.setLayout(layout)
+    
+    def save_metrics(self, fmt):
+        """Сохранение метрик запросов в файл"""
+        if fmt == 'json':
+            file_filter = "JSON Files (*.json)"
+            default_name = f"db_metrics_{datetime.now().strftime('%Y%m%d_%H%M')}.json"
+        else:
+            file_filter = "Text Files (*.prom *.txt)"
+            default_name = f"db_metrics_{datetime.now().strftime('%Y%m%d_%H%M')}.prom"
+        
+        filename, _ = QFileDialog.getSaveFileName(self, "Сохранить метрики", default_name, file_filter)
+        if not filename:
+            return
+        
+        try:
+            MetricsRegistry.instance().dump(filename, fmt)
+            QMessageBox.information(self, "Успех", f"Метрики сохранены в файл:\n{filename}")
+        except Exception as e:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось сохранить метрики: {e}")
+    
+    def reset_metrics(self):
+        MetricsRegistry.instance().reset()
+        QMessageBox.information(self, "Успех", "Метрики сброшены")
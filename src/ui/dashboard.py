@@ -7,9 +7,13 @@ from models.database import AsyncDatabaseManager, DatabaseWorker
 from ui.widgets.chart_widget import SimpleChartWidget
 
 class DashboardWindow(QWidget):
+    RECENT_WINES_COUNT = 5
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.db_manager = AsyncDatabaseManager()
+        # Версия коллекции, для которой загружены данные дашборда
+        self.loaded_version = None
         self.init_ui()
     
     def init_ui(self):
@@ -125,9 +129,10 @@ class DashboardWindow(QWidget):
         
         self.setLayout(main_layout)
         
-        # Таймер для автоматического обновления каждые 30 секунд
+        # Таймер проверки изменений каждые 30 секунд; полное обновление
+        # выполняется, только если изменилась версия коллекции
         self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self.on_update_dashboard)
+        self.update_timer.timeout.connect(self.on_check_for_changes)
         self.update_timer.start(30000)  # 30 секунд
         
         # Отложенная инициализация
@@ -150,32 +155,66 @@ class DashboardWindow(QWidget):
         """Запуск обновления дашборда"""
         self.update_dashboard()
     
+    def on_check_for_changes(self):
+        """Запуск проверки версии коллекции"""
+        self.check_for_changes()
+    
     def on_apply_filters(self):
         """Запуск применения фильтров"""
         self.apply_filters()
     
+    def check_for_changes(self):
+        """Проверка версии коллекции без загрузки данных"""
+        self.version_worker = DatabaseWorker(self.db_manager.get_collection_version)
+        self.version_worker.finished.connect(self.on_version_checked)
+        self.version_worker.error.connect(lambda e: print(f"Ошибка проверки изменений: {e}"))
+        self.version_worker.start()
+    
+    def on_version_checked(self, version):
+        if version != self.loaded_version:
+            self.update_dashboard()
+    
     def update_dashboard(self):
         """Обновление дашборда"""
         try:
-            self.worker = DatabaseWorker(self.db_manager.get_statistics)
+            self.worker = DatabaseWorker(self.load_statistics)
             self.worker.finished.connect(self.on_stats_loaded)
             self.worker.error.connect(self.on_database_error)
             self.worker.start()
         except Exception as e:
             print(f"Ошибка обновления дашборда: {e}")
     
-    def on_stats_loaded(self, stats):
+    async def load_statistics(self):
+        """Загрузка версии коллекции и статистики
+
+        Версия читается до статистики, поэтому изменения, сделанные во
+        время загрузки, будут замечены при следующей проверке.
+        """
+        version = await self.db_manager.get_collection_version()
+        stats = await self.db_manager.get_statistics()
+        return version, stats
+    
+    def on_stats_loaded(self, data):
         """Обработка загруженной статистики"""
+        version, stats = data
         try:
-            self.wine_worker = DatabaseWorker(self.db_manager.get_wine_bottles)
-            self.wine_worker.finished.connect(lambda wines: self.finalize_stats_update(stats, wines))
+            self.wine_worker = DatabaseWorker(self.load_recent_data)
+            self.wine_worker.finished.connect(lambda data: self.finalize_stats_update(stats, *data, version=version))
             self.wine_worker.error.connect(self.on_database_error)
             self.wine_worker.start()
         except Exception as e:
             print(f"Ошибка обработки статистики: {e}")
     
-    def finalize_stats_update(self, stats, wines):
+    async def load_recent_data(self):
+        """Загрузка списка регионов и последних добавленных вин"""
+        regions = await self.db_manager.get_regions()
+        page = await self.db_manager.get_wine_bottles_page(self.RECENT_WINES_COUNT)
+        return regions, page['items']
+    
+    def finalize_stats_update(self, stats, regions, wines, version=None):
         """Завершение обновления статистики с данными о винах"""
+        self.loaded_version = version
+        
         # Обновляем карточки метрик
         self.metric_cards['total'].layout().itemAt(0).widget().setText(str(stats['total_bottles']))
         self.metric_cards['storage'].layout().itemAt(0).widget().setText(str(stats['in_storage']))
@@ -190,7 +229,6 @@ class DashboardWindow(QWidget):
         current_region = self.region_filter.currentText()
         self.region_filter.clear()
         self.region_filter.addItem("Все регионы")
-        regions = list(set(wine['Region'] for wine in wines if wine['Region']))
         self.region_filter.addItems(regions)
         
         # Восстанавливаем выбранный регион если он еще существует
@@ -198,7 +236,7 @@ class DashboardWindow(QWidget):
             self.region_filter.setCurrentText(current_region)
         
         # Обновляем таблицу
-        self.update_recent_wines_table(wines[-5:] if wines else [])
+        self.update_recent_wines_table(wines)
     
     def apply_filters(self):
         """Применение фильтров"""
@@ -210,8 +248,8 @@ class DashboardWindow(QWidget):
         if self.status_filter.currentText() != "Все статусы":
             pass
         
-        self.filter_worker = DatabaseWorker(self.db_manager.search_wines, "", filters)
-        self.filter_worker.finished.connect(lambda wines: self.update_recent_wines_table(wines[-5:] if wines else []))
+        self.filter_worker = DatabaseWorker(self.db_manager.search_wines_page, "", filters, self.RECENT_WINES_COUNT)
+        self.filter_worker.finished.connect(lambda page: self.update_recent_wines_table(page['items']))
         self.filter_worker.error.connect(self.on_database_error)
         self.filter_worker.start()
     
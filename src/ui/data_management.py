@@ -2,15 +2,24 @@ from datetime import datetime  # Добавьте этот импорт
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                             QPushButton, QMessageBox, QGroupBox, QComboBox,
                             QTableWidget, QTableWidgetItem, QHeaderView,
-                            QTabWidget, QFormLayout, QLineEdit)
-from PyQt6.QtCore import QTimer
+                            QTabWidget, QFormLayout, QLineEdit, QSpinBox)
+from PyQt6.QtCore import QTimer, pyqtSignal
 from models.database import AsyncDatabaseManager, DatabaseWorker
 from ui.dialogs.edit_wine_dialog import EditWineDialog
 
 class DataManagementWindow(QWidget):
+    PAGE_SIZE = 100
+    
+    # Списки BottleID измененных записей (для обновления локального поиска)
+    records_added = pyqtSignal(list)
+    records_updated = pyqtSignal(list)
+    records_deleted = pyqtSignal(list)
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.db_manager = AsyncDatabaseManager()
+        self.view_filters = None
+        self.view_next_cursor = None
         self.init_ui()
     
     def init_ui(self):
@@ -37,6 +46,10 @@ class DataManagementWindow(QWidget):
         self.rack_input = QLineEdit()
         self.cellar_input = QLineEdit()
         
+        # Количество одинаковых бутылок (например, при поступлении ящика)
+        self.quantity_input = QSpinBox()
+        self.quantity_input.setRange(1, 10000)
+        
         form_layout.addRow("Название *:", self.name_input)
         form_layout.addRow("Производитель *:", self.producer_input)
         form_layout.addRow("Регион *:", self.region_input)
@@ -46,6 +59,7 @@ class DataManagementWindow(QWidget):
         form_layout.addRow("Полка:", self.shelf_input)
         form_layout.addRow("Стеллаж:", self.rack_input)
         form_layout.addRow("Погреб:", self.cellar_input)
+        form_layout.addRow("Количество бутылок:", self.quantity_input)
         
         add_layout.addLayout(form_layout)
         
@@ -103,13 +117,17 @@ class DataManagementWindow(QWidget):
         action_layout = QHBoxLayout()
         edit_btn = QPushButton("✏️ Редактировать выбранное")
         delete_btn = QPushButton("🗑️ Удалить выбранное")
+        self.load_more_btn = QPushButton("⬇️ Загрузить еще")
+        self.load_more_btn.setEnabled(False)
         
         edit_btn.clicked.connect(self.edit_selected_record)
         delete_btn.clicked.connect(self.delete_selected_records)
+        self.load_more_btn.clicked.connect(self.on_load_more_records)
         
         action_layout.addWidget(edit_btn)
         action_layout.addWidget(delete_btn)
         action_layout.addStretch()
+        action_layout.addWidget(self.load_more_btn)
         
         view_layout.addLayout(action_layout)
         
@@ -128,6 +146,9 @@ class DataManagementWindow(QWidget):
     def on_load_view_records(self):
         self.load_view_records()
     
+    def on_load_more_records(self):
+        self.load_more_records()
+    
     def on_apply_view_filters(self):
         self.apply_view_filters()
     
@@ -164,19 +185,41 @@ class DataManagementWindow(QWidget):
             'cellar': self.cellar_input.text()
         }
         
-        self.save_worker = DatabaseWorker(self.db_manager.add_wine_bottle, data)
-        self.save_worker.finished.connect(self.on_save_complete)
+        quantity = self.quantity_input.value()
+        if quantity > 1:
+            self.save_worker = DatabaseWorker(self.db_manager.add_wine_bottles, [data] * quantity)
+            self.save_worker.finished.connect(self.on_bulk_save_complete)
+        else:
+            self.save_worker = DatabaseWorker(self.db_manager.add_wine_bottle, data)
+            self.save_worker.finished.connect(self.on_save_complete)
         self.save_worker.error.connect(self.on_save_error)
         self.save_worker.start()
     
-    def on_save_complete(self, success):
-        if success:
+    def on_save_complete(self, new_id):
+        if new_id:
+            self.records_added.emit([new_id])
             QMessageBox.information(self, "Успех", "Запись успешно добавлена")
             self.clear_form()
             self.load_view_records()
         else:
             QMessageBox.warning(self, "Ошибка", "Не удалось добавить запись")
     
+    def on_bulk_save_complete(self, results):
+        added_ids = [result['bottle_id'] for result in results if result and result['success']]
+        added = len(added_ids)
+        if added_ids:
+            self.records_added.emit(added_ids)
+        if added == len(results):
+            QMessageBox.information(self, "Успех", f"Добавлено записей: {added}")
+            self.clear_form()
+            self.load_view_records()
+        else:
+            errors = {result['error'] for result in results if result and not result['success']}
+            QMessageBox.warning(self, "Ошибка",
+                                f"Добавлено {added} из {len(results)} записей:\n" + "\n".join(errors))
+            if added:
+                self.load_view_records()
+    
     def on_save_error(self, error_message):
         QMessageBox.warning(self, "Ошибка", f"Ошибка при сохранении: {error_message}")
     
@@ -190,31 +233,55 @@ class DataManagementWindow(QWidget):
         self.shelf_input.clear()
         self.rack_input.clear()
         self.cellar_input.clear()
+        self.quantity_input.setValue(1)
     
     def load_view_records(self, filters=None):
-        self.load_worker = DatabaseWorker(self.db_manager.get_wine_bottles)
-        self.load_worker.finished.connect(lambda wines: self.display_view_records(wines, filters))
+        """Загрузка первой страницы записей и списка регионов"""
+        self.view_filters = filters
+        self.view_next_cursor = None
+        
+        self.regions_worker = DatabaseWorker(self.db_manager.get_regions)
+        self.regions_worker.finished.connect(self.display_view_regions)
+        self.regions_worker.error.connect(self.on_load_error)
+        self.regions_worker.start()
+        
+        self.load_worker = DatabaseWorker(self.db_manager.get_wine_bottles_page, self.PAGE_SIZE, None, filters)
+        self.load_worker.finished.connect(lambda page: self.display_view_page(page, append=False))
         self.load_worker.error.connect(self.on_load_error)
         self.load_worker.start()
     
-    def display_view_records(self, wines, filters=None):
-        if filters:
-            wines = [w for w in wines if not filters.get('region') or w['Region'] == filters['region']]
-        
-        self.view_records_table.setRowCount(len(wines))
+    def load_more_records(self):
+        """Загрузка следующей страницы записей"""
+        if not self.view_next_cursor:
+            return
         
+        self.load_more_btn.setEnabled(False)
+        self.load_worker = DatabaseWorker(self.db_manager.get_wine_bottles_page, self.PAGE_SIZE,
+                                          self.view_next_cursor, self.view_filters)
+        self.load_worker.finished.connect(lambda page: self.display_view_page(page, append=True))
+        self.load_worker.error.connect(self.on_load_error)
+        self.load_worker.start()
+    
+    def display_view_regions(self, regions):
         # Обновляем фильтр регионов
         current_region = self.view_region_filter.currentText()
         self.view_region_filter.clear()
         self.view_region_filter.addItem("Все регионы")
-        regions = list(set(wine['Region'] for wine in wines if wine['Region']))
         self.view_region_filter.addItems(regions)
         
         # Восстанавливаем выбранный регион если он еще существует
         if current_region in regions:
             self.view_region_filter.setCurrentText(current_region)
+    
+    def display_view_page(self, page, append=False):
+        self.view_next_cursor = page['next_cursor']
+        self.load_more_btn.setEnabled(page['has_more'])
         
-        for row, wine in enumerate(wines):
+        start_row = self.view_records_table.rowCount() if append else 0
+        wines = page['items']
+        self.view_records_table.setRowCount(start_row + len(wines))
+        
+        for row, wine in enumerate(wines, start=start_row):
             self.view_records_table.setItem(row, 0, QTableWidgetItem(str(wine['BottleID'])))
             self.view_records_table.setItem(row, 1, QTableWidgetItem(wine['Varietal']))
             self.view_records_table.setItem(row, 2, QTableWidgetItem(wine['Producer']))
@@ -278,28 +345,31 @@ class DataManagementWindow(QWidget):
         self.open_edit_dialog(bottle_id)
     
     def open_edit_dialog(self, bottle_id):
-        self.edit_worker = DatabaseWorker(self.db_manager.get_wine_bottles)
-        self.edit_worker.finished.connect(lambda wines: self.show_edit_dialog(wines, bottle_id))
+        self.edit_worker = DatabaseWorker(self.db_manager.get_wine_bottle, bottle_id)
+        self.edit_worker.finished.connect(lambda wine: self.show_edit_dialog(wine, bottle_id))
         self.edit_worker.error.connect(self.on_load_error)
         self.edit_worker.start()
     
-    def show_edit_dialog(self, wines, bottle_id):
-        wine = next((w for w in wines if w['BottleID'] == bottle_id), None)
-        
+    def show_edit_dialog(self, wine, bottle_id):
         if not wine:
             QMessageBox.warning(self, "Ошибка", "Запись не найдена")
             return
         
         dialog = EditWineDialog(wine, self)
         if dialog.exec():
-            updated_data = dialog.get_data()
+            updated_data = dialog.get_changes()
+            if not updated_data:
+                # Ничего не изменилось - запрос к базе не нужен
+                return
             self.update_worker = DatabaseWorker(self.db_manager.update_wine_bottle, bottle_id, updated_data)
-            self.update_worker.finished.connect(self.on_update_complete)
+            self.update_worker.finished.connect(lambda success: self.on_update_complete(success, bottle_id))
             self.update_worker.error.connect(self.on_save_error)
             self.update_worker.start()
     
-    def on_update_complete(self, success):
+    def on_update_complete(self, success, bottle_id=None):
         if success:
+            if bottle_id is not None:
+                self.records_updated.emit([bottle_id])
             QMessageBox.information(self, "Успех", "Запись успешно обновлена")
             self.load_view_records()
         else:
@@ -324,18 +394,16 @@ class DataManagementWindow(QWidget):
             self.delete_records(bottle_ids)
     
     def delete_records(self, bottle_ids):
-        self.delete_worker = DatabaseWorker(self.delete_records_async, bottle_ids)
-        self.delete_worker.finished.connect(self.on_delete_complete)
+        self.delete_worker = DatabaseWorker(self.db_manager.delete_wine_bottles, bottle_ids)
+        self.delete_worker.finished.connect(lambda count: self.on_delete_complete(count, bottle_ids))
         self.delete_worker.error.connect(self.on_save_error)
         self.delete_worker.start()
     
-    async def delete_records_async(self, bottle_ids):
-        success_count = 0
-        for bottle_id in bottle_ids:
-            if await self.db_manager.delete_wine_bottle(bottle_id):
-                success_count += 1
-        return success_count
-    
-    def on_delete_complete(self, success_count):
+    def on_delete_complete(self, success_count, bottle_ids=()):
+        if success_count is None:
+            QMessageBox.warning(self, "Ошибка", "Не удалось удалить записи, изменения отменены")
+            return
+        if bottle_ids:
+            self.records_deleted.emit(list(bottle_ids))
         QMessageBox.information(self, "Результат", f"Удалено {success_count} записей")
         self.load_view_records()
@@ -9,6 +9,8 @@ class EditWineDialog(QDialog):
         self.setWindowTitle("Редактирование записи")
         self.setModal(True)
         self.init_ui()
+        # Исходные значения формы для определения измененных полей
+        self.original_data = self.get_data()
     
     def init_ui(self):
         layout = QVBoxLayout()
@@ -93,3 +95,18 @@ class EditWineDialog(QDialog):
             'Rack': self.rack_input.text(),
             'Cellar': self.cellar_input.text()
         }
+    
+    def get_changes(self):
+        """Получение только измененных полей
+
+        Поля местоположения возвращаются вместе, если изменилось хотя бы одно.
+        """
+        data = self.get_data()
+        changes = {key: value for key, value in data.items() if value != self.original_data.get(key)}
+        
+        location_fields = ('Shelf', 'Rack', 'Cellar')
+        if any(field in changes for field in location_fields):
+            for field in location_fields:
+                changes[field] = data[field]
+        
+        return changes
@@ -11,6 +11,7 @@ class ExportWindow(QWidget):
     def __init__(self, parent=None, db_config=None):
         super().__init__(parent)
         self.db_config = db_config
+        self.worker = None
         self.init_ui()
     
     def init_ui(self):
@@ -47,12 +48,20 @@ class ExportWindow(QWidget):
         layout.addWidget(pdf_stats_btn)
         layout.addWidget(pdf_detail_btn)
         layout.addWidget(excel_btn)
+        self.export_buttons = [pdf_stats_btn, pdf_detail_btn, excel_btn]
         
         # Прогресс-бар
         self.progress = QProgressBar()
+        self.progress.setRange(0, 100)
         self.progress.setVisible(False)
         layout.addWidget(self.progress)
         
+        # Отмена выполняющегося экспорта
+        self.cancel_btn = QPushButton("Отмена")
+        self.cancel_btn.setVisible(False)
+        self.cancel_btn.clicked.connect(self.cancel_export)
+        layout.addWidget(self.cancel_btn)
+        
         # Статус
         self.status = QLabel("Готов к экспорту данных")
         self.status.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -91,8 +100,8 @@ class ExportWindow(QWidget):
         """Запуск процесса экспорта"""
         try:
             self.status.setText("Подготовка к экспорту...")
+            self.progress.setValue(0)
             self.progress.setVisible(True)
-            self.progress.setRange(0, 0)  # Неопределенный прогресс
             
             if export_type.startswith("PDF"):
                 if "Статистический" in export_type:
@@ -111,14 +120,39 @@ class ExportWindow(QWidget):
             
             self.worker.finished.connect(self.on_export_finished)
             self.worker.error.connect(self.on_export_error)
+            self.worker.cancelled.connect(self.on_export_cancelled)
+            self.worker.progress.connect(self.progress.setValue)
+            self.worker.status.connect(self.status.setText)
+            self.set_exporting(True)
             self.worker.start()
             
         except Exception as e:
             self.on_export_error(str(e))
     
+    def set_exporting(self, exporting):
+        """Переключение окна в режим выполнения экспорта и обратно"""
+        for button in self.export_buttons:
+            button.setEnabled(not exporting)
+        self.cancel_btn.setEnabled(exporting)
+        self.cancel_btn.setVisible(exporting)
+        if not exporting:
+            self.progress.setVisible(False)
+    
+    def cancel_export(self):
+        """Отмена экспорта: чтение прерывается, недописанный файл удаляется"""
+        if self.worker is not None and self.worker.isRunning():
+            self.cancel_btn.setEnabled(False)
+            self.status.setText("Отмена экспорта...")
+            self.worker.cancel()
+    
+    def on_export_cancelled(self):
+        """Обработка отмены экспорта"""
+        self.set_exporting(False)
+        self.status.setText("Экспорт отменен")
+    
     def on_export_finished(self, filename):
         """Обработка успешного завершения экспорта"""
-        self.progress.setVisible(False)
+        self.set_exporting(False)
         self.status.setText(f"Экспорт завершен: {filename}")
         
         msg = QMessageBox()
@@ -130,7 +164,7 @@ class ExportWindow(QWidget):
     
     def on_export_error(self, error_message):
         """Обработка ошибки экспорта"""
-        self.progress.setVisible(False)
+        self.set_exporting(False)
         self.status.setText("Ошибка экспорта")
         
         QMessageBox.warning(self, "Ошибка", f"Не удалось создать отчет:\n{error_message}")
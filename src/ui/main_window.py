@@ -36,6 +36,11 @@ class MainWindow(QMainWindow):
         self.admin_window = AdminWindow(self)
         self.help_window = HelpWindow(self)
         
+        # Локальный индекс поиска обновляется после изменений записей
+        self.data_management_window.records_added.connect(self.search_window.on_records_changed)
+        self.data_management_window.records_updated.connect(self.search_window.on_records_changed)
+        self.data_management_window.records_deleted.connect(self.search_window.on_records_deleted)
+        
         # Добавляем окна в stacked widget
         self.central_widget.addWidget(self.dashboard_window)
         self.central_widget.addWidget(self.data_management_window)
@@ -4,11 +4,25 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                             QComboBox, QSpinBox)
 from PyQt6.QtCore import QTimer
 from models.database import AsyncDatabaseManager, DatabaseWorker
+from models.search_index import TrigramIndex
 
 class SearchWindow(QWidget):
+    PAGE_SIZE = 100
+    # Задержка поиска при вводе и максимум строк локальной выдачи
+    QUICK_SEARCH_DELAY_MS = 200
+    QUICK_SEARCH_LIMIT = 500
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.db_manager = AsyncDatabaseManager()
+        # Состояние постраничной загрузки для каждой таблицы результатов
+        self.search_states = {}
+        # Локальный индекс быстрого поиска (None, пока не загружен)
+        self.search_index = None
+        self.search_index_loading = False
+        self.search_index_stale = False
+        # Выполняющиеся обновления индекса (ссылки держит окно, а не DatabaseWorker)
+        self.index_update_workers = set()
         self.init_ui()
     
     def init_ui(self):
@@ -25,6 +39,13 @@ class SearchWindow(QWidget):
         self.quick_search_input.setPlaceholderText("Введите название, производителя или регион...")
         quick_search_btn = QPushButton("🔎 Быстрый поиск")
         quick_search_btn.clicked.connect(self.on_quick_search)
+        
+        # Поиск при вводе запускается после паузы в наборе
+        self.quick_search_timer = QTimer(self)
+        self.quick_search_timer.setSingleShot(True)
+        self.quick_search_timer.setInterval(self.QUICK_SEARCH_DELAY_MS)
+        self.quick_search_timer.timeout.connect(self.on_quick_search_typed)
+        self.quick_search_input.textChanged.connect(lambda _: self.quick_search_timer.start())
         quick_search_layout.addWidget(self.quick_search_input)
         quick_search_layout.addWidget(quick_search_btn)
         quick_layout.addLayout(quick_search_layout)
@@ -36,6 +57,7 @@ class SearchWindow(QWidget):
         ])
         self.quick_results_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         quick_layout.addWidget(self.quick_results_table)
+        quick_layout.addWidget(self.create_load_more_button(self.quick_results_table))
         
         quick_tab.setLayout(quick_layout)
         tabs.addTab(quick_tab, "🔎 Быстрый поиск")
@@ -73,6 +95,7 @@ class SearchWindow(QWidget):
         ])
         self.advanced_results_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         advanced_layout.addWidget(self.advanced_results_table)
+        advanced_layout.addWidget(self.create_load_more_button(self.advanced_results_table))
         
         advanced_tab.setLayout(advanced_layout)
         tabs.addTab(advanced_tab, "⚙️ Расширенный поиск")
@@ -100,6 +123,7 @@ class SearchWindow(QWidget):
         ])
         self.filter_results_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         filters_layout.addWidget(self.filter_results_table)
+        filters_layout.addWidget(self.create_load_more_button(self.filter_results_table))
         
         filters_tab.setLayout(filters_layout)
         tabs.addTab(filters_tab, "📑 Фильтры по категориям")
@@ -107,12 +131,30 @@ class SearchWindow(QWidget):
         layout.addWidget(tabs)
         self.setLayout(layout)
         
-        # Загружаем регионы для фильтра
+        # Загружаем регионы для фильтра и локальный индекс поиска
         QTimer.singleShot(100, self.on_load_regions)
+        QTimer.singleShot(200, self.load_search_index)
+    
+    def create_load_more_button(self, table):
+        """Создание кнопки загрузки следующей страницы результатов"""
+        button = QPushButton("⬇️ Загрузить еще")
+        button.setEnabled(False)
+        button.clicked.connect(lambda: self.load_more_results(table))
+        self.search_states[table] = {'search_term': "", 'filters': None, 'cursor': None, 'button': button}
+        return button
     
     def on_quick_search(self):
         self.quick_search()
     
+    def on_quick_search_typed(self):
+        # Без локального индекса поиск при вводе не выполняется, чтобы не нагружать БД
+        if self.search_index is None:
+            return
+        if self.quick_search_input.text().strip():
+            self.quick_search()
+        else:
+            self.quick_results_table.setRowCount(0)
+    
     def on_advanced_search(self):
         self.advanced_search()
     
@@ -123,24 +165,107 @@ class SearchWindow(QWidget):
         self.load_regions()
     
     def load_regions(self):
-        self.region_worker = DatabaseWorker(self.db_manager.get_wine_bottles)
+        self.region_worker = DatabaseWorker(self.db_manager.get_regions)
         self.region_worker.finished.connect(self.display_regions)
         self.region_worker.error.connect(lambda e: print(f"Ошибка загрузки регионов: {e}"))
         self.region_worker.start()
     
-    def display_regions(self, wines):
-        regions = list(set(wine['Region'] for wine in wines if wine['Region']))
-        
+    def display_regions(self, regions):
         self.filter_region.clear()
         self.filter_region.addItem("Все регионы")
         self.filter_region.addItems(regions)
     
+    def load_search_index(self):
+        """Загрузка коллекции в локальный индекс быстрого поиска"""
+        if self.search_index_loading:
+            self.search_index_stale = True
+            return
+        
+        self.search_index_loading = True
+        self.search_index_stale = False
+        self.index_worker = DatabaseWorker(self.build_search_index)
+        self.index_worker.finished.connect(self.on_search_index_loaded)
+        self.index_worker.error.connect(self.on_search_index_error)
+        self.index_worker.start()
+    
+    async def build_search_index(self):
+        """Построение индекса в фоновом цикле событий"""
+        index = TrigramIndex()
+        async for wines in self.db_manager.iter_wine_bottles():
+            for wine in wines:
+                index.add(wine)
+        return index
+    
+    def on_search_index_loaded(self, index):
+        self.search_index_loading = False
+        self.search_index = index
+        # Записи изменились во время загрузки - загружаем индекс заново
+        if self.search_index_stale:
+            self.load_search_index()
+    
+    def on_search_index_error(self, error_message):
+        self.search_index_loading = False
+        print(f"Ошибка загрузки индекса поиска: {error_message}")
+    
+    def on_records_changed(self, bottle_ids):
+        """Обновление локального индекса после добавления или изменения записей"""
+        if self.search_index is None or self.search_index_loading:
+            self.search_index_stale = True
+            return
+        
+        worker = DatabaseWorker(self.db_manager.get_wine_bottles_by_ids, bottle_ids)
+        worker.finished.connect(lambda wines: self.apply_index_changes(bottle_ids, wines, worker))
+        worker.error.connect(lambda e: self.on_index_update_error(e, worker))
+        self.index_update_workers.add(worker)
+        worker.start()
+    
+    def on_records_deleted(self, bottle_ids):
+        """Удаление записей из локального индекса"""
+        if self.search_index is None or self.search_index_loading:
+            self.search_index_stale = True
+            return
+        
+        for bottle_id in bottle_ids:
+            self.search_index.remove(bottle_id)
+        self.refresh_quick_results()
+    
+    def on_index_update_error(self, error_message, worker):
+        self.index_update_workers.discard(worker)
+        print(f"Ошибка обновления индекса поиска: {error_message}")
+        # Изменения не попали в индекс - перечитываем его целиком
+        self.load_search_index()
+    
+    def apply_index_changes(self, bottle_ids, wines, worker=None):
+        self.index_update_workers.discard(worker)
+        if self.search_index is None:
+            return
+        
+        found = set()
+        for wine in wines:
+            self.search_index.update(wine)
+            found.add(wine['BottleID'])
+        # Записи, которых уже нет в базе, убираем из индекса
+        for bottle_id in set(bottle_ids) - found:
+            self.search_index.remove(bottle_id)
+        self.refresh_quick_results()
+    
+    def refresh_quick_results(self):
+        """Повтор быстрого поиска после изменения индекса"""
+        if self.quick_search_input.text().strip():
+            self.quick_search()
+    
     def quick_search(self):
         search_term = self.quick_search_input.text()
-        self.search_worker = DatabaseWorker(self.db_manager.search_wines, search_term)
-        self.search_worker.finished.connect(lambda results: self.display_results(results, self.quick_results_table))
-        self.search_worker.error.connect(lambda e: print(f"Ошибка поиска: {e}"))
-        self.search_worker.start()
+        if self.search_index is None or not search_term.strip():
+            # Индекс еще не загружен или нужен весь список - постранично из базы данных
+            self.run_search(self.quick_results_table, search_term)
+            return
+        
+        results = self.search_index.search(search_term, self.QUICK_SEARCH_LIMIT)
+        state = self.search_states[self.quick_results_table]
+        state.update({'search_term': search_term, 'filters': None, 'cursor': None})
+        state['button'].setEnabled(False)
+        self.display_results(results, self.quick_results_table)
     
     def advanced_search(self):
         filters = {}
@@ -155,25 +280,50 @@ class SearchWindow(QWidget):
         if self.adv_max_year.value() < 2030:
             filters['max_year'] = self.adv_max_year.value()
         
-        self.search_worker = DatabaseWorker(self.db_manager.search_wines, "", filters)
-        self.search_worker.finished.connect(lambda results: self.display_results(results, self.advanced_results_table))
-        self.search_worker.error.connect(lambda e: print(f"Ошибка поиска: {e}"))
-        self.search_worker.start()
+        self.run_search(self.advanced_results_table, "", filters)
     
     def apply_category_filters(self):
         filters = {}
         if self.filter_region.currentText() != "Все регионы":
             filters['region'] = self.filter_region.currentText()
         
-        self.search_worker = DatabaseWorker(self.db_manager.search_wines, "", filters)
-        self.search_worker.finished.connect(lambda results: self.display_results(results, self.filter_results_table))
+        self.run_search(self.filter_results_table, "", filters)
+    
+    def run_search(self, table, search_term="", filters=None):
+        """Поиск с загрузкой первой страницы результатов"""
+        state = self.search_states[table]
+        state.update({'search_term': search_term, 'filters': filters, 'cursor': None})
+        
+        self.search_worker = DatabaseWorker(self.db_manager.search_wines_page, search_term, filters, self.PAGE_SIZE)
+        self.search_worker.finished.connect(lambda page: self.display_page(page, table, append=False))
         self.search_worker.error.connect(lambda e: print(f"Ошибка поиска: {e}"))
         self.search_worker.start()
     
-    def display_results(self, results, table):
-        table.setRowCount(len(results))
+    def load_more_results(self, table):
+        """Загрузка следующей страницы результатов поиска"""
+        state = self.search_states[table]
+        if not state['cursor']:
+            return
+        
+        state['button'].setEnabled(False)
+        self.search_worker = DatabaseWorker(self.db_manager.search_wines_page, state['search_term'],
+                                            state['filters'], self.PAGE_SIZE, state['cursor'])
+        self.search_worker.finished.connect(lambda page: self.display_page(page, table, append=True))
+        self.search_worker.error.connect(lambda e: print(f"Ошибка поиска: {e}"))
+        self.search_worker.start()
+    
+    def display_page(self, page, table, append=False):
+        state = self.search_states[table]
+        state['cursor'] = page['next_cursor']
+        state['button'].setEnabled(page['has_more'])
+        
+        start_row = table.rowCount() if append else 0
+        self.display_results(page['items'], table, start_row)
+    
+    def display_results(self, results, table, start_row=0):
+        table.setRowCount(start_row + len(results))
         
-        for row, wine in enumerate(results):
+        for row, wine in enumerate(results, start=start_row):
             table.setItem(row, 0, QTableWidgetItem(wine['Varietal']))
             table.setItem(row, 1, QTableWidgetItem(wine['Producer']))
             table.setItem(row, 2, QTableWidgetItem(wine['Region']))
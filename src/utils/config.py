@@ -7,6 +7,10 @@ load_dotenv()
 class Config:
     """Класс для конфигурации приложения"""
     
+    # Тип базы данных: mysql - сервер MySQL/MariaDB, sqlite - локальный файл
+    DB_BACKEND = os.getenv('DB_BACKEND', 'mysql').lower()
+    SQLITE_PATH = os.getenv('SQLITE_PATH', 'winestore.db')
+    
     # Настройки базы данных
     DB_HOST = os.getenv('DB_HOST', 'localhost')
     DB_USER = os.getenv('DB_USER', 'maksim')
@@ -14,11 +18,55 @@ class Config:
     DB_NAME = os.getenv('DB_NAME', 'is21-18')
     DB_CHARSET = os.getenv('DB_CHARSET', 'utf8mb4')
     
+    # Настройки пула соединений (MIN_SIZE - сколько простаивающих соединений
+    # не закрывается по DB_POOL_IDLE_TIMEOUT)
+    DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+    DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+    DB_POOL_IDLE_TIMEOUT = int(os.getenv('DB_POOL_IDLE_TIMEOUT', '300'))  # в секундах
+    DB_POOL_HEALTH_CHECK_INTERVAL = int(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', '30'))  # в секундах
+    
+    # Размер пакета для массовых операций
+    DB_BULK_CHUNK_SIZE = int(os.getenv('DB_BULK_CHUNK_SIZE', '500'))
+    
+    # Применение миграций схемы при запуске приложения
+    DB_AUTO_MIGRATE = os.getenv('DB_AUTO_MIGRATE', 'true').lower() == 'true'
+    
+    # Общий кэш результатов запросов и записей (0 - кэш отключен)
+    QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', '1000'))
+    QUERY_CACHE_TTL = int(os.getenv('QUERY_CACHE_TTL', '30'))
+    
+    # Чтение из локальной реплики SQLite с фоновой синхронизацией из MySQL
+    READ_REPLICA = os.getenv('READ_REPLICA', 'false').lower() == 'true'
+    READ_REPLICA_PATH = os.getenv('READ_REPLICA_PATH', 'winestore_replica.db')
+    READ_REPLICA_SYNC_INTERVAL = int(os.getenv('READ_REPLICA_SYNC_INTERVAL', '30'))  # в секундах
+    # Сколько секунд ждать изменение с пропущенным ChangeID (транзакция еще не
+    # зафиксирована), прежде чем считать ее откаченной
+    READ_REPLICA_GAP_GRACE = int(os.getenv('READ_REPLICA_GAP_GRACE', '120'))
+    
+    # Минимальная длина строки для полнотекстового поиска (короче - LIKE)
+    SEARCH_FULLTEXT_MIN_LENGTH = int(os.getenv('SEARCH_FULLTEXT_MIN_LENGTH', '3'))
+    
+    # Журнал медленных запросов с планами EXPLAIN (по умолчанию выключен)
+    SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', 'false').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = int(os.getenv('SLOW_QUERY_THRESHOLD_MS', '200'))
+    SLOW_QUERY_LOG_FILE = os.getenv('SLOW_QUERY_LOG_FILE', 'slow_queries.log')
+    SLOW_QUERY_LOG_MAX_SIZE = int(os.getenv('SLOW_QUERY_LOG_MAX_SIZE', '10485760'))
+    SLOW_QUERY_LOG_BACKUP_COUNT = int(os.getenv('SLOW_QUERY_LOG_BACKUP_COUNT', '5'))
+    
     # Настройки приложения
     APP_NAME = os.getenv('APP_NAME', 'WINESTORE')
     APP_VERSION = os.getenv('APP_VERSION', '1.0.0')
     STUDENT_NAME = os.getenv('STUDENT_NAME', '')
     
+    # Размер пакета строк при потоковом чтении данных экспорта
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '500'))
+    # Потоковый экспорт в Excel (constant_memory) без загрузки всех строк в память
+    EXPORT_EXCEL_STREAMING = os.getenv('EXPORT_EXCEL_STREAMING', 'true').lower() == 'true'
+    # Где формируется файл отчета: 'thread' - в потоке экспорта,
+    # 'process' - в отдельном процессе, не занимая GIL процесса интерфейса
+    EXPORT_RENDER_MODE = os.getenv('EXPORT_RENDER_MODE', 'thread').lower()
+    EXPORT_RENDER_WORKERS = int(os.getenv('EXPORT_RENDER_WORKERS', '1'))
+    
     # Пути
     REPORTS_DIR = 'reports'
     EXPORTS_DIR = 'exports'
@@ -35,6 +83,8 @@ class Config:
     def get_db_config():
         """Получение конфигурации базы данных"""
         return {
+            'backend': Config.DB_BACKEND,
+            'sqlite_path': Config.SQLITE_PATH,
             'host': Config.DB_HOST,
             'user': Config.DB_USER,
             'password': Config.DB_PASSWORD,
@@ -56,6 +106,16 @@ class Config:
         """Проверка конфигурации"""
         errors = []
         
+        if Config.EXPORT_RENDER_MODE not in ('thread', 'process'):
+            errors.append(f"Неизвестный EXPORT_RENDER_MODE: {Config.EXPORT_RENDER_MODE}")
+        
+        if Config.DB_BACKEND == 'sqlite':
+            if not Config.SQLITE_PATH:
+                errors.append("SQLITE_PATH не указан")
+            return errors
+        if Config.DB_BACKEND != 'mysql':
+            errors.append(f"Неизвестный DB_BACKEND: {Config.DB_BACKEND}")
+        
         if not Config.DB_HOST:
             errors.append("DB_HOST не указан")
         if not Config.DB_USER:
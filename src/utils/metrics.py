@@ -0,0 +1,221 @@
+"""
+Метрики времени выполнения запросов к базе данных
+
+Для каждого именованного запроса собираются время получения соединения,
+выполнения и чтения результата, количество строк, вызовов и ошибок.
+Распределения хранятся как гистограммы с перцентилями p50/p95/p99 по
+последним измерениям и выгружаются в JSON или текстовый формат Prometheus.
+"""
+
+import json
+import math
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+QUANTILES = (0.5, 0.95, 0.99)
+PROMETHEUS_PREFIX = 'winestore_db_query'
+
+# Распределения и единицы измерения для выгрузки в Prometheus
+HISTOGRAMS = {
+    'connect': 'seconds',
+    'execute': 'seconds',
+    'fetch': 'seconds',
+    'total': 'seconds',
+    'rows': 'rows',
+    # синхронизация локальной реплики: отставание и давность данных
+    'lag': 'changes',
+    'staleness': 'seconds',
+}
+COUNTERS = ('calls', 'errors', 'cache_hits')
+
+
+class Histogram:
+    """Распределение значений: счетчик, сумма, минимум, максимум и
+    перцентили по последним sample_size измерениям"""
+
+    def __init__(self, sample_size=2048):
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self._samples = deque(maxlen=sample_size)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self._samples.append(value)
+
+    def quantile(self, q):
+        """Перцентиль по методу ближайшего ранга"""
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        rank = max(1, math.ceil(q * len(ordered)))
+        return ordered[rank - 1]
+
+    def to_dict(self):
+        result = {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min or 0.0,
+            'max': self.max or 0.0,
+            'avg': self.sum / self.count if self.count else 0.0,
+        }
+        for q in QUANTILES:
+            result[f'p{int(q * 100)}'] = self.quantile(q)
+        return result
+
+
+class QueryTimer:
+    """Измерение одного выполнения запроса
+
+    Используется как контекстный менеджер: при выходе учитывается вызов и
+    общее время, при исключении - ошибка. Фазы измеряются через phase().
+    """
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        self._started = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, 'total', time.perf_counter() - self._started)
+        self.registry.increment(self.name, 'calls')
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.registry.increment(self.name, 'errors')
+        return False
+
+    @contextmanager
+    def phase(self, phase):
+        """Измерение фазы: connect, execute или fetch"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registry.observe(self.name, phase, time.perf_counter() - started)
+
+    def observe(self, phase, seconds):
+        """Учет уже измеренной длительности фазы"""
+        self.registry.observe(self.name, phase, seconds)
+
+    def add_rows(self, count):
+        """Учет количества прочитанных или измененных строк"""
+        self.registry.observe(self.name, 'rows', count)
+
+
+class MetricsRegistry:
+    """Реестр метрик запросов, общий для всего процесса"""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, sample_size=2048):
+        self.sample_size = sample_size
+        self._histograms = {}  # (запрос, метрика) -> Histogram
+        self._counters = {}  # (запрос, счетчик) -> int
+        self._lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        """Получение общего реестра"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def query_timer(self, name):
+        """Создание измерителя для запроса с именем name"""
+        return QueryTimer(self, name)
+
+    def observe(self, name, metric, value):
+        with self._lock:
+            histogram = self._histograms.get((name, metric))
+            if histogram is None:
+                histogram = self._histograms[(name, metric)] = Histogram(self.sample_size)
+            histogram.observe(value)
+
+    def increment(self, name, counter, value=1):
+        with self._lock:
+            self._counters[(name, counter)] = self._counters.get((name, counter), 0) + value
+
+    def reset(self):
+        """Очистка всех метрик"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def to_dict(self):
+        """Снимок метрик: {запрос: {счетчик: значение, метрика: {...}}}"""
+        with self._lock:
+            result = {}
+            for (name, counter), value in self._counters.items():
+                result.setdefault(name, {})[counter] = value
+            for (name, metric), histogram in self._histograms.items():
+                result.setdefault(name, {})[metric] = histogram.to_dict()
+        return dict(sorted(result.items()))
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=indent)
+
+    def to_prometheus(self):
+        """Выгрузка в текстовом формате Prometheus (тип summary для распределений)"""
+        snapshot = self.to_dict()
+        lines = []
+
+        for counter in COUNTERS:
+            metric = f'{PROMETHEUS_PREFIX}_{counter}_total'
+            lines.append(f'# TYPE {metric} counter')
+            for name, values in snapshot.items():
+                if counter in values:
+                    lines.append(f'{metric}{{query="{_escape_label(name)}"}} {values[counter]}')
+
+        for phase, unit in HISTOGRAMS.items():
+            metric = f'{PROMETHEUS_PREFIX}_{phase}' if phase == unit else f'{PROMETHEUS_PREFIX}_{phase}_{unit}'
+            lines.append(f'# TYPE {metric} summary')
+            for name, values in snapshot.items():
+                histogram = values.get(phase)
+                if not histogram:
+                    continue
+                label = f'query="{_escape_label(name)}"'
+                for q in QUANTILES:
+                    lines.append(f'{metric}{{{label},quantile="{q}"}} {histogram[f"p{int(q * 100)}"]}')
+                lines.append(f'{metric}_sum{{{label}}} {histogram["sum"]}')
+                lines.append(f'{metric}_count{{{label}}} {histogram["count"]}')
+
+        return "\n".join(lines) + "\n"
+
+    def dump(self, filename, fmt='json'):
+        """Сохранение метрик в файл в формате json или prometheus"""
+        if fmt == 'json':
+            content = self.to_json()
+        elif fmt == 'prometheus':
+            content = self.to_prometheus()
+        else:
+            raise ValueError(f"Неизвестный формат метрик: {fmt}")
+
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return filename
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def query_name(query):
+    """Имя запроса по умолчанию: операция и первая таблица, например select_WineBottle"""
+    words = query.split()
+    if not words:
+        return 'unknown'
+    match = re.search(r'\b(?:FROM|INTO|UPDATE)\s+`?(\w+)', query, re.IGNORECASE)
+    operation = words[0].lower()
+    return f'{operation}_{match.group(1)}' if match else operation
@@ -0,0 +1,104 @@
+"""
+Журнал медленных запросов
+
+Если запрос выполняется дольше SLOW_QUERY_THRESHOLD_MS, в файл
+SLOW_QUERY_LOG_FILE (с ротацией) записывается строка JSON с текстом
+запроса, параметрами, длительностью и планом EXPLAIN FORMAT=JSON (в SQLite -
+EXPLAIN QUERY PLAN).
+Журнал включается настройкой SLOW_QUERY_LOG=true.
+"""
+
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from models.backends.dialect import dialect_of
+from utils.config import Config
+
+# Операторы, для которых строится план
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class SlowQueryLog:
+    """Запись медленных запросов и их планов выполнения"""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, enabled=False, threshold_ms=200, filename='slow_queries.log',
+                 max_bytes=10485760, backup_count=5):
+        self.enabled = enabled
+        self.threshold = threshold_ms / 1000
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._logger = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        """Получение общего журнала с настройками из Config"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls(
+                    Config.SLOW_QUERY_LOG,
+                    Config.SLOW_QUERY_THRESHOLD_MS,
+                    Config.SLOW_QUERY_LOG_FILE,
+                    Config.SLOW_QUERY_LOG_MAX_SIZE,
+                    Config.SLOW_QUERY_LOG_BACKUP_COUNT
+                )
+            return cls._instance
+
+    def _get_logger(self):
+        """Создание логгера с ротацией файла при первой записи"""
+        with self._lock:
+            if self._logger is None:
+                logger = logging.getLogger('winestore.slow_query')
+                logger.setLevel(logging.WARNING)
+                logger.propagate = False
+                handler = RotatingFileHandler(self.filename, maxBytes=self.max_bytes,
+                                              backupCount=self.backup_count, encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                logger.addHandler(handler)
+                self._logger = logger
+            return self._logger
+
+    def is_slow(self, duration):
+        return self.enabled and duration >= self.threshold
+
+    async def check(self, cursor, query, params, started, name=None):
+        """Проверка длительности запроса, начатого в started (time.perf_counter)
+
+        Вызывается после чтения результата; для медленного запроса на том
+        же курсоре выполняется EXPLAIN и запись добавляется в журнал.
+        """
+        duration = time.perf_counter() - started
+        if not self.is_slow(duration):
+            return False
+
+        plan = None
+        if query.strip().upper().startswith(_EXPLAINABLE):
+            try:
+                plan = await dialect_of(cursor).explain(cursor, query, params)
+            except Exception as e:
+                plan = {'error': str(e)}
+
+        self.write(query, params, duration, plan, name)
+        return True
+
+    def write(self, query, params, duration, plan=None, name=None):
+        """Запись медленного запроса в журнал"""
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'name': name,
+            'duration_ms': round(duration * 1000, 3),
+            'query': " ".join(query.split()),
+            'params': [str(param) for param in (params or ())],
+            'plan': plan,
+        }
+        try:
+            self._get_logger().warning(json.dumps(entry, ensure_ascii=False))
+        except Exception as e:
+            print(f"Ошибка записи журнала медленных запросов: {e}")
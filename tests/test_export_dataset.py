@@ -0,0 +1,43 @@
+"""Набор данных экспорта: агрегаты и передача в процесс формирования"""
+
+import pytest
+
+from export.dataset import ExportDataset
+
+
+def row(bottle_id, price, region="Бордо", vintage=2015, producer="P", shelf=None):
+    return (bottle_id, "Мерло", producer, vintage, region, price, None, shelf, None, None)
+
+
+def test_bottle_with_several_locations_is_counted_once():
+    dataset = ExportDataset()
+    dataset.add([row(3, 300, shelf="A"), row(3, 300, shelf="B")])
+    dataset.add([row(3, 300, shelf="C"), row(2, 100, region="Тоскана")])
+
+    assert dataset.rows_read == 4
+    assert len(dataset.rows) == 4
+    assert dataset.total_bottles == 2
+    assert dataset.total_value == 400
+    assert dataset.statistics()['regions'] == {"Бордо": 1, "Тоскана": 1}
+    assert [wine[0] for wine in dataset.top_wines()] == [3, 2]
+
+
+def test_statistical_dataset_has_no_rows():
+    dataset = ExportDataset(keep_rows=False)
+    dataset.add([row(1, 100), row(2, None, vintage=None)])
+
+    assert dataset.rows is None
+    assert dataset.total_bottles == 2
+    assert dataset.average_price == 50
+    with pytest.raises(ValueError):
+        dataset.wines_by_vintage()
+
+
+def test_payload_round_trip():
+    dataset = ExportDataset()
+    dataset.add([row(2, 200), row(1, 100, vintage=2010)])
+    restored = ExportDataset.from_payload(dataset.to_payload())
+
+    assert restored.total_bottles == 2
+    assert restored.region_stats() == dataset.region_stats()
+    assert [wine[0] for wine in restored.wines_by_vintage()] == [2, 1]
@@ -0,0 +1,50 @@
+"""Гистограммы метрик запросов"""
+
+import pytest
+
+from utils.metrics import Histogram
+
+
+def test_empty_histogram():
+    histogram = Histogram()
+    assert histogram.quantile(0.5) == 0.0
+    assert histogram.to_dict()['avg'] == 0.0
+
+
+@pytest.mark.parametrize("q, expected", [
+    (0.0, 1),
+    (0.01, 1),
+    (0.5, 50),
+    (0.95, 95),
+    (0.99, 99),
+    (1.0, 100),
+])
+def test_nearest_rank_quantiles(q, expected):
+    histogram = Histogram()
+    for value in reversed(range(1, 101)):
+        histogram.observe(value)
+    assert histogram.quantile(q) == expected
+
+
+def test_quantiles_use_last_samples():
+    histogram = Histogram(sample_size=4)
+    for value in [100, 100, 1, 2, 3, 4]:
+        histogram.observe(value)
+
+    assert histogram.quantile(1.0) == 4
+    assert histogram.count == 6
+    assert histogram.max == 100
+
+
+def test_to_dict():
+    histogram = Histogram()
+    for value in [0.5, 1.5, 1.0]:
+        histogram.observe(value)
+    result = histogram.to_dict()
+
+    assert result['count'] == 3
+    assert result['sum'] == 3.0
+    assert result['min'] == 0.5
+    assert result['max'] == 1.5
+    assert result['avg'] == 1.0
+    assert result['p50'] == 1.0
@@ -0,0 +1,31 @@
+"""Курсоры постраничной выдачи (keyset)"""
+
+import base64
+
+import pytest
+
+from models.database import decode_page_cursor, encode_page_cursor
+
+
+@pytest.mark.parametrize("bottle_id", [1, 42, 10**12])
+def test_round_trip(bottle_id):
+    assert decode_page_cursor(encode_page_cursor(bottle_id)) == bottle_id
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_page_cursor(10**12)
+    assert cursor == base64.urlsafe_b64encode(b"bottle:1000000000000").decode()
+    assert not set(cursor) & set("+/")
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not base64!",
+    base64.urlsafe_b64encode(b"page:5").decode(),
+    base64.urlsafe_b64encode(b"bottle:abc").decode(),
+    base64.urlsafe_b64encode(b"bottle").decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError, match="Некорректный курсор страницы"):
+        decode_page_cursor(cursor)
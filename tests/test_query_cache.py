@@ -0,0 +1,73 @@
+"""Кэш результатов запросов: поколения и сброс"""
+
+from models.query_cache import QueryCache
+
+
+def make_cache(**kwargs):
+    return QueryCache(**{'max_size': 10, 'ttl': 60, **kwargs})
+
+
+def test_make_key_normalizes_whitespace():
+    assert QueryCache.make_key("SELECT  *\n FROM WineBottle", [1]) == \
+        QueryCache.make_key("SELECT * FROM WineBottle", (1,))
+
+
+def test_invalidate_clears_entries_and_bumps_generation():
+    cache = make_cache()
+    key = cache.make_key("SELECT 1")
+    cache.put(key, [(1,)])
+    generation = cache.generation
+
+    cache.invalidate()
+
+    assert cache.generation == generation + 1
+    assert cache.get(key) == (False, None)
+    assert cache.get_metrics()['invalidations'] == 1
+
+
+def test_put_from_previous_generation_is_dropped():
+    cache = make_cache()
+    key = cache.make_key("SELECT 1")
+    # Чтение началось до сброса кэша - результат мог устареть
+    generation = cache.generation
+    cache.invalidate()
+    cache.put(key, [(1,)], generation)
+    assert cache.get(key) == (False, None)
+
+    cache.put(key, [(2,)], cache.generation)
+    assert cache.get(key) == (True, [(2,)])
+
+
+def test_observe_version_invalidates_on_change():
+    cache = make_cache()
+    key = cache.make_key("SELECT 1")
+    cache.put(key, [(1,)])
+
+    assert cache.observe_version(5) is False
+    assert cache.observe_version(5) is False
+    assert cache.get(key) == (True, [(1,)])
+
+    generation = cache.generation
+    assert cache.observe_version(6) is True
+    assert cache.generation == generation + 1
+    assert cache.get(key) == (False, None)
+
+
+def test_lru_eviction():
+    cache = make_cache(max_size=2)
+    keys = [cache.make_key(f"SELECT {i}") for i in range(3)]
+    cache.put(keys[0], 0)
+    cache.put(keys[1], 1)
+    cache.get(keys[0])
+    cache.put(keys[2], 2)
+
+    assert cache.get(keys[1]) == (False, None)
+    assert cache.get(keys[0]) == (True, 0)
+    assert cache.get_metrics()['evicted'] == 1
+
+
+def test_disabled_cache():
+    cache = make_cache(ttl=0)
+    key = cache.make_key("SELECT 1")
+    cache.put(key, 1)
+    assert cache.get(key) == (False, None)
@@ -0,0 +1,143 @@
+"""Перенос журнала изменений в локальную реплику: пропуски ChangeID"""
+
+import sqlite3
+
+import pytest
+
+from migrations.runner import run_migrations
+from models.backends.sqlite import SQLiteBackend
+from models.replica import LocalReplica
+
+
+class Source:
+    """Исходная база SQLite вместо MySQL"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def execute(self, query, params=()):
+        conn = sqlite3.connect(self.path)
+        try:
+            rows = conn.execute(query, params).fetchall()
+            conn.commit()
+            return rows
+        finally:
+            conn.close()
+
+    def update_producer(self, bottle_id, producer):
+        self.execute("UPDATE WineBottle SET Producer = ? WHERE BottleID = ?", (producer, bottle_id))
+
+    def log_change(self, change_id, bottle_id):
+        self.execute("INSERT INTO WineChangeLog (ChangeID, BottleID, Operation) VALUES (?, ?, 'update')",
+                     (change_id, bottle_id))
+
+
+@pytest.fixture
+async def source(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "source.db"))
+    conn = await backend.connect()
+    try:
+        await run_migrations(conn)
+    finally:
+        await conn.ensure_closed()
+
+    source = Source(backend.path)
+    for bottle_id in (1, 2):
+        source.execute("INSERT INTO WineBottle (BottleID, WineName, Producer, Vintage, Region, PurchasePrice) "
+                       "VALUES (?, 'Мерло', 'P', 2015, 'Бордо', 100)", (bottle_id,))
+    # Журнал не пуст: иначе пропуск в его начале выглядит как очистка журнала
+    source.log_change(1, 1)
+    return source
+
+
+@pytest.fixture
+async def replica(tmp_path, source):
+    replica = LocalReplica(str(tmp_path / "replica.db"), batch_size=2,
+                           source_backend=SQLiteBackend(source.path), gap_grace=1000)
+    # Первая синхронизация копирует коллекцию целиком
+    assert await replica.sync() == 2
+    assert replica.version == 1
+    yield replica
+    await replica.close()
+
+
+def replica_producers(replica):
+    conn = sqlite3.connect(replica.path)
+    try:
+        return dict(conn.execute("SELECT BottleID, Producer FROM WineBottle"))
+    finally:
+        conn.close()
+
+
+def saved_version(replica):
+    conn = sqlite3.connect(replica.path)
+    try:
+        return conn.execute("SELECT Version FROM ReplicaState").fetchone()[0]
+    finally:
+        conn.close()
+
+
+async def test_gap_holds_version_until_filled(source, replica):
+    # Транзакция с ChangeID 2 зафиксирована позже транзакции с ChangeID 3
+    source.update_producer(1, "late")
+    source.update_producer(2, "early")
+    source.log_change(3, 2)
+
+    assert await replica.sync() == 1
+    assert replica._gaps.keys() == {2}
+    assert replica.version == 1
+    assert saved_version(replica) == 1
+    assert replica_producers(replica) == {1: "P", 2: "early"}
+
+    source.log_change(2, 1)
+    assert await replica.sync() == 1
+    assert replica._gaps == {}
+    assert replica.version == 3
+    assert saved_version(replica) == 3
+    assert replica_producers(replica) == {1: "late", 2: "early"}
+    assert replica.get_metrics()['pending_gaps'] == 0
+
+
+async def test_expired_gap_is_treated_as_rolled_back(source, replica):
+    source.log_change(4, 2)
+    await replica.sync()
+    assert sorted(replica._gaps) == [2, 3]
+    assert replica.version == 1
+
+    # Пропуск, не заполненный за gap_grace секунд, - откаченная транзакция
+    replica.gap_grace = -1
+    assert await replica.sync() == 0
+    assert replica._gaps == {}
+    assert replica.version == 4
+    assert saved_version(replica) == 4
+
+
+async def test_partially_filled_gaps(source, replica):
+    source.log_change(5, 1)
+    await replica.sync()
+    assert sorted(replica._gaps) == [2, 3, 4]
+
+    source.update_producer(2, "second")
+    source.log_change(3, 2)
+    assert await replica.sync() == 1
+    assert sorted(replica._gaps) == [2, 4]
+    assert replica.version == 1
+    assert replica_producers(replica)[2] == "second"
+
+
+async def test_restart_rereads_log_from_saved_version(tmp_path, source, replica):
+    source.log_change(3, 2)
+    await replica.sync()
+    assert saved_version(replica) == 1
+
+    # Сведения о пропусках не сохраняются: после перезапуска журнал
+    # перечитывается с сохраненной версии
+    source.update_producer(1, "after restart")
+    source.log_change(2, 1)
+    restarted = LocalReplica(replica.path, batch_size=2, source_backend=SQLiteBackend(source.path))
+    try:
+        assert await restarted.sync() == 2
+        assert restarted.version == 3
+        assert replica_producers(restarted)[1] == "after restart"
+    finally:
+        await restarted.close()
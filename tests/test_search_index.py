@@ -0,0 +1,55 @@
+"""Триграммный индекс поиска"""
+
+from models.search_index import TrigramIndex, normalize_text
+
+
+def wine(bottle_id, varietal, producer="", region=""):
+    return {'BottleID': bottle_id, 'Varietal': varietal, 'Producer': producer, 'Region': region}
+
+
+def ids(results):
+    return [item['BottleID'] for item in results]
+
+
+def test_normalize_text():
+    assert normalize_text("ЁЛКА Ёж") == "елка еж"
+    assert normalize_text(None) == ""
+
+
+def test_yo_and_ye_are_equal():
+    index = TrigramIndex([
+        wine(1, "Шардоне", "Щёкино"),
+        wine(2, "Мерло", "Шато Берёзовка"),
+        wine(3, "Рислинг", "Щекино"),
+    ])
+    assert ids(index.search("щекино")) == [3, 1]
+    assert ids(index.search("ЩЁКИНО")) == [3, 1]
+    assert ids(index.search("березовка")) == [2]
+    assert ids(index.search("ёз")) == [2]
+
+
+def test_results_are_exact_substrings():
+    # У второй записи есть все триграммы запроса, но не сама подстрока
+    index = TrigramIndex([wine(1, "abcab"), wine(2, "abc bca cab")])
+    assert ids(index.search("abcab")) == [1]
+    assert ids(index.search("bca")) == [2, 1]
+
+
+def test_short_query_and_limit():
+    index = TrigramIndex([wine(i, "Мерло") for i in range(1, 6)])
+    assert ids(index.search("ме")) == [5, 4, 3, 2, 1]
+    assert ids(index.search("мерло", limit=2)) == [5, 4]
+    assert index.search("   ") == []
+
+
+def test_update_and_remove():
+    index = TrigramIndex([wine(1, "Мерло"), wine(2, "Мальбек")])
+    index.update(wine(1, "Шираз"))
+
+    assert ids(index.search("мерло")) == []
+    assert ids(index.search("шираз")) == [1]
+    assert index.remove(2) is True
+    assert index.remove(2) is False
+    assert 2 not in index
+    assert len(index) == 1
+    assert ids(index.search("мальбек")) == []